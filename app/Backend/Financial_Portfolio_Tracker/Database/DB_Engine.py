@@ -0,0 +1,94 @@
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON
+
+
+class Timed_Queue_Pool(QueuePool):
+    '''
+    QueuePool that reports how long each checkout waited for a free connection
+    '''
+    # Callback(seconds) set by DB_Engine_Config.register_pool_metrics
+    on_checkout_wait = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if Timed_Queue_Pool.on_checkout_wait:
+                Timed_Queue_Pool.on_checkout_wait(time.perf_counter() - started)
+
+
+class DB_Engine_Config:
+    '''
+    SQLAlchemy engine / connection pool settings driven by environment variables
+    - DB_POOL_SIZE, DB_MAX_OVERFLOW: persistent and burst connections per worker process
+    - DB_POOL_TIMEOUT: seconds to wait for a free connection before failing
+    - DB_POOL_RECYCLE: seconds after which a connection is replaced
+    - DB_POOL_PRE_PING: test connections on checkout (survives Postgres restarts)
+    - DB_STATEMENT_TIMEOUT_MS: server-side statement_timeout for every connection (0 = off)
+    - JSON / JSONB columns are encoded and decoded with Fast_JSON (orjson when installed)
+    return: dict for app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    '''
+    @staticmethod
+    def engine_options(env=None):
+        env = os.environ if env is None else env
+        options = {
+            'poolclass': Timed_Queue_Pool,
+            'pool_size': int(env.get('DB_POOL_SIZE', '5')),
+            'max_overflow': int(env.get('DB_MAX_OVERFLOW', '5')),
+            'pool_timeout': float(env.get('DB_POOL_TIMEOUT', '10')),
+            'pool_recycle': int(env.get('DB_POOL_RECYCLE', '1800')),
+            'pool_pre_ping': env.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+            # Also registered as the psycopg2 json / jsonb typecaster, so reads skip the stdlib decoder
+            'json_serializer': Fast_JSON.dumps,
+            'json_deserializer': Fast_JSON.loads
+        }
+        statement_timeout = int(env.get('DB_STATEMENT_TIMEOUT_MS', '30000'))
+        if statement_timeout > 0:
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+        return options
+
+    @staticmethod
+    def register_pool_metrics(engine, on_checkout_wait=None, on_in_use_change=None):
+        """
+        Hook pool events to metrics callbacks
+        on_checkout_wait(seconds) after every checkout, on_in_use_change(+1 / -1) on checkout / checkin
+        """
+        Timed_Queue_Pool.on_checkout_wait = on_checkout_wait
+        if on_in_use_change:
+            event.listen(engine, 'checkout', lambda *args: on_in_use_change(1))
+            event.listen(engine, 'checkin', lambda *args: on_in_use_change(-1))
+
+    # Statement kinds reported by register_statement_timing, anything else is 'other'
+    STATEMENT_KINDS = ('select', 'insert', 'update', 'delete', 'with')
+
+    @staticmethod
+    def statement_kind(statement):
+        words = statement.lstrip(' \n\t(').split(None, 1)
+        kind = words[0].lower() if words else ''
+        return kind if kind in DB_Engine_Config.STATEMENT_KINDS else 'other'
+
+    @staticmethod
+    def register_statement_timing(engine, on_statement):
+        """
+        Time every SQL statement on engine: on_statement(kind, seconds), kind from statement_kind()
+        """
+        def before(connection, cursor, statement, parameters, context, executemany):
+            connection.info.setdefault('statement_started', []).append(time.perf_counter())
+
+        def after(connection, cursor, statement, parameters, context, executemany):
+            started = connection.info['statement_started'].pop()
+            on_statement(DB_Engine_Config.statement_kind(statement), time.perf_counter() - started)
+
+        def failed(context):
+            # after_cursor_execute does not run for failed statements
+            started = context.connection.info.get('statement_started') if context.connection else None
+            if started:
+                started.pop()
+
+        event.listen(engine, 'before_cursor_execute', before)
+        event.listen(engine, 'after_cursor_execute', after)
+        event.listen(engine, 'handle_error', failed)
@@ -0,0 +1,145 @@
+import logging
+from sqlalchemy import text
+from Financial_Portfolio_Tracker.Database.Holdings_Store import Holdings_Store
+
+logger = logging.getLogger(__name__)
+
+
+class Holdings_Migration:
+    '''
+    Moves holdings out of the portfolio_files JSON into the stocks table
+    - Adds stocks.holding_id / stocks.company_name and the (user_id, holding_id) unique index
+    - Adds portfolio_files.holdings_version
+    - Backfills every JSON holding into stocks (the JSON was the copy users saw, so it wins on conflict)
+    - Strips 'holdings' and the stored totals from portfolio_files, they are materialized on read now
+    - Adds the per-ticker quotes table (seeded with the newest stored price of each ticker, with a version counter)
+      and the holdings view
+    Safe to run on every start: each step is a no-op once applied
+    return: number of portfolio_files rows that were backfilled
+    '''
+    # Serializes concurrent runs (several pods starting at the same time)
+    LOCK_ID = 4207001
+
+    STEPS = [
+        """
+        CREATE TABLE IF NOT EXISTS stocks (
+            user_id INT NOT NULL,
+            ticker VARCHAR(10) NOT NULL,
+            quantity DECIMAL(10,2) NOT NULL,
+            buy_price DECIMAL(10,2) NOT NULL,
+            current_price DECIMAL(10,2),
+            value DECIMAL(15,2),
+            gain DECIMAL(15,2),
+            change_percent DECIMAL(5,2),
+            created_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC'),
+            updated_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC'),
+            PRIMARY KEY (user_id, ticker),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+        """,
+        # Timestamps are naive UTC, tables created before that default to the server's local time
+        "ALTER TABLE stocks ALTER COLUMN created_at SET DEFAULT (NOW() AT TIME ZONE 'UTC')",
+        "ALTER TABLE stocks ALTER COLUMN updated_at SET DEFAULT (NOW() AT TIME ZONE 'UTC')",
+        "ALTER TABLE stocks ADD COLUMN IF NOT EXISTS holding_id INTEGER",
+        "ALTER TABLE stocks ADD COLUMN IF NOT EXISTS company_name VARCHAR(100)",
+        # Bumped on every holdings change, lets per-process analytics engines detect staleness
+        "ALTER TABLE portfolio_files ADD COLUMN IF NOT EXISTS holdings_version BIGINT NOT NULL DEFAULT 0",
+        """
+        INSERT INTO stocks (user_id, ticker, holding_id, company_name, quantity, buy_price,
+                            current_price, value, gain, change_percent, created_at, updated_at)
+        SELECT DISTINCT ON (pf.user_id, UPPER(h->>'ticker'))
+            pf.user_id,
+            UPPER(h->>'ticker'),
+            CASE WHEN (h->>'id') ~ '^[0-9]+$' THEN (h->>'id')::int END,
+            h->>'company_name',
+            COALESCE(NULLIF(h->>'quantity', '')::numeric, 0),
+            COALESCE(NULLIF(h->>'buy_price', '')::numeric, 0),
+            NULLIF(h->>'current_price', '')::numeric,
+            NULLIF(h->>'value', '')::numeric,
+            NULLIF(h->>'gain', '')::numeric,
+            CASE WHEN (h->>'change_percent') ~ '^-?[0-9]+(\\.[0-9]+)?%?$'
+                 THEN LEAST(GREATEST(REPLACE(h->>'change_percent', '%', '')::numeric, -999.99), 999.99) END,
+            COALESCE(pf.created_at, NOW() AT TIME ZONE 'UTC'),
+            COALESCE(pf.updated_at, NOW() AT TIME ZONE 'UTC')
+        FROM portfolio_files pf
+        CROSS JOIN LATERAL json_array_elements(pf.file_content->'holdings') AS h
+        WHERE json_typeof(pf.file_content->'holdings') = 'array'
+          AND COALESCE(h->>'ticker', '') <> ''
+        ORDER BY pf.user_id, UPPER(h->>'ticker'), h->>'id'
+        ON CONFLICT (user_id, ticker) DO UPDATE SET
+            holding_id = EXCLUDED.holding_id,
+            company_name = COALESCE(EXCLUDED.company_name, stocks.company_name),
+            quantity = EXCLUDED.quantity,
+            buy_price = EXCLUDED.buy_price,
+            current_price = COALESCE(EXCLUDED.current_price, stocks.current_price),
+            value = COALESCE(EXCLUDED.value, stocks.value),
+            gain = COALESCE(EXCLUDED.gain, stocks.gain),
+            change_percent = COALESCE(EXCLUDED.change_percent, stocks.change_percent)
+        """,
+        # Duplicate ids inside one portfolio get renumbered below
+        """
+        UPDATE stocks s SET holding_id = NULL
+        FROM (
+            SELECT user_id, ticker,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, holding_id ORDER BY created_at, ticker) AS position
+            FROM stocks WHERE holding_id IS NOT NULL
+        ) d
+        WHERE s.user_id = d.user_id AND s.ticker = d.ticker AND d.position > 1
+        """,
+        """
+        UPDATE stocks s SET holding_id = n.next_id
+        FROM (
+            SELECT user_id, ticker,
+                   COALESCE(MAX(holding_id) OVER (PARTITION BY user_id), -1)
+                   + ROW_NUMBER() OVER (PARTITION BY user_id, holding_id IS NULL ORDER BY created_at, ticker) AS next_id,
+                   holding_id IS NULL AS missing
+            FROM stocks
+        ) n
+        WHERE s.user_id = n.user_id AND s.ticker = n.ticker AND n.missing
+        """,
+        "ALTER TABLE stocks ALTER COLUMN holding_id SET NOT NULL",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_stocks_user_holding ON stocks(user_id, holding_id)",
+        "CREATE INDEX IF NOT EXISTS idx_stocks_ticker ON stocks(ticker)",
+        # Latest price per ticker, a price update writes this one row instead of every holder's stocks row
+        """
+        CREATE TABLE IF NOT EXISTS quotes (
+            ticker VARCHAR(10) PRIMARY KEY,
+            price DECIMAL(10,2) NOT NULL,
+            change_percent DECIMAL(5,2),
+            updated_at TIMESTAMP DEFAULT (NOW() AT TIME ZONE 'UTC')
+        )
+        """,
+        "ALTER TABLE quotes ALTER COLUMN updated_at SET DEFAULT (NOW() AT TIME ZONE 'UTC')",
+        # Bumped with every new price, portfolios detect moved prices from it without a write per holder
+        "ALTER TABLE quotes ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+        """
+        INSERT INTO quotes (ticker, price, change_percent, updated_at)
+        SELECT DISTINCT ON (ticker) ticker, current_price, change_percent, updated_at
+        FROM stocks WHERE current_price > 0
+        ORDER BY ticker, updated_at DESC
+        ON CONFLICT (ticker) DO NOTHING
+        """,
+        f"CREATE OR REPLACE VIEW holdings AS SELECT {Holdings_Store.VALUED_COLUMNS} "
+        "FROM stocks s LEFT JOIN quotes q ON q.ticker = s.ticker",
+        """
+        UPDATE portfolio_files
+        SET file_content = (file_content::jsonb - 'holdings' - 'total_value' - 'total_investment' - 'total_gain_loss')::json
+        WHERE file_content::jsonb ? 'holdings'
+        """
+    ]
+
+    @staticmethod
+    def run(engine):
+        """
+        Apply every step in one transaction
+        """
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": Holdings_Migration.LOCK_ID})
+            pending = connection.execute(
+                text("SELECT COUNT(*) FROM portfolio_files WHERE file_content::jsonb ? 'holdings'")
+            ).scalar()
+            for step in Holdings_Migration.STEPS:
+                connection.execute(text(step))
+        if pending:
+            logger.info("Holdings migration: backfilled %d portfolio files into stocks", pending)
+        return pending
@@ -0,0 +1,313 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import text
+
+
+class Holdings_Store:
+    '''
+    Holdings stored as one `stocks` row per (user_id, ticker), the single source of truth
+    - holding_id is the per-user investment id used by the PUT / DELETE routes
+    - Writes touch one row only, portfolio JSON is materialized on read
+    - Prices live once per ticker in `quotes`, the `holdings` view values every holding at its ticker's quote
+      (the price columns of stocks are only the fallback for tickers without a quote yet)
+    - holdings_version changes with the holdings only; every new price bumps its quotes row's version instead,
+      a user's quote version is the sum over the tickers held, so a price tick writes one row whoever holds it
+    Timestamps are naive UTC, like every other timestamp column
+    return: holdings as dicts shaped like the former portfolio_files 'holdings' entries
+    '''
+    # change_percent columns are DECIMAL(5,2)
+    MAX_CHANGE_PERCENT = 999.99
+    COLUMNS = ("user_id, holding_id, ticker, company_name, quantity, buy_price, current_price, "
+               "value, gain, change_percent, created_at, updated_at")
+
+    # Holding valued at the latest quote: stocks row `s` left joined with quotes row `q`
+    # Used by the holdings view and by writes that return the changed holding
+    VALUED_COLUMNS = """
+        s.user_id, s.holding_id, s.ticker, s.company_name, s.quantity, s.buy_price,
+        COALESCE(q.price, s.current_price) AS current_price,
+        CASE WHEN q.price IS NULL THEN s.value ELSE ROUND(s.quantity * q.price, 2) END AS value,
+        CASE WHEN q.price IS NULL THEN s.gain ELSE ROUND(s.quantity * (q.price - s.buy_price), 2) END AS gain,
+        COALESCE(q.change_percent, s.change_percent) AS change_percent,
+        s.created_at, GREATEST(s.updated_at, q.updated_at) AS updated_at
+    """
+
+    @staticmethod
+    def clamp_change_percent(change_percent):
+        """
+        Keep a daily change inside the column range (a thinly traded ticker can move more than 1000%)
+        """
+        limit = Holdings_Store.MAX_CHANGE_PERCENT
+        return max(-limit, min(limit, float(change_percent or 0.0)))
+
+    @staticmethod
+    def to_holding(row):
+        """
+        Convert a stocks row mapping to a holding dict (floats and ISO timestamps)
+        """
+        holding = {}
+        for key, value in dict(row).items():
+            if isinstance(value, Decimal):
+                value = float(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            holding[key] = value
+        holding['id'] = holding.pop('holding_id')
+        holding.pop('user_id', None)
+        holding['company_name'] = holding.get('company_name') or ''
+        for key in ('current_price', 'value', 'gain', 'change_percent'):
+            if holding.get(key) is None:
+                holding[key] = 0.0
+        return holding
+
+    @staticmethod
+    def list_holdings(session, user_id):
+        rows = session.execute(
+            text(f"SELECT {Holdings_Store.COLUMNS} FROM holdings WHERE user_id = :user_id ORDER BY holding_id"),
+            {"user_id": user_id}
+        ).mappings().fetchall()
+        return [Holdings_Store.to_holding(row) for row in rows]
+
+    @staticmethod
+    def list_holdings_for_users(session, user_ids):
+        """
+        Holdings of several users in one query
+        return: dict of user_id -> list of holdings
+        """
+        holdings = {user_id: [] for user_id in user_ids}
+        if not holdings:
+            return holdings
+        rows = session.execute(
+            text(f"SELECT {Holdings_Store.COLUMNS} FROM holdings WHERE user_id = ANY(:user_ids) "
+                 "ORDER BY user_id, holding_id"),
+            {"user_ids": list(holdings)}
+        ).mappings().fetchall()
+        for row in rows:
+            holdings[row['user_id']].append(Holdings_Store.to_holding(row))
+        return holdings
+
+    @staticmethod
+    def load_columns(session, user_ids):
+        """
+        Holdings of several users as columns for Vector_Analytics (no per-holding dicts or Decimals)
+        return: dict of column name -> list, rows ordered by user_id, holding_id
+        """
+        names = ('user_id', 'ticker', 'quantity', 'buy_price', 'value', 'gain', 'change_percent')
+        rows = []
+        if user_ids:
+            rows = session.execute(
+                text("""
+                    SELECT user_id, ticker, quantity::float8, buy_price::float8, COALESCE(value, 0)::float8,
+                           COALESCE(gain, 0)::float8, COALESCE(change_percent, 0)::float8
+                    FROM holdings WHERE user_id = ANY(:user_ids)
+                    ORDER BY user_id, holding_id
+                """),
+                {"user_ids": list(user_ids)}
+            ).fetchall()
+        columns = list(zip(*rows)) or [()] * len(names)
+        return {name: list(column) for name, column in zip(names, columns)}
+
+    @staticmethod
+    def materialize(portfolio_meta, holdings):
+        """
+        Build the portfolio document (name, totals, holdings) from portfolio_files metadata and stocks rows
+        """
+        portfolio_data = {key: value for key, value in (portfolio_meta or {}).items() if key != 'holdings'}
+        portfolio_data['holdings'] = holdings
+        portfolio_data['total_investment'] = round(sum(h['buy_price'] * h['quantity'] for h in holdings), 2)
+        portfolio_data['total_value'] = round(sum(h['value'] for h in holdings), 2)
+        portfolio_data['total_gain_loss'] = round(sum(h['gain'] for h in holdings), 2)
+        return portfolio_data
+
+    @staticmethod
+    def add(session, user_id, ticker, quantity, buy_price, company_name='', current_price=0.0,
+            value=0.0, gain=0.0, change_percent=0.0, now=None):
+        """
+        Insert one holding with the next free holding_id (index lookup on idx_stocks_user_holding)
+        The user's portfolio_files row is locked first (as bump_version does), so concurrent adds of one user
+        take turns and each one's MAX(holding_id) sees the holdings committed before it
+        return: the new holding, or None when the user already holds ticker
+        """
+        now = now or datetime.utcnow()
+        # Separate statement: the INSERT below needs a snapshot taken after the lock is granted
+        session.execute(
+            text("SELECT 1 FROM portfolio_files WHERE user_id = :user_id FOR UPDATE"), {"user_id": user_id})
+        row = session.execute(
+            text(f"""
+                WITH s AS (
+                    INSERT INTO stocks (user_id, holding_id, ticker, company_name, quantity, buy_price,
+                                        current_price, value, gain, change_percent, created_at, updated_at)
+                    SELECT :user_id, COALESCE(MAX(holding_id), -1) + 1, :ticker, :company_name, :quantity, :buy_price,
+                           :current_price, :value, :gain, :change_percent, :now, :now
+                    FROM stocks WHERE user_id = :user_id
+                    ON CONFLICT (user_id, ticker) DO NOTHING
+                    RETURNING *
+                )
+                SELECT {Holdings_Store.VALUED_COLUMNS} FROM s LEFT JOIN quotes q ON q.ticker = s.ticker
+            """),
+            {
+                "user_id": user_id,
+                "ticker": ticker,
+                "company_name": company_name,
+                "quantity": quantity,
+                "buy_price": buy_price,
+                "current_price": current_price,
+                "value": value,
+                "gain": gain,
+                "change_percent": Holdings_Store.clamp_change_percent(change_percent),
+                "now": now
+            }
+        ).mappings().fetchone()
+        return Holdings_Store.to_holding(row) if row else None
+
+    @staticmethod
+    def update(session, user_id, holding_id, quantity=None, buy_price=None, now=None):
+        """
+        Update quantity and / or buy_price of one holding, value and gain follow once a price is known
+        return: {'updated_investment': holding} or {'error': ...}
+        """
+        if quantity is not None and (not isinstance(quantity, (int, float)) or quantity < 0):
+            return {'error': 'Invalid quantity value'}
+        if buy_price is not None and (not isinstance(buy_price, (int, float)) or buy_price < 0):
+            return {'error': 'Invalid buy_price value'}
+        if not str(holding_id).isdigit():
+            return {'error': f'Investment with ID {holding_id} not found'}
+        row = session.execute(
+            text(f"""
+                WITH s AS (
+                    UPDATE stocks SET
+                        quantity = COALESCE(:quantity, quantity),
+                        buy_price = COALESCE(:buy_price, buy_price),
+                        value = CASE WHEN current_price > 0
+                                     THEN COALESCE(:quantity, quantity) * current_price ELSE value END,
+                        gain = CASE WHEN current_price > 0
+                                    THEN COALESCE(:quantity, quantity) * (current_price - COALESCE(:buy_price, buy_price))
+                                    ELSE gain END,
+                        updated_at = :now
+                    WHERE user_id = :user_id AND holding_id = :holding_id
+                    RETURNING *
+                )
+                SELECT {Holdings_Store.VALUED_COLUMNS} FROM s LEFT JOIN quotes q ON q.ticker = s.ticker
+            """),
+            {
+                "user_id": user_id,
+                "holding_id": int(holding_id),
+                "quantity": quantity,
+                "buy_price": buy_price,
+                "now": now or datetime.utcnow()
+            }
+        ).mappings().fetchone()
+        if not row:
+            return {'error': f'Investment with ID {holding_id} not found'}
+        return {'updated_investment': Holdings_Store.to_holding(row)}
+
+    @staticmethod
+    def delete(session, user_id, holding_id):
+        """
+        return: {'deleted_ticker': ticker} or {'error': ...}
+        """
+        row = None
+        if str(holding_id).isdigit():
+            row = session.execute(
+                text("DELETE FROM stocks WHERE user_id = :user_id AND holding_id = :holding_id RETURNING ticker"),
+                {"user_id": user_id, "holding_id": int(holding_id)}
+            ).fetchone()
+        if not row:
+            return {'error': f'Investment with ID {holding_id} not found'}
+        return {'deleted_ticker': row.ticker}
+
+    @staticmethod
+    def bump_version(session, user_ids, now=None):
+        """
+        Mark a holdings change for users (row locks portfolio_files until commit, so versions are serialized)
+        return: dict of user_id -> new holdings_version
+        """
+        if not user_ids:
+            return {}
+        rows = session.execute(
+            # Rows are locked in user_id order so concurrent writes cannot deadlock
+            text("""
+                UPDATE portfolio_files p SET holdings_version = p.holdings_version + 1, updated_at = :now
+                FROM (
+                    SELECT user_id FROM portfolio_files WHERE user_id = ANY(:user_ids)
+                    ORDER BY user_id FOR UPDATE
+                ) locked
+                WHERE p.user_id = locked.user_id
+                RETURNING p.user_id, p.holdings_version
+            """),
+            {"user_ids": list(user_ids), "now": now or datetime.utcnow()}
+        ).fetchall()
+        return {row.user_id: row.holdings_version for row in rows}
+
+    @staticmethod
+    def versions(session, user_ids, ticker=None):
+        """
+        Current versions of users' portfolios, read in one statement (one snapshot):
+        holdings_version and updated_at of portfolio_files, quote_version (sum of the held tickers' quote versions)
+        and ticker_version (the quote version of `ticker`, held or not, 0 without a quote)
+        return: dict of user_id -> row
+        """
+        if not user_ids:
+            return {}
+        rows = session.execute(
+            text("""
+                SELECT p.user_id, p.holdings_version, p.updated_at,
+                       COALESCE((SELECT SUM(q.version) FROM stocks s JOIN quotes q ON q.ticker = s.ticker
+                                 WHERE s.user_id = p.user_id), 0)::bigint AS quote_version,
+                       COALESCE((SELECT version FROM quotes WHERE ticker = :ticker), 0) AS ticker_version
+                FROM portfolio_files p WHERE p.user_id = ANY(:user_ids)
+            """),
+            {"user_ids": list(user_ids), "ticker": ticker}
+        ).fetchall()
+        return {row.user_id: row for row in rows}
+
+    @staticmethod
+    def users_with_moved_prices(session, limit):
+        """
+        Users whose stored portfolio summary is older than a quote of a ticker they hold (or who have none yet)
+        return: up to `limit` user_ids
+        """
+        rows = session.execute(
+            text("""
+                SELECT s.user_id FROM stocks s
+                JOIN quotes q ON q.ticker = s.ticker
+                LEFT JOIN portfolio_summaries ps ON ps.user_id = s.user_id
+                GROUP BY s.user_id, ps.updated_at
+                HAVING ps.updated_at IS NULL OR MAX(q.updated_at) > ps.updated_at
+                ORDER BY s.user_id
+                LIMIT :limit
+            """),
+            {"limit": int(limit)}
+        ).fetchall()
+        return [row.user_id for row in rows]
+
+    @staticmethod
+    def update_price(session, ticker, price, change_percent, now=None):
+        """
+        Store the latest quote of ticker and bump its version (a single-row upsert on quotes,
+        no holding and no portfolio_files row is written)
+        return: dict of user_id -> holding valued at the new quote, empty when price and change are unchanged
+        """
+        changed = session.execute(
+            text("""
+                INSERT INTO quotes (ticker, price, change_percent, updated_at, version)
+                VALUES (:ticker, :price, :change_percent, :updated_at, 1)
+                ON CONFLICT (ticker) DO UPDATE SET
+                    price = EXCLUDED.price, change_percent = EXCLUDED.change_percent, updated_at = EXCLUDED.updated_at,
+                    version = quotes.version + 1
+                WHERE (quotes.price, quotes.change_percent) IS DISTINCT FROM (EXCLUDED.price, EXCLUDED.change_percent)
+                RETURNING ticker
+            """),
+            {
+                "ticker": ticker,
+                "price": price,
+                "change_percent": Holdings_Store.clamp_change_percent(change_percent),
+                "updated_at": now or datetime.utcnow()
+            }
+        ).fetchone()
+        if not changed:
+            return {}
+        # Holders are read through idx_stocks_ticker, their value and gain are derived by the view
+        rows = session.execute(
+            text(f"SELECT {Holdings_Store.COLUMNS} FROM holdings WHERE ticker = :ticker"), {"ticker": ticker}
+        ).mappings().fetchall()
+        return {row['user_id']: Holdings_Store.to_holding(row) for row in rows}
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+
+class Session_User:
+    '''
+    The signed-in user as carried by the session cookie (no database row behind it)
+    '''
+    __slots__ = ('user_id', 'username')
+
+    def __init__(self, user_id, username):
+        self.user_id = user_id
+        self.username = username
+
+    @staticmethod
+    def expires_at(session_expiration):
+        """
+        Epoch seconds of a users.session_expiration value (naive UTC, .timestamp() alone would read it as local time)
+        """
+        return session_expiration.replace(tzinfo=timezone.utc).timestamp()
+
+
+class Portfolio_Document:
+    '''
+    Detached copy of a portfolio_files row, safe to share between requests and threads
+    '''
+    __slots__ = ('user_id', 'filename', 'file_content', 'holdings_version', 'updated_at')
+
+    def __init__(self, user_id, filename, file_content, holdings_version, updated_at):
+        self.user_id = user_id
+        self.filename = filename
+        self.file_content = file_content
+        self.holdings_version = holdings_version
+        self.updated_at = updated_at
+
+    @staticmethod
+    def from_row(row):
+        return Portfolio_Document(
+            row.user_id, row.filename, dict(row.file_content or {}), row.holdings_version, row.updated_at)
+
+
+class Portfolio_Cache:
+    '''
+    Short-TTL cache of portfolio documents (per process)
+    - Entries expire after `ttl` seconds, so changes made through other worker processes show up within ttl
+    - Writes and price updates in this process invalidate their users immediately
+    - A load that overlaps an invalidation is returned but not stored
+    - At most `max_size` users are kept, least recently used are evicted first
+    return: Portfolio_Document or None
+    '''
+    def __init__(self, ttl=2.0, max_size=4096, on_event=None):
+        self.ttl = float(ttl)
+        self.max_size = int(max_size)
+        # Optional callback(event) used for metrics: hit, miss
+        self.on_event = on_event
+        self._entries = OrderedDict()  # user_id -> (document, expires_at)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _record(self, event):
+        if self.on_event:
+            self.on_event(event)
+
+    def get(self, user_id, loader):
+        """
+        Cached document of user_id, loader() -> Portfolio_Document or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self._record('hit')
+                return entry[0]
+            generation = self._generation
+        self._record('miss')
+        document = loader()
+        if document is not None and self.ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (document, time.monotonic() + self.ttl)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+        return document
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
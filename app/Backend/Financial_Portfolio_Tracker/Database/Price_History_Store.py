@@ -0,0 +1,114 @@
+from datetime import date
+from sqlalchemy import text
+
+
+class Price_History_Store:
+    '''
+    Local daily OHLC bars, one narrow row per (symbol, day)
+    - Filled once from the upstream daily series, then only with newer bars
+    - Today's bar is also upserted from every refreshed GLOBAL_QUOTE (no extra upstream call)
+    return: bars as dicts {day, open, high, low, close, volume}, oldest first
+    '''
+    STEPS = [
+        """
+        CREATE TABLE IF NOT EXISTS daily_bars (
+            symbol VARCHAR(10) NOT NULL,
+            day DATE NOT NULL,
+            open DOUBLE PRECISION NOT NULL,
+            high DOUBLE PRECISION NOT NULL,
+            low DOUBLE PRECISION NOT NULL,
+            close DOUBLE PRECISION NOT NULL,
+            volume BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (symbol, day)
+        )
+        """
+    ]
+
+    @staticmethod
+    def migrate(engine):
+        with engine.begin() as connection:
+            for step in Price_History_Store.STEPS:
+                connection.execute(text(step))
+
+    @staticmethod
+    def _to_bar(row):
+        bar = dict(row)
+        bar['day'] = bar['day'].isoformat()
+        return bar
+
+    @staticmethod
+    def last_day(session, symbol):
+        """
+        return: date of the newest stored bar, or None (primary key lookup)
+        """
+        return session.execute(
+            text("SELECT MAX(day) FROM daily_bars WHERE symbol = :symbol"), {"symbol": symbol}
+        ).scalar()
+
+    @staticmethod
+    def upsert_bars(session, symbol, bars):
+        """
+        Insert or replace bars of one symbol with a single statement
+        return: number of bars written
+        """
+        if not bars:
+            return 0
+        session.execute(
+            text("""
+                INSERT INTO daily_bars (symbol, day, open, high, low, close, volume)
+                SELECT :symbol, * FROM unnest(CAST(:days AS DATE[]), CAST(:opens AS FLOAT8[]), CAST(:highs AS FLOAT8[]),
+                                              CAST(:lows AS FLOAT8[]), CAST(:closes AS FLOAT8[]), CAST(:volumes AS BIGINT[]))
+                ON CONFLICT (symbol, day) DO UPDATE SET
+                    open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                    close = EXCLUDED.close, volume = EXCLUDED.volume
+            """),
+            {
+                "symbol": symbol,
+                "days": [date.fromisoformat(str(bar['day'])) for bar in bars],
+                "opens": [bar['open'] for bar in bars],
+                "highs": [bar['high'] for bar in bars],
+                "lows": [bar['low'] for bar in bars],
+                "closes": [bar['close'] for bar in bars],
+                "volumes": [int(bar.get('volume') or 0) for bar in bars]
+            }
+        )
+        return len(bars)
+
+    @staticmethod
+    def bars(session, symbol, start=None, end=None, limit=5000):
+        """
+        Bars of one symbol between start and end (dates, inclusive), oldest first
+        The newest `limit` bars are returned when the range holds more
+        """
+        rows = session.execute(
+            text("""
+                SELECT * FROM (
+                    SELECT day, open, high, low, close, volume FROM daily_bars
+                    WHERE symbol = :symbol
+                      AND day >= COALESCE(CAST(:start AS DATE), '-infinity')
+                      AND day <= COALESCE(CAST(:end AS DATE), 'infinity')
+                    ORDER BY day DESC LIMIT :limit
+                ) newest ORDER BY day
+            """),
+            {"symbol": symbol, "start": start, "end": end, "limit": limit}
+        ).mappings().fetchall()
+        return [Price_History_Store._to_bar(row) for row in rows]
+
+    @staticmethod
+    def latest_bars(session, symbols):
+        """
+        Newest bar of each symbol in one query
+        return: dict of symbol -> bar
+        """
+        if not symbols:
+            return {}
+        rows = session.execute(
+            text("""
+                SELECT DISTINCT ON (symbol) symbol, day, open, high, low, close, volume
+                FROM daily_bars WHERE symbol = ANY(:symbols)
+                ORDER BY symbol, day DESC
+            """),
+            {"symbols": list(symbols)}
+        ).mappings().fetchall()
+        return {row['symbol']: Price_History_Store._to_bar(
+            {key: value for key, value in row.items() if key != 'symbol'}) for row in rows}
@@ -0,0 +1,206 @@
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from sqlalchemy import text
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON
+
+logger = logging.getLogger(__name__)
+
+
+class Shared_Quote_Store:
+    '''
+    Second quote cache tier (L2), shared by every worker process and replica through Postgres
+    - quote_cache is UNLOGGED: writes skip the WAL, the table is emptied after a crash (it only holds a cache)
+    - publish() upserts a quote (the newest fetch wins) and notifies the channel in the same statement
+    - A listener thread per process hands quotes published by other processes to on_quote(symbol, quote, fetched_at),
+      which stores them in the local tier (L1); after every (re)connect the recent rows are replayed the same way
+    - load() reads quotes for local misses
+    Notifications carry the quote when it fits the NOTIFY payload limit, otherwise the listener reads the row
+    return: quotes as (quote, fetched_at), fetched_at in epoch seconds
+    '''
+    CHANNEL = 'quote_cache'
+    # NOTIFY payloads must stay below 8000 bytes
+    MAX_PAYLOAD = 7900
+
+    STEPS = [
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS quote_cache (
+            symbol VARCHAR(10) PRIMARY KEY,
+            quote JSONB NOT NULL,
+            fetched_at DOUBLE PRECISION NOT NULL,
+            origin VARCHAR(80)
+        )
+        """
+    ]
+
+    PUBLISH_SQL = text("""
+        WITH stored AS (
+            INSERT INTO quote_cache (symbol, quote, fetched_at, origin)
+            VALUES (:symbol, CAST(:quote AS JSONB), :fetched_at, :origin)
+            ON CONFLICT (symbol) DO UPDATE SET
+                quote = EXCLUDED.quote, fetched_at = EXCLUDED.fetched_at, origin = EXCLUDED.origin
+            WHERE quote_cache.fetched_at < EXCLUDED.fetched_at
+            RETURNING symbol
+        )
+        SELECT pg_notify(:channel, :payload) FROM stored
+    """)
+
+    def __init__(self, connect, on_quote, max_age=300, on_event=None, poll_interval=5.0, reconnect_delay=5.0):
+        # connect() -> new DBAPI (psycopg2) connection, used only by the listener
+        self.connect = connect
+        self.on_quote = on_quote
+        # Rows older than this (seconds) are not worth loading into the local tier
+        self.max_age = float(max_age)
+        # Optional callback(event, count) used for metrics: hit, miss (load), notified (applied from another process)
+        self.on_event = on_event
+        self.poll_interval = float(poll_interval)
+        self.reconnect_delay = float(reconnect_delay)
+        self._host = socket.gethostname()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self):
+        """
+        Identity of this process in notifications (a pod name plus pid, recomputed after fork)
+        """
+        return f"{self._host}:{os.getpid()}"
+
+    def _record(self, event, count=1):
+        if self.on_event and count:
+            try:
+                self.on_event(event, count)
+            except Exception as e:
+                logger.warning("Shared quote store metrics error: %s", e)
+
+    @staticmethod
+    def migrate(engine):
+        with engine.begin() as connection:
+            for step in Shared_Quote_Store.STEPS:
+                connection.execute(text(step))
+
+    def publish(self, connection, symbol, quote, fetched_at):
+        """
+        Share a quote this process fetched, the notification is sent when the caller commits
+        return: True when it replaced an older row (and was announced)
+        """
+        quote_json = Fast_JSON.dumps(quote)
+        message = {'symbol': symbol, 'fetched_at': fetched_at, 'origin': self.origin}
+        payload = Fast_JSON.dumps({**message, 'quote': quote})
+        if len(payload.encode('utf-8')) > self.MAX_PAYLOAD:
+            payload = Fast_JSON.dumps(message)
+        row = connection.execute(self.PUBLISH_SQL, {
+            "symbol": symbol,
+            "quote": quote_json,
+            "fetched_at": fetched_at,
+            "origin": self.origin,
+            "channel": self.CHANNEL,
+            "payload": payload
+        }).fetchone()
+        return row is not None
+
+    def load(self, connection, symbols):
+        """
+        Quotes of symbols fetched within max_age seconds (primary key lookups)
+        return: dict of symbol -> (quote, fetched_at)
+        """
+        symbols = [symbol.upper() for symbol in symbols]
+        if not symbols:
+            return {}
+        rows = connection.execute(
+            text("SELECT symbol, quote, fetched_at FROM quote_cache WHERE symbol = ANY(:symbols) AND fetched_at > :oldest"),
+            {"symbols": symbols, "oldest": time.time() - self.max_age}
+        ).fetchall()
+        found = {row.symbol: (row.quote, row.fetched_at) for row in rows}
+        self._record('hit', len(found))
+        self._record('miss', len(symbols) - len(found))
+        return found
+
+    def start(self):
+        """
+        Start the listener thread once per process (safe to call on every request)
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='quote-cache-listener', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def reset_after_fork(self):
+        """
+        A forked worker listens on its own connection (started by start())
+        """
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self.connect()
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {self.CHANNEL}")
+                # Listening before the replay, so nothing published in between is lost
+                self._replay(cursor)
+                while not self._stopped.is_set():
+                    if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._handle(cursor, connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning("Shared quote listener error, reconnecting in %ss: %s", self.reconnect_delay, e)
+                self._stopped.wait(self.reconnect_delay)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def _replay(self, cursor):
+        """
+        Apply every recent row, covers notifications missed while disconnected
+        """
+        cursor.execute(
+            "SELECT symbol, quote, fetched_at FROM quote_cache WHERE fetched_at > %s AND origin IS DISTINCT FROM %s",
+            (time.time() - self.max_age, self.origin))
+        for symbol, quote, fetched_at in cursor.fetchall():
+            self._apply(symbol, quote, fetched_at)
+
+    def _handle(self, cursor, payload):
+        try:
+            message = Fast_JSON.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed quote notification: %.200s", payload)
+            return
+        if message.get('origin') == self.origin:
+            return
+        symbol, fetched_at, quote = message['symbol'], message['fetched_at'], message.get('quote')
+        if quote is None:
+            # Too large for the payload, read the row
+            cursor.execute("SELECT quote, fetched_at FROM quote_cache WHERE symbol = %s", (symbol,))
+            row = cursor.fetchone()
+            if row is None:
+                return
+            quote, fetched_at = row
+        self._apply(symbol, quote, fetched_at)
+
+    def _apply(self, symbol, quote, fetched_at):
+        try:
+            if self.on_quote(symbol, quote, fetched_at):
+                self._record('notified')
+        except Exception:
+            logger.exception("Error applying shared quote for %s", symbol)
@@ -0,0 +1,332 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot_Store:
+    '''
+    Append-only portfolio history in three retention tiers (timestamps are UTC)
+    - portfolio_snapshots: every saved summary, partitioned by day, kept raw_retention_days
+    - portfolio_snapshots_hourly: one row per user and hour, partitioned by month, kept hourly_retention_days
+    - portfolio_snapshots_daily: one row per user and day, kept daily_retention_days (0 = forever)
+    Rollup rows are upserted together with the raw insert, so every tier is always current
+    and a history read is one index range scan on the tier matching the requested resolution
+    return: history points from history()
+    '''
+    # Serializes partition maintenance across processes
+    LOCK_ID = 4207002
+    RESOLUTIONS = ('raw', 'hour', 'day')
+    # Upper bound on the points one history() call returns
+    MAX_POINTS = 2000
+
+    SNAPSHOT_COLUMNS = ("total_value, total_investment, total_gain_loss, total_gain_loss_percent, "
+                        "total_stocks, winning_stocks, losing_stocks, win_rate, concentration_risk")
+
+    STEPS = [
+        """
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            user_id INT NOT NULL,
+            ts TIMESTAMP NOT NULL,
+            total_value DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_investment DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_gain_loss DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_gain_loss_percent DECIMAL(8,4) NOT NULL DEFAULT 0,
+            total_stocks INTEGER NOT NULL DEFAULT 0,
+            winning_stocks INTEGER NOT NULL DEFAULT 0,
+            losing_stocks INTEGER NOT NULL DEFAULT 0,
+            win_rate DECIMAL(8,4) NOT NULL DEFAULT 0,
+            concentration_risk VARCHAR(20)
+        ) PARTITION BY RANGE (ts)
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_portfolio_snapshots_user_ts ON portfolio_snapshots(user_id, ts)",
+    ] + [
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id INT NOT NULL,
+            bucket TIMESTAMP NOT NULL,
+            samples INTEGER NOT NULL,
+            value_sum DECIMAL(20,2) NOT NULL,
+            value_min DECIMAL(15,2) NOT NULL,
+            value_max DECIMAL(15,2) NOT NULL,
+            last_ts TIMESTAMP NOT NULL,
+            total_value DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_investment DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_gain_loss DECIMAL(15,2) NOT NULL DEFAULT 0,
+            total_gain_loss_percent DECIMAL(8,4) NOT NULL DEFAULT 0,
+            total_stocks INTEGER NOT NULL DEFAULT 0,
+            winning_stocks INTEGER NOT NULL DEFAULT 0,
+            losing_stocks INTEGER NOT NULL DEFAULT 0,
+            win_rate DECIMAL(8,4) NOT NULL DEFAULT 0,
+            concentration_risk VARCHAR(20),
+            PRIMARY KEY (user_id, bucket)
+        ){partitioning}
+        """
+        for table, partitioning in (('portfolio_snapshots_hourly', ' PARTITION BY RANGE (bucket)'),
+                                    ('portfolio_snapshots_daily', ''))
+    ] + [
+        # Existing one-row-per-user summaries become the first daily points
+        f"""
+        INSERT INTO portfolio_snapshots_daily (user_id, bucket, samples, value_sum, value_min, value_max, last_ts,
+                                               {SNAPSHOT_COLUMNS})
+        SELECT user_id, date_trunc('day', COALESCE(updated_at, created_at)), 1, COALESCE(total_value, 0),
+               COALESCE(total_value, 0), COALESCE(total_value, 0), COALESCE(updated_at, created_at),
+               COALESCE(total_value, 0), COALESCE(total_investment, 0), COALESCE(total_gain_loss, 0),
+               COALESCE(total_gain_loss_percent, 0), COALESCE(total_stocks, 0), COALESCE(winning_stocks, 0),
+               COALESCE(losing_stocks, 0), COALESCE(win_rate, 0), concentration_risk
+        FROM portfolio_summaries
+        WHERE COALESCE(updated_at, created_at) IS NOT NULL
+        ON CONFLICT (user_id, bucket) DO NOTHING
+        """
+    ]
+
+    # Rollup upsert shared by both tiers: min / max / sum over the bucket, latest snapshot wins
+    ROLLUP = """
+        INSERT INTO {table} (user_id, bucket, samples, value_sum, value_min, value_max, last_ts, {columns})
+        SELECT user_id, date_trunc('{unit}', ts), 1, total_value, total_value, total_value, ts, {columns}
+        FROM snapshot
+        ON CONFLICT (user_id, bucket) DO UPDATE SET
+            samples = {table}.samples + 1,
+            value_sum = {table}.value_sum + EXCLUDED.value_sum,
+            value_min = LEAST({table}.value_min, EXCLUDED.value_min),
+            value_max = GREATEST({table}.value_max, EXCLUDED.value_max),
+            last_ts = GREATEST({table}.last_ts, EXCLUDED.last_ts),
+            {latest}
+    """
+
+    def __init__(self, raw_retention_days=2, hourly_retention_days=90, daily_retention_days=0,
+                 premake_days=7, maintenance_interval=3600):
+        self.raw_retention_days = int(raw_retention_days)
+        self.hourly_retention_days = int(hourly_retention_days)
+        self.daily_retention_days = int(daily_retention_days)
+        # Partitions are created this many days ahead, so inserts never wait on DDL
+        self.premake_days = max(int(premake_days), 1)
+        self.maintenance_interval = float(maintenance_interval)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._record_sql = self._build_record_sql()
+
+    def _build_record_sql(self):
+        columns = self.SNAPSHOT_COLUMNS
+        latest = ",\n            ".join(
+            f"{column} = CASE WHEN EXCLUDED.last_ts >= {{table}}.last_ts THEN EXCLUDED.{column} ELSE {{table}}.{column} END"
+            for column in columns.split(", ")
+        )
+        rollups = [
+            self.ROLLUP.format(table=table, unit=unit, columns=columns, latest=latest.format(table=table))
+            for table, unit in (('portfolio_snapshots_hourly', 'hour'), ('portfolio_snapshots_daily', 'day'))
+        ]
+        # One round trip for any number of users: raw insert plus both rollups (CTEs with side effects always run)
+        return text(f"""
+            WITH snapshot AS (
+                INSERT INTO portfolio_snapshots (user_id, ts, {columns})
+                SELECT * FROM unnest(
+                    CAST(:user_id AS INT[]), CAST(:ts AS TIMESTAMP[]), CAST(:total_value AS NUMERIC[]),
+                    CAST(:total_investment AS NUMERIC[]), CAST(:total_gain_loss AS NUMERIC[]),
+                    CAST(:total_gain_loss_percent AS NUMERIC[]), CAST(:total_stocks AS INT[]),
+                    CAST(:winning_stocks AS INT[]), CAST(:losing_stocks AS INT[]), CAST(:win_rate AS NUMERIC[]),
+                    CAST(:concentration_risk AS VARCHAR[]))
+                RETURNING user_id, ts, {columns}
+            ), hourly AS ({rollups[0]})
+            {rollups[1]}
+        """)
+
+    @staticmethod
+    def _day(moment):
+        return datetime(moment.year, moment.month, moment.day)
+
+    @staticmethod
+    def _month(moment):
+        return datetime(moment.year, moment.month, 1)
+
+    @staticmethod
+    def _next_month(moment):
+        return datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+
+    def _partitions(self, connection, parent):
+        """
+        return: dict of partition name -> (start, end) for the parent table
+        """
+        rows = connection.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :parent
+        """), {"parent": parent}).fetchall()
+        partitions = {}
+        for (name,) in rows:
+            try:
+                start = datetime.strptime(name.rsplit('_p', 1)[1], '%Y%m%d')
+            except (IndexError, ValueError):
+                continue  # Not created by maintain()
+            end = start + timedelta(days=1) if parent == 'portfolio_snapshots' else self._next_month(start)
+            partitions[name] = (start, end)
+        return partitions
+
+    def maintain(self, engine, now=None):
+        """
+        Create the partitions for the coming days / months and drop the ones past retention
+        return: (created, dropped) partition names
+        """
+        now = now or datetime.utcnow()
+        created, dropped = [], []
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": Snapshot_Store.LOCK_ID})
+            wanted = {}
+            today = self._day(now)
+            for offset in range(-1, self.premake_days + 1):
+                start = today + timedelta(days=offset)
+                wanted[f"portfolio_snapshots_p{start:%Y%m%d}"] = ('portfolio_snapshots', start, start + timedelta(days=1))
+            month = self._month(now)
+            for _ in range(2 + self.premake_days // 28):
+                wanted[f"portfolio_snapshots_hourly_p{month:%Y%m%d}"] = (
+                    'portfolio_snapshots_hourly', month, self._next_month(month))
+                month = self._next_month(month)
+
+            existing = {**self._partitions(connection, 'portfolio_snapshots'),
+                        **self._partitions(connection, 'portfolio_snapshots_hourly')}
+            for name, (parent, start, end) in wanted.items():
+                if name not in existing:
+                    connection.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+                    created.append(name)
+
+            cutoffs = {
+                'portfolio_snapshots': today - timedelta(days=self.raw_retention_days),
+                'portfolio_snapshots_hourly': today - timedelta(days=self.hourly_retention_days)
+            }
+            for name, (start, end) in existing.items():
+                parent = 'portfolio_snapshots_hourly' if name.startswith('portfolio_snapshots_hourly_') else 'portfolio_snapshots'
+                if end <= cutoffs[parent]:
+                    connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    dropped.append(name)
+            if self.daily_retention_days > 0:
+                connection.execute(
+                    text("DELETE FROM portfolio_snapshots_daily WHERE bucket < :cutoff"),
+                    {"cutoff": today - timedelta(days=self.daily_retention_days)}
+                )
+        if created or dropped:
+            logger.info("Snapshot partitions created: %s, dropped: %s", created, dropped)
+        return created, dropped
+
+    def migrate(self, engine):
+        """
+        Create the snapshot tables (idempotent) and their current partitions
+        """
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": Snapshot_Store.LOCK_ID})
+            for step in Snapshot_Store.STEPS:
+                connection.execute(text(step))
+        return self.maintain(engine)
+
+    def start(self, maintain):
+        """
+        Run maintain() every maintenance_interval seconds in a daemon thread (once per process)
+        Partition DDL never runs inside a request transaction
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(maintain,), name='snapshot-maintenance', daemon=True)
+            self._thread.start()
+
+    def _run(self, maintain):
+        stopped = threading.Event()
+        while not stopped.wait(self.maintenance_interval):
+            try:
+                maintain()
+            except Exception:
+                logger.exception("Snapshot maintenance error")
+
+    def record(self, session, user_id, summary_data, ts=None):
+        """
+        Append one snapshot and fold it into the hourly and daily tiers, in the caller's transaction
+        """
+        self.record_many(session, {user_id: (summary_data, ts or datetime.utcnow())})
+
+    def record_many(self, session, batch):
+        """
+        record() for several users with one statement
+        batch: dict of user_id -> (summary_data, ts), one snapshot per user
+        """
+        if not batch:
+            return
+        columns = {name: [] for name in ('user_id', 'ts', *self.SNAPSHOT_COLUMNS.split(', '))}
+        for user_id, (summary_data, ts) in batch.items():
+            overview = summary_data.get('portfolio_overview', {})
+            performance = summary_data.get('performance_metrics', {})
+            risk = summary_data.get('risk_metrics', {})
+            row = {
+                "user_id": user_id,
+                "ts": ts,
+                "total_value": overview.get('total_value', 0.0),
+                "total_investment": overview.get('total_investment', 0.0),
+                "total_gain_loss": overview.get('total_gain_loss', 0.0),
+                "total_gain_loss_percent": overview.get('total_gain_loss_percent', 0.0),
+                "total_stocks": overview.get('total_stocks', 0),
+                "winning_stocks": performance.get('winning_stocks', 0),
+                "losing_stocks": performance.get('losing_stocks', 0),
+                "win_rate": performance.get('win_rate', 0.0),
+                "concentration_risk": risk.get('concentration_risk', 'Low')
+            }
+            for name, value in row.items():
+                columns[name].append(value)
+        session.execute(self._record_sql, columns)
+
+    def pick_resolution(self, start, end, now=None):
+        """
+        Finest tier that still holds the whole range and keeps the answer under MAX_POINTS
+        """
+        now = now or datetime.utcnow()
+        span_hours = (end - start).total_seconds() / 3600
+        if start >= now - timedelta(days=self.raw_retention_days) and span_hours <= 24:
+            return 'raw'
+        if start >= now - timedelta(days=self.hourly_retention_days) and span_hours <= self.MAX_POINTS:
+            return 'hour'
+        return 'day'
+
+    def history(self, session, user_id, start, end, resolution='auto'):
+        """
+        Snapshots of a user between start and end (inclusive), oldest first
+        resolution: raw, hour, day or auto (pick_resolution)
+        return: (resolution, list of points)
+        """
+        if resolution == 'auto':
+            resolution = self.pick_resolution(start, end)
+        if resolution == 'raw':
+            query = f"""
+                SELECT * FROM (
+                    SELECT ts AS date, {self.SNAPSHOT_COLUMNS} FROM portfolio_snapshots
+                    WHERE user_id = :user_id AND ts BETWEEN :start AND :end
+                    ORDER BY ts DESC LIMIT :limit
+                ) latest ORDER BY date
+            """
+        else:
+            table = 'portfolio_snapshots_hourly' if resolution == 'hour' else 'portfolio_snapshots_daily'
+            query = f"""
+                SELECT * FROM (
+                    SELECT bucket AS date, {self.SNAPSHOT_COLUMNS}, samples,
+                           value_min, value_max, value_sum / samples AS value_avg
+                    FROM {table}
+                    WHERE user_id = :user_id AND bucket BETWEEN date_trunc('{resolution}', CAST(:start AS TIMESTAMP)) AND :end
+                    ORDER BY bucket DESC LIMIT :limit
+                ) latest ORDER BY date
+            """
+        rows = session.execute(
+            text(query), {"user_id": user_id, "start": start, "end": end, "limit": self.MAX_POINTS}
+        ).mappings().fetchall()
+        points = []
+        for row in rows:
+            point = {}
+            for key, value in row.items():
+                if isinstance(value, datetime):
+                    value = value.isoformat()
+                elif key not in ('total_stocks', 'winning_stocks', 'losing_stocks', 'samples', 'concentration_risk'):
+                    value = float(value)
+                point[key] = value
+            points.append(point)
+        return resolution, points
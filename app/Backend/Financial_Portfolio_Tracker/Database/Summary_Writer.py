@@ -0,0 +1,267 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import text
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON
+
+logger = logging.getLogger(__name__)
+
+
+class Summary_Writer:
+    '''
+    Write-behind persistence of portfolio summaries (per process)
+    - submit() only records the user's latest summary, handlers never wait on the database
+    - Summaries submitted within flush_interval seconds are coalesced per user, only the last one is written
+    - A background thread hands the pending summaries to write(batch) in batches of at most max_batch users
+    - A failed batch is retried up to max_attempts times unless a newer summary replaced it meanwhile
+    - stop() (registered with atexit) writes whatever is still pending
+    - Optional sweep() runs in the same thread every sweep_interval seconds, for summaries that go stale
+      without a write of their own (price moves), it writes them itself and returns how many
+    batch: dict of user_id -> (summary_data, ts), ts is the UTC time the summary was computed
+    '''
+    # One row per user: the newest summary wins, also when batches of several processes race
+    UPSERT_SQL = text("""
+        INSERT INTO portfolio_summaries AS s (
+            user_id, total_stocks, total_value, total_investment, total_gain_loss, total_gain_loss_percent,
+            avg_position_size, winning_stocks, losing_stocks, win_rate,
+            best_performer_ticker, best_performer_gain, best_performer_percent,
+            worst_performer_ticker, worst_performer_gain, worst_performer_percent,
+            largest_position_weight, concentration_risk, top_holdings, stock_breakdown, created_at, updated_at
+        )
+        SELECT user_id, total_stocks, total_value, total_investment, total_gain_loss, total_gain_loss_percent,
+               avg_position_size, winning_stocks, losing_stocks, win_rate,
+               best_performer_ticker, best_performer_gain, best_performer_percent,
+               worst_performer_ticker, worst_performer_gain, worst_performer_percent,
+               largest_position_weight, concentration_risk, top_holdings::json, stock_breakdown::json, ts, ts
+        FROM unnest(
+            CAST(:user_id AS INT[]), CAST(:total_stocks AS INT[]), CAST(:total_value AS NUMERIC[]),
+            CAST(:total_investment AS NUMERIC[]), CAST(:total_gain_loss AS NUMERIC[]),
+            CAST(:total_gain_loss_percent AS NUMERIC[]), CAST(:avg_position_size AS NUMERIC[]),
+            CAST(:winning_stocks AS INT[]), CAST(:losing_stocks AS INT[]), CAST(:win_rate AS NUMERIC[]),
+            CAST(:best_performer_ticker AS VARCHAR[]), CAST(:best_performer_gain AS NUMERIC[]),
+            CAST(:best_performer_percent AS NUMERIC[]), CAST(:worst_performer_ticker AS VARCHAR[]),
+            CAST(:worst_performer_gain AS NUMERIC[]), CAST(:worst_performer_percent AS NUMERIC[]),
+            CAST(:largest_position_weight AS NUMERIC[]), CAST(:concentration_risk AS VARCHAR[]),
+            CAST(:top_holdings AS TEXT[]), CAST(:stock_breakdown AS TEXT[]), CAST(:ts AS TIMESTAMP[])
+        ) AS batch(user_id, total_stocks, total_value, total_investment, total_gain_loss, total_gain_loss_percent,
+                   avg_position_size, winning_stocks, losing_stocks, win_rate,
+                   best_performer_ticker, best_performer_gain, best_performer_percent,
+                   worst_performer_ticker, worst_performer_gain, worst_performer_percent,
+                   largest_position_weight, concentration_risk, top_holdings, stock_breakdown, ts)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_stocks = EXCLUDED.total_stocks,
+            total_value = EXCLUDED.total_value,
+            total_investment = EXCLUDED.total_investment,
+            total_gain_loss = EXCLUDED.total_gain_loss,
+            total_gain_loss_percent = EXCLUDED.total_gain_loss_percent,
+            avg_position_size = EXCLUDED.avg_position_size,
+            winning_stocks = EXCLUDED.winning_stocks,
+            losing_stocks = EXCLUDED.losing_stocks,
+            win_rate = EXCLUDED.win_rate,
+            best_performer_ticker = COALESCE(EXCLUDED.best_performer_ticker, s.best_performer_ticker),
+            best_performer_gain = COALESCE(EXCLUDED.best_performer_gain, s.best_performer_gain),
+            best_performer_percent = COALESCE(EXCLUDED.best_performer_percent, s.best_performer_percent),
+            worst_performer_ticker = COALESCE(EXCLUDED.worst_performer_ticker, s.worst_performer_ticker),
+            worst_performer_gain = COALESCE(EXCLUDED.worst_performer_gain, s.worst_performer_gain),
+            worst_performer_percent = COALESCE(EXCLUDED.worst_performer_percent, s.worst_performer_percent),
+            largest_position_weight = EXCLUDED.largest_position_weight,
+            concentration_risk = EXCLUDED.concentration_risk,
+            top_holdings = EXCLUDED.top_holdings,
+            stock_breakdown = EXCLUDED.stock_breakdown,
+            updated_at = EXCLUDED.updated_at
+        WHERE s.updated_at IS NULL OR s.updated_at <= EXCLUDED.updated_at
+    """)
+
+    def __init__(self, write, flush_interval=0.5, max_batch=500, max_attempts=3, on_event=None,
+                 sweep=None, sweep_interval=60.0):
+        self.write = write
+        self.flush_interval = float(flush_interval)
+        self.max_batch = max(int(max_batch), 1)
+        self.max_attempts = max(int(max_attempts), 1)
+        # Optional callback(event, count) used for metrics: queued, coalesced, written, failed, dropped, swept
+        self.on_event = on_event
+        self.sweep = sweep
+        self.sweep_interval = float(sweep_interval)
+        self._pending = {}  # user_id -> (summary_data, ts, attempts)
+        self._writing = {}  # Taken by the running flush, not committed yet
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        atexit.register(self.stop)
+
+    def _record(self, event, count=1):
+        if self.on_event and count:
+            self.on_event(event, count)
+
+    def submit(self, user_id, summary_data, ts=None):
+        """
+        Queue the user's latest summary, replacing one that is still pending
+        """
+        with self._condition:
+            replaced = user_id in self._pending
+            self._pending[user_id] = (summary_data, ts or datetime.utcnow(), 0)
+            self._condition.notify()
+        self._record('coalesced' if replaced else 'queued')
+
+    def pending(self, user_id):
+        """
+        The user's summary that is not written yet as (summary_data, ts), or None
+        """
+        with self._condition:
+            entry = self._pending.get(user_id) or self._writing.get(user_id)
+        return entry[:2] if entry else None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def start(self):
+        """
+        Run the flush loop in a daemon thread (once per process)
+        """
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='summary-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_sweep = time.monotonic() + self.sweep_interval
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    timeout = next_sweep - time.monotonic() if self.sweep else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                pending = bool(self._pending)
+            if pending:
+                # Let a burst of updates collapse before writing
+                time.sleep(self.flush_interval)
+                self.flush()
+            if self.sweep and time.monotonic() >= next_sweep:
+                next_sweep = time.monotonic() + self.sweep_interval
+                self._sweep()
+
+    def _sweep(self):
+        try:
+            self._record('swept', self.sweep())
+        except Exception:
+            logger.exception("Error sweeping portfolio summaries")
+
+    def flush(self):
+        """
+        Write every pending summary now
+        return: number of summaries written
+        """
+        with self._condition:
+            taken, self._pending = self._pending, {}
+            self._writing = {**self._writing, **taken}
+        written = 0
+        items = list(taken.items())
+        for start in range(0, len(items), self.max_batch):
+            chunk = dict(items[start:start + self.max_batch])
+            try:
+                self.write({user_id: (summary_data, ts) for user_id, (summary_data, ts, _) in chunk.items()})
+                written += len(chunk)
+            except Exception:
+                logger.exception("Error writing %d portfolio summaries", len(chunk))
+                self._record('failed', len(chunk))
+                self._requeue(chunk)
+            finally:
+                with self._condition:
+                    for user_id, entry in chunk.items():
+                        if self._writing.get(user_id) is entry:
+                            del self._writing[user_id]
+        self._record('written', written)
+        return written
+
+    def _requeue(self, chunk):
+        dropped = 0
+        with self._condition:
+            for user_id, (summary_data, ts, attempts) in chunk.items():
+                if user_id in self._pending:
+                    continue  # A newer summary is already queued
+                if attempts + 1 >= self.max_attempts:
+                    dropped += 1
+                    continue
+                self._pending[user_id] = (summary_data, ts, attempts + 1)
+            if self._pending:
+                self._condition.notify()
+        if dropped:
+            logger.error("Dropped %d portfolio summaries after %d failed writes", dropped, self.max_attempts)
+            self._record('dropped', dropped)
+
+    def stop(self):
+        """
+        Stop the flush loop and write what is still pending
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def reset_after_fork(self):
+        """
+        A forked worker starts with an empty queue and its own thread (started by start())
+        """
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._writing = {}
+        self._thread = None
+        self._stopping = False
+
+    @staticmethod
+    def upsert(session, batch):
+        """
+        Insert or update the portfolio_summaries row of every user in batch with one statement
+        """
+        if not batch:
+            return 0
+        columns = {name: [] for name in (
+            'user_id', 'total_stocks', 'total_value', 'total_investment', 'total_gain_loss', 'total_gain_loss_percent',
+            'avg_position_size', 'winning_stocks', 'losing_stocks', 'win_rate',
+            'best_performer_ticker', 'best_performer_gain', 'best_performer_percent',
+            'worst_performer_ticker', 'worst_performer_gain', 'worst_performer_percent',
+            'largest_position_weight', 'concentration_risk', 'top_holdings', 'stock_breakdown', 'ts')}
+        for user_id, (summary_data, ts) in batch.items():
+            overview = summary_data.get('portfolio_overview', {})
+            performance = summary_data.get('performance_metrics', {})
+            risk = summary_data.get('risk_metrics', {})
+            best = performance.get('best_performer') or {}
+            worst = performance.get('worst_performer') or {}
+            row = {
+                'user_id': user_id,
+                'total_stocks': overview.get('total_stocks', 0),
+                'total_value': overview.get('total_value', 0.0),
+                'total_investment': overview.get('total_investment', 0.0),
+                'total_gain_loss': overview.get('total_gain_loss', 0.0),
+                'total_gain_loss_percent': overview.get('total_gain_loss_percent', 0.0),
+                'avg_position_size': overview.get('avg_position_size', 0.0),
+                'winning_stocks': performance.get('winning_stocks', 0),
+                'losing_stocks': performance.get('losing_stocks', 0),
+                'win_rate': performance.get('win_rate', 0.0),
+                'best_performer_ticker': best.get('ticker'),
+                'best_performer_gain': best.get('gain_loss'),
+                'best_performer_percent': best.get('change_percent'),
+                'worst_performer_ticker': worst.get('ticker'),
+                'worst_performer_gain': worst.get('gain_loss'),
+                'worst_performer_percent': worst.get('change_percent'),
+                'largest_position_weight': risk.get('largest_position_weight', 0.0),
+                'concentration_risk': risk.get('concentration_risk', 'Low'),
+                'top_holdings': Fast_JSON.dumps(summary_data.get('top_holdings', [])),
+                'stock_breakdown': Fast_JSON.dumps(summary_data.get('stock_breakdown', [])),
+                'ts': ts
+            }
+            for name, value in row.items():
+                columns[name].append(value)
+        session.execute(Summary_Writer.UPSERT_SQL, columns)
+        return len(batch)
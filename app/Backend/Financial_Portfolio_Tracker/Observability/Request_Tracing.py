@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:  # Tracing still feeds the Prometheus histogram and the slow request log
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    '''
+    Stage timings of one request (or one background job) on the current thread
+    return: spans as dicts {stage, start, seconds, depth, attributes}, start relative to the trace start
+    '''
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.started_ns = time.time_ns()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self.depth = 0
+
+    def breakdown(self):
+        """
+        Total seconds and count per stage, slowest first (nested stages are also counted in their parent)
+        """
+        stages = {}
+        for span in self.spans:
+            total = stages.setdefault(span['stage'], {'seconds': 0.0, 'count': 0})
+            total['seconds'] += span['seconds']
+            total['count'] += 1
+        return dict(sorted(stages.items(), key=lambda item: -item[1]['seconds']))
+
+
+class Request_Tracer:
+    '''
+    Lightweight per-stage tracing
+    - begin() / end() bracket a request on the current thread, job() a background task
+    - span(stage) times a block, record(stage, seconds) reports a timing measured elsewhere (callbacks)
+    - Every span goes to on_span(trace_name, stage, seconds), also outside a trace
+    - Traces slower than slow_seconds are logged with their stage breakdown
+    - An optional exporter (OTLP_Exporter) receives every finished trace
+    return: finished Trace from end()
+    '''
+    def __init__(self, on_span=None, slow_seconds=1.0, exporter=None, background_name='background'):
+        self.on_span = on_span
+        self.slow_seconds = float(slow_seconds)
+        self.exporter = exporter
+        self.background_name = background_name
+        self._local = threading.local()
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def begin(self, name, **attributes):
+        trace = Trace(name, attributes)
+        self._local.trace = trace
+        return trace
+
+    def end(self, **attributes):
+        trace = self.current()
+        if trace is None:
+            return None
+        self._local.trace = None
+        trace.seconds = time.perf_counter() - trace.started
+        trace.attributes.update(attributes)
+        if self.slow_seconds > 0 and trace.seconds >= self.slow_seconds:
+            breakdown = {stage: {'seconds': round(total['seconds'], 6), 'count': total['count']}
+                         for stage, total in trace.breakdown().items()}
+            logger.warning(
+                "Slow %s took %.3fs: %s", trace.name, trace.seconds,
+                ", ".join(f"{stage}={total['seconds']:.3f}s/{total['count']}" for stage, total in breakdown.items()),
+                extra={'trace_seconds': round(trace.seconds, 6), 'stages': breakdown, 'trace_attributes': trace.attributes})
+        if self.exporter is not None:
+            try:
+                self.exporter.export(trace)
+            except Exception as e:
+                logger.warning("Trace export error: %s", e)
+        return trace
+
+    def _report(self, trace, stage, seconds):
+        if self.on_span:
+            try:
+                self.on_span(trace.name if trace else self.background_name, stage, seconds)
+            except Exception as e:
+                logger.warning("Tracing metrics error: %s", e)
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        trace = self.current()
+        started = time.perf_counter()
+        if trace is not None:
+            trace.depth += 1
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            if trace is not None:
+                trace.depth -= 1
+                trace.spans.append({'stage': stage, 'start': started - trace.started, 'seconds': seconds,
+                                    'depth': trace.depth, 'attributes': attributes})
+            self._report(trace, stage, seconds)
+
+    @contextmanager
+    def job(self, name, **attributes):
+        """
+        Trace a background job, or only a span when the thread already runs a trace
+        """
+        if self.current() is not None:
+            with self.span(name, **attributes):
+                yield
+            return
+        self.begin(name, **attributes)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def record(self, stage, seconds, **attributes):
+        """
+        Add a span that just ended after `seconds` (for timings reported through callbacks)
+        """
+        trace = self.current()
+        if trace is not None:
+            trace.spans.append({'stage': stage, 'start': time.perf_counter() - trace.started - seconds,
+                                'seconds': seconds, 'depth': trace.depth, 'attributes': attributes})
+        self._report(trace, stage, seconds)
+
+
+class OTLP_Exporter:
+    '''
+    Sends finished traces to an OpenTelemetry collector over OTLP/HTTP (e.g. http://localhost:4318/v1/traces)
+    - Spans are created after the request from the recorded timings, the request path never waits on it
+    - The SDK batches and sends them from its own thread
+    Needs opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http, create() returns None without them
+    '''
+    def __init__(self, endpoint, service_name):
+        provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        self._provider = provider
+        self._tracer = provider.get_tracer(__name__)
+
+    @staticmethod
+    def create(endpoint, service_name='portfolio-backend'):
+        if not endpoint:
+            return None
+        if otel_trace is None:
+            logger.warning("OTLP endpoint %s set but the opentelemetry packages are not installed", endpoint)
+            return None
+        return OTLP_Exporter(endpoint, service_name)
+
+    def export(self, trace):
+        root = self._tracer.start_span(
+            trace.name, start_time=trace.started_ns, attributes=self._attributes(trace.attributes))
+        context = otel_trace.set_span_in_context(root)
+        # Parent of each span: the latest open span one level up (spans are recorded when they end)
+        parents = {0: context}
+        for span in sorted(trace.spans, key=lambda span: (span['start'], span['depth'])):
+            started_ns = trace.started_ns + int(span['start'] * 1e9)
+            child = self._tracer.start_span(
+                span['stage'], context=parents.get(span['depth'], context), start_time=started_ns,
+                attributes=self._attributes(span['attributes']))
+            parents[span['depth'] + 1] = otel_trace.set_span_in_context(child)
+            child.end(end_time=started_ns + int(span['seconds'] * 1e9))
+        root.end(end_time=trace.started_ns + int(trace.seconds * 1e9))
+
+    @staticmethod
+    def _attributes(attributes):
+        return {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+                for key, value in attributes.items() if value is not None}
+
+    def shutdown(self):
+        self._provider.shutdown()
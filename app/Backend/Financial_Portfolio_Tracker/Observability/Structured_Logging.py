@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JSON_Formatter(logging.Formatter):
+    '''
+    One JSON object per line: ts, level, logger, thread, msg, exc plus every `extra={...}` field
+    '''
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return Fast_JSON.dumps(entry)
+
+
+class Sampling_Filter(logging.Filter):
+    '''
+    Keep only a fraction of the records of chatty loggers
+    - rates: dict of logger name (or parent name) -> fraction kept, the longest matching name wins
+    - WARNING and above are never dropped
+    '''
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._resolved = {}  # logger name -> rate
+
+    def rate(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class Non_Blocking_Queue_Handler(QueueHandler):
+    '''
+    QueueHandler that never blocks the logging thread
+    - The message is merged with its arguments here, JSON / text formatting and the stdout write
+      happen in the listener thread
+    - When the queue is full the record is dropped and counted
+    '''
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks cannot cross the queue, render them while they exist
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Structured_Logging:
+    '''
+    Process-wide logging setup driven by environment variables
+    - LOG_LEVEL: root level (default INFO), DEBUG enables per-holding and upstream payload logs
+    - LOG_FORMAT: json (default) or text
+    - LOG_SAMPLING: "logger=rate,..." fraction of records below WARNING kept per logger,
+      e.g. Financial_Portfolio_Tracker.Portfolio_Management=0.01
+    - LOG_QUEUE_SIZE: records buffered for the writer thread before new ones are dropped
+    Modules log through logging.getLogger(__name__) with %-style arguments (formatted only when a record is kept)
+    return: the root Non_Blocking_Queue_Handler
+    '''
+    TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s'
+
+    _handler = None
+    _listener = None
+    _env = None
+
+    @staticmethod
+    def parse_rates(value):
+        rates = {}
+        for item in (value or '').split(','):
+            name, _, rate = item.strip().partition('=')
+            if name and rate:
+                try:
+                    rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+                except ValueError:
+                    continue
+        return rates
+
+    @staticmethod
+    def configure(env=None):
+        env = os.environ if env is None else env
+        Structured_Logging._env = env
+        root = logging.getLogger()
+        if Structured_Logging._handler is not None:
+            root.removeHandler(Structured_Logging._handler)
+            if Structured_Logging._listener is not None:
+                Structured_Logging.stop()
+        else:
+            atexit.register(Structured_Logging.stop)
+
+        formatter = (logging.Formatter(Structured_Logging.TEXT_FORMAT)
+                     if env.get('LOG_FORMAT', 'json').lower() == 'text' else JSON_Formatter())
+        writer = logging.StreamHandler(sys.stdout)
+        writer.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=int(env.get('LOG_QUEUE_SIZE', '10000')))
+        handler = Non_Blocking_Queue_Handler(log_queue)
+        handler.addFilter(Sampling_Filter(Structured_Logging.parse_rates(env.get('LOG_SAMPLING'))))
+        root.addHandler(handler)
+        root.setLevel(env.get('LOG_LEVEL', 'INFO').upper())
+
+        listener = QueueListener(log_queue, writer)
+        listener.start()
+        Structured_Logging._handler = handler
+        Structured_Logging._listener = listener
+        return handler
+
+    @staticmethod
+    def reset_after_fork():
+        """
+        The writer thread does not survive fork: give the worker its own queue and thread
+        """
+        Structured_Logging._listener = None
+        return Structured_Logging.configure(Structured_Logging._env)
+
+    @staticmethod
+    def stop():
+        """
+        Flush queued records and stop the writer thread (registered with atexit)
+        """
+        listener = Structured_Logging._listener
+        Structured_Logging._listener = None
+        if listener is not None:
+            try:
+                listener.stop()
+            except queue.Full:
+                pass
+
+    @staticmethod
+    def dropped():
+        handler = Structured_Logging._handler
+        return handler.dropped if handler else 0
@@ -0,0 +1,281 @@
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from fractions import Fraction
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Vector_Analytics import Vector_Analytics
+
+logger = logging.getLogger(__name__)
+
+
+class Incremental_Analytics:
+    '''
+    Portfolio analytics for one user kept up to date with per-holding deltas
+    - Totals are exact running sums (Fraction), so they round like math.fsum in Portfolio_Summary
+    - Sorted indexes by value (top holdings) and change percent (best / worst performer)
+    - upsert / remove cost O(log n) plus a list insert, nothing is parsed or sorted again
+    - verify=True recomputes the full summary after every call and reports any difference
+    return: summary() -> same dict as Portfolio_Summary.full_summary(holdings())
+    '''
+    TOP_HOLDINGS = 5
+
+    def __init__(self, holdings=None, verify=False, on_mismatch=None):
+        self.verify = verify
+        # Optional callback(expected, actual) run when verification finds a difference
+        self.on_mismatch = on_mismatch
+        self.version = None
+        self._lock = threading.RLock()
+        self.load(holdings or [])
+
+    def load(self, holdings):
+        """
+        Rebuild the state from a full holdings list (order = tie-break order, like the full loop)
+        """
+        with self._lock:
+            self._entries = {}  # key -> entry, insertion order == position order
+            self._next_position = 0
+            self._total_value = Fraction(0)
+            self._total_investment = Fraction(0)
+            self._total_gain = Fraction(0)
+            self._winning = 0
+            self._losing = 0
+            self._by_value = []  # (-value, position, key)
+            self._by_change = []  # (change_percent, position, key)
+            for holding in holdings:
+                self.upsert(holding)
+
+    def _key(self, holding):
+        return holding['id'] if 'id' in holding else f"position-{self._next_position}"
+
+    def _add(self, key, holding, position):
+        investment = holding['buy_price'] * holding['quantity']
+        entry = {
+            'position': position,
+            'holding': holding,
+            'investment': investment,
+            'change_percent': Portfolio_Summary.parse_change_percent(holding['change_percent'])
+        }
+        self._entries[key] = entry
+        self._total_value += Fraction(holding['value'])
+        self._total_investment += Fraction(investment)
+        self._total_gain += Fraction(holding['gain'])
+        if holding['gain'] > 0:
+            self._winning += 1
+        elif holding['gain'] < 0:
+            self._losing += 1
+        insort(self._by_value, (-holding['value'], position, key))
+        insort(self._by_change, (entry['change_percent'], position, key))
+
+    def _subtract(self, key):
+        entry = self._entries[key]
+        holding = entry['holding']
+        position = entry['position']
+        self._total_value -= Fraction(holding['value'])
+        self._total_investment -= Fraction(entry['investment'])
+        self._total_gain -= Fraction(holding['gain'])
+        if holding['gain'] > 0:
+            self._winning -= 1
+        elif holding['gain'] < 0:
+            self._losing -= 1
+        del self._by_value[bisect_left(self._by_value, (-holding['value'], position, key))]
+        del self._by_change[bisect_left(self._by_change, (entry['change_percent'], position, key))]
+        return entry
+
+    def upsert(self, holding):
+        """
+        Add a holding or replace the one with the same id (keeps its position)
+        """
+        with self._lock:
+            key = self._key(holding)
+            if key in self._entries:
+                position = self._subtract(key)['position']
+            else:
+                position = self._next_position
+                self._next_position += 1
+            self._add(key, dict(holding), position)
+
+    def remove(self, holding_id):
+        with self._lock:
+            if holding_id in self._entries:
+                self._subtract(holding_id)
+                del self._entries[holding_id]
+
+    def holdings(self):
+        with self._lock:
+            return [entry['holding'] for entry in self._entries.values()]
+
+    def _performance(self, key):
+        entry = self._entries[key]
+        holding = entry['holding']
+        return {
+            'ticker': holding['ticker'],
+            'gain_loss': holding['gain'],
+            'change_percent': entry['change_percent'],
+            'value': holding['value'],
+            'weight': 0  # The full loop copies performers before weights are known
+        }
+
+    def _summary(self):
+        if not self._entries:
+            return Portfolio_Summary.empty_summary('No portfolio data available')
+        total_value = float(self._total_value)
+        breakdown = {}
+        for key, entry in self._entries.items():
+            performance = self._performance(key)
+            performance['weight'] = (performance['value'] / total_value * 100) if total_value > 0 else 0.0
+            breakdown[key] = performance
+        # Worst = lowest change percent, best = highest (earliest position wins ties in both)
+        worst_key = self._by_change[0][2]
+        best_key = self._by_change[bisect_left(self._by_change, (self._by_change[-1][0],))][2]
+        return Portfolio_Summary.build(
+            list(breakdown.values()),
+            total_value,
+            float(self._total_investment),
+            float(self._total_gain),
+            self._winning,
+            self._losing,
+            self._performance(best_key),
+            self._performance(worst_key),
+            [breakdown[key] for _, _, key in self._by_value[:self.TOP_HOLDINGS]]
+        )
+
+    def summary(self):
+        with self._lock:
+            result = self._summary()
+            if self.verify:
+                expected = Portfolio_Summary.full_summary({'holdings': self.holdings()})
+                if Portfolio_Summary.comparable(expected) != Portfolio_Summary.comparable(result):
+                    logger.error("Incremental analytics mismatch, using the full recompute: %s != %s", expected, result)
+                    if self.on_mismatch:
+                        self.on_mismatch(expected, result)
+                    self.load(self.holdings())
+                    return expected
+            return result
+
+
+class Analytics_Registry:
+    '''
+    Per-user Incremental_Analytics engines kept per process (LRU, max_users entries)
+    An engine's version is the (holdings_version, quote_version) pair it was computed at, holdings changes
+    bump the first and price ticks the second; an engine is only advanced with a delta when it is exactly
+    at the version before the change, otherwise (changed by another worker, evicted, first use) it is rebuilt
+    batch() covers many users without a current engine in one vectorized pass instead
+    return: summaries from apply() / summary()
+    '''
+    def __init__(self, max_users=1024, verify=False, on_event=None):
+        self.max_users = int(max_users)
+        self.verify = verify
+        # Optional callback(event) for metrics: delta, rebuild, cached, batch, mismatch
+        self.on_event = on_event
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                logger.warning("Analytics metrics error: %s", e)
+
+    def _get(self, user_id):
+        with self._lock:
+            engine = self._engines.get(user_id)
+            if engine is not None:
+                self._engines.move_to_end(user_id)
+            return engine
+
+    def _store(self, user_id, engine):
+        with self._lock:
+            self._engines[user_id] = engine
+            self._engines.move_to_end(user_id)
+            while len(self._engines) > self.max_users:
+                self._engines.popitem(last=False)
+
+    def has(self, user_id):
+        return self._get(user_id) is not None
+
+    def _rebuild(self, user_id, version, load_holdings):
+        engine = Incremental_Analytics(
+            load_holdings(), verify=self.verify, on_mismatch=lambda expected, actual: self.record('mismatch'))
+        engine.version = version
+        self._store(user_id, engine)
+        self.record('rebuild')
+        return engine
+
+    def _advance(self, user_id, previous, version, change):
+        """
+        Apply change(engine) when the engine is at `previous`
+        return: the advanced engine, or None when there is no engine at that version
+        """
+        engine = self._get(user_id)
+        if engine is None or version is None or engine.version != previous:
+            return None
+        with engine._lock:
+            change(engine)
+            engine.version = version
+        self.record('delta')
+        return engine
+
+    def apply(self, user_id, version, change, load_holdings, previous):
+        """
+        Advance a user's engine from `previous` to `version` with change(engine),
+        otherwise rebuild it with load_holdings() (which must already include the change)
+        """
+        engine = self._advance(user_id, previous, version, change)
+        if engine is None:
+            engine = self._rebuild(user_id, version, load_holdings)
+        return engine.summary()
+
+    def advance(self, user_id, previous, version, change):
+        """
+        apply() without the rebuild: an engine that is not at `previous` is dropped and rebuilt on its next read
+        (used by price ticks, which must not load the holdings of every holder)
+        return: True when the engine was advanced
+        """
+        if self._advance(user_id, previous, version, change) is not None:
+            return True
+        self.discard(user_id)
+        return False
+
+    def summary(self, user_id, version, load_holdings):
+        """
+        Summary at `version` without any change, rebuilt when the cached engine is not at that version
+        """
+        engine = self._get(user_id)
+        if engine is not None and engine.version == version:
+            self.record('cached')
+        else:
+            engine = self._rebuild(user_id, version, load_holdings)
+        return engine.summary()
+
+    def batch(self, user_ids, load_columns):
+        """
+        Summaries for users whose engine is missing or behind, computed with Vector_Analytics from
+        load_columns() (Holdings_Store.load_columns layout); no engine is built, their outdated
+        engines are dropped and rebuilt on the next single-user write or read
+        return: dict of user_id -> summary
+        """
+        if not user_ids:
+            return {}
+        columns = load_columns()
+        summaries = Vector_Analytics.batch_summaries_from_columns(columns, user_ids)
+        if self.verify:
+            holdings_by_user = Vector_Analytics.holdings_from_columns(columns)
+            for user_id in user_ids:
+                expected = Portfolio_Summary.full_summary({'holdings': holdings_by_user.get(user_id, [])})
+                if Portfolio_Summary.comparable(expected) != Portfolio_Summary.comparable(summaries[user_id]):
+                    logger.error("Vector analytics mismatch, using the full recompute: %s != %s", expected, summaries[user_id])
+                    self.record('mismatch')
+                    summaries[user_id] = expected
+        for user_id in user_ids:
+            self.discard(user_id)
+            self.record('batch')
+        return summaries
+
+    def discard(self, user_id):
+        """
+        Forget a user's engine (the transaction that changed it was rolled back)
+        """
+        with self._lock:
+            self._engines.pop(user_id, None)
@@ -0,0 +1,166 @@
+import math
+from datetime import datetime
+
+
+class Portfolio_Summary:
+    '''
+    Full portfolio analytics computed from the holdings list (reference implementation)
+    Totals use math.fsum so the result does not depend on the order holdings are added in,
+    which lets Incremental_Analytics reproduce it exactly
+    return: Dictionary with portfolio analytics data
+    '''
+
+    @staticmethod
+    def empty_summary(error):
+        return {
+            'error': error,
+            'total_stocks': 0,
+            'total_value': 0.0,
+            'total_investment': 0.0,
+            'total_gain_loss': 0.0,
+            'total_gain_loss_percent': 0.0
+        }
+
+    @staticmethod
+    def parse_change_percent(change_percent):
+        """
+        '1.23%' or number -> float, anything else -> 0.0
+        """
+        try:
+            return float(change_percent.replace('%', '')) if isinstance(change_percent, str) else float(change_percent)
+        except (ValueError, TypeError, AttributeError):
+            return 0.0
+
+    @staticmethod
+    def holdings_of(portfolio_data):
+        """
+        Extract the holdings list from a portfolio document (or a plain list)
+        return: list, or None for an unknown format
+        """
+        if isinstance(portfolio_data, dict) and 'holdings' in portfolio_data:
+            return portfolio_data['holdings']
+        if isinstance(portfolio_data, list):
+            return portfolio_data
+        return None
+
+    @staticmethod
+    def concentration_risk(largest_position_weight):
+        if largest_position_weight > 20:
+            return 'High'
+        if largest_position_weight > 10:
+            return 'Medium'
+        return 'Low'
+
+    @staticmethod
+    def build(stock_breakdown, total_value, total_investment, total_gain_loss,
+              winning_stocks, losing_stocks, best_performer, worst_performer, top_holdings):
+        """
+        Assemble the summary dict, shared by the full and the incremental computation
+        stock_breakdown / top_holdings entries must already carry their weight
+        """
+        total_stocks = len(stock_breakdown)
+        total_gain_loss_percent = (total_gain_loss / total_investment * 100) if total_investment > 0 else 0.0
+        avg_position_size = (total_value / total_stocks) if total_stocks > 0 else 0.0
+        # top_holdings is sorted by value, so its first entry has the largest weight
+        largest_position_weight = top_holdings[0]['weight'] if top_holdings else 0.0
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'portfolio_overview': {
+                'total_stocks': total_stocks,
+                'total_value': round(total_value, 2),
+                'total_investment': round(total_investment, 2),
+                'total_gain_loss': round(total_gain_loss, 2),
+                'total_gain_loss_percent': round(total_gain_loss_percent, 2),
+                'avg_position_size': round(avg_position_size, 2)
+            },
+            'performance_metrics': {
+                'winning_stocks': winning_stocks,
+                'losing_stocks': losing_stocks,
+                'win_rate': round((winning_stocks / total_stocks * 100), 2) if total_stocks > 0 else 0.0,
+                'best_performer': best_performer,
+                'worst_performer': worst_performer
+            },
+            'top_holdings': top_holdings,
+            'stock_breakdown': stock_breakdown,
+            'risk_metrics': {
+                'largest_position_weight': largest_position_weight,
+                'concentration_risk': Portfolio_Summary.concentration_risk(largest_position_weight)
+            }
+        }
+
+    @staticmethod
+    def full_summary(portfolio_data):
+        """
+        Calculate comprehensive portfolio analytics and summaries by looping over all holdings
+        """
+        if not portfolio_data:
+            return Portfolio_Summary.empty_summary('No portfolio data available')
+
+        # Extract stocks from portfolio data structure
+        stocks = Portfolio_Summary.holdings_of(portfolio_data)
+        if stocks is None:
+            return Portfolio_Summary.empty_summary('Invalid portfolio data format')
+        if not stocks:
+            return Portfolio_Summary.empty_summary('No portfolio data available')
+
+        values = []
+        investments = []
+        gains = []
+        winning_stocks = 0
+        losing_stocks = 0
+        best_performer = None
+        worst_performer = None
+        stock_breakdown = []
+
+        # Calculate portfolio metrics (stocks already have current prices)
+        for stock in stocks:
+            investment_amount = stock['buy_price'] * stock['quantity']
+            current_value = stock['value']
+            gain_loss = stock['gain']
+            values.append(current_value)
+            investments.append(investment_amount)
+            gains.append(gain_loss)
+
+            # Count winners and losers
+            if gain_loss > 0:
+                winning_stocks += 1
+            elif gain_loss < 0:
+                losing_stocks += 1
+
+            change_percent = Portfolio_Summary.parse_change_percent(stock['change_percent'])
+            stock_performance = {
+                'ticker': stock['ticker'],
+                'gain_loss': gain_loss,
+                'change_percent': change_percent,
+                'value': current_value,
+                'weight': 0  # Will calculate after total_value is known
+            }
+
+            # Track best and worst performers (first one wins ties)
+            if best_performer is None or change_percent > best_performer['change_percent']:
+                best_performer = stock_performance.copy()
+            if worst_performer is None or change_percent < worst_performer['change_percent']:
+                worst_performer = stock_performance.copy()
+
+            stock_breakdown.append(stock_performance)
+
+        total_value = math.fsum(values)
+
+        # Calculate stock weights in portfolio
+        for stock in stock_breakdown:
+            stock['weight'] = (stock['value'] / total_value * 100) if total_value > 0 else 0.0
+
+        # Sort stocks by value for additional insights
+        top_holdings = sorted(stock_breakdown, key=lambda x: x['value'], reverse=True)[:5]
+
+        return Portfolio_Summary.build(
+            stock_breakdown, total_value, math.fsum(investments), math.fsum(gains),
+            winning_stocks, losing_stocks, best_performer, worst_performer, top_holdings
+        )
+
+    @staticmethod
+    def comparable(summary):
+        """
+        Summary without the volatile timestamp, for comparing two computations
+        """
+        return {key: value for key, value in summary.items() if key != 'timestamp'}
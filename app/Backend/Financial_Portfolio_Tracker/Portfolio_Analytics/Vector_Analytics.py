@@ -0,0 +1,172 @@
+import math
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+
+try:
+    import numpy as np
+except ImportError:  # Falls back to the pure Python loop in Portfolio_Summary
+    np = None
+
+
+class Vector_Analytics:
+    '''
+    Columnar (NumPy) portfolio analytics kernel
+    - Holdings are loaded once into arrays (value, investment, gain, change_percent)
+    - Win / loss counts, weights, best / worst performers and top holdings are array operations
+    - batch_summaries() runs many users' portfolios through one pass (segmented by user)
+    - Totals still use math.fsum, so results are identical to Portfolio_Summary.full_summary
+    return: summary dicts in the Portfolio_Summary format
+    '''
+    # Below this many holdings the plain loop is faster than building arrays
+    MIN_VECTOR_HOLDINGS = 32
+    FIELDS = ('ticker', 'quantity', 'buy_price', 'value', 'gain', 'change_percent')
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    @staticmethod
+    def _change_percents(raw):
+        """
+        change_percent column as floats ('1.23%' strings and missing values parsed like the loop does)
+        """
+        try:
+            change_percents = np.array(raw, dtype=float)
+            if not np.isnan(change_percents).any():
+                return change_percents
+        except (ValueError, TypeError):
+            pass
+        return np.array([Portfolio_Summary.parse_change_percent(c) for c in raw], dtype=float)
+
+    @staticmethod
+    def _performance(columns, index, weight=0):
+        return {
+            'ticker': columns['ticker'][index],
+            'gain_loss': float(columns['gain'][index]),
+            'change_percent': float(columns['change_percent'][index]),
+            'value': float(columns['value'][index]),
+            'weight': weight
+        }
+
+    @staticmethod
+    def _segment_summary(columns, weights, start, stop, best, worst, top, total_value):
+        """
+        Build one user's summary from the rows start:stop of the shared columns
+        best / worst / top are absolute row indexes
+        """
+        tickers = columns['ticker'][start:stop]
+        gains = columns['gain'][start:stop].tolist()
+        change_percents = columns['change_percent'][start:stop].tolist()
+        values = columns['value'][start:stop].tolist()
+        segment_weights = weights[start:stop].tolist()
+        stock_breakdown = [
+            {'ticker': ticker, 'gain_loss': gain, 'change_percent': change_percent, 'value': value, 'weight': weight}
+            for ticker, gain, change_percent, value, weight
+            in zip(tickers, gains, change_percents, values, segment_weights)
+        ]
+        investments = columns['investment'][start:stop].tolist()
+        gain_flags = columns['gain'][start:stop]
+        return Portfolio_Summary.build(
+            stock_breakdown,
+            total_value,
+            math.fsum(investments),
+            math.fsum(gains),
+            int(np.count_nonzero(gain_flags > 0)),
+            int(np.count_nonzero(gain_flags < 0)),
+            Vector_Analytics._performance(columns, best),
+            Vector_Analytics._performance(columns, worst),
+            [stock_breakdown[index - start] for index in top]
+        )
+
+    @staticmethod
+    def summary(portfolio_data):
+        """
+        Summary of one portfolio (portfolio document or holdings list)
+        """
+        holdings = Portfolio_Summary.holdings_of(portfolio_data) if portfolio_data else None
+        if np is None or not holdings or len(holdings) < Vector_Analytics.MIN_VECTOR_HOLDINGS:
+            return Portfolio_Summary.full_summary(portfolio_data)
+        return Vector_Analytics.batch_summaries({None: holdings})[None]
+
+    @staticmethod
+    def holdings_from_columns(columns):
+        """
+        Inverse of the column layout, for the pure Python fallback and verification
+        return: dict of user_id -> list of holding dicts (FIELDS only)
+        """
+        holdings_by_user = {}
+        for index, user_id in enumerate(columns['user_id']):
+            holdings_by_user.setdefault(user_id, []).append(
+                {field: columns[field][index] for field in Vector_Analytics.FIELDS})
+        return holdings_by_user
+
+    @staticmethod
+    def batch_summaries(holdings_by_user, top_k=5):
+        """
+        Summaries for many users in one vectorized pass
+        holdings_by_user: dict of user_id -> list of holding dicts
+        return: dict of user_id -> summary
+        """
+        if np is None:
+            return {user_id: Portfolio_Summary.full_summary({'holdings': holdings})
+                    for user_id, holdings in holdings_by_user.items()}
+        columns = {'user_id': [user_id for user_id, holdings in holdings_by_user.items() for _ in holdings]}
+        for field in Vector_Analytics.FIELDS:
+            columns[field] = [holding[field] for holdings in holdings_by_user.values() for holding in holdings]
+        return Vector_Analytics.batch_summaries_from_columns(columns, holdings_by_user, top_k)
+
+    @staticmethod
+    def batch_summaries_from_columns(columns, user_ids=(), top_k=5):
+        """
+        Summaries straight from column sequences (user_id plus FIELDS, e.g. Holdings_Store.load_columns),
+        rows grouped by user in holding order, without building holding dicts
+        user_ids without rows get the empty summary
+        return: dict of user_id -> summary
+        """
+        summaries = {user_id: Portfolio_Summary.empty_summary('No portfolio data available') for user_id in user_ids}
+        row_count = len(columns['user_id'])
+        if not row_count:
+            return summaries
+        if np is None:
+            summaries.update(Vector_Analytics.batch_summaries(Vector_Analytics.holdings_from_columns(columns), top_k))
+            return summaries
+
+        value = np.asarray(columns['value'], dtype=float)
+        change_percent = Vector_Analytics._change_percents(columns['change_percent'])
+        data = {
+            'ticker': columns['ticker'],
+            'value': value,
+            'investment': np.asarray(columns['buy_price'], dtype=float) * np.asarray(columns['quantity'], dtype=float),
+            'gain': np.asarray(columns['gain'], dtype=float),
+            'change_percent': change_percent
+        }
+        # Segment boundaries: rows of one user are contiguous
+        user_column = np.asarray(columns['user_id'])
+        starts = np.flatnonzero(np.concatenate(([True], user_column[1:] != user_column[:-1])))
+        counts = np.diff(np.append(starts, row_count))
+        segment = np.repeat(np.arange(len(starts)), counts)
+        positions = np.arange(row_count)
+
+        # Exact totals per user (fsum), then every weight in one division
+        values = value.tolist()
+        total_values = [math.fsum(values[start:start + count]) for start, count in zip(starts.tolist(), counts.tolist())]
+        row_totals = np.array(total_values)[segment]
+        weights = np.zeros(row_count)
+        np.divide(value, row_totals, out=weights, where=row_totals > 0)
+        weights *= 100
+
+        # First row holding the segment max / min, like the strict comparisons of the loop
+        not_found = row_count
+        best_rows = np.minimum.reduceat(
+            np.where(change_percent == np.maximum.reduceat(change_percent, starts)[segment], positions, not_found), starts)
+        worst_rows = np.minimum.reduceat(
+            np.where(change_percent == np.minimum.reduceat(change_percent, starts)[segment], positions, not_found), starts)
+        # Stable sort by user then value descending (ties keep holding order)
+        by_value = np.lexsort((-value, segment))
+
+        for i, user_id in enumerate(user_column[starts].tolist()):
+            start = int(starts[i])
+            stop = start + int(counts[i])
+            top = by_value[start:start + min(top_k, stop - start)].tolist()
+            summaries[user_id] = Vector_Analytics._segment_summary(
+                data, weights, start, stop, int(best_rows[i]), int(worst_rows[i]), top, total_values[i])
+        return summaries
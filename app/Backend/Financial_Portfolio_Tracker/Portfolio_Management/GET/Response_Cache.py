@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+
+
+class Response_Cache:
+    '''
+    Per-user cache of serialized GET responses, keyed by endpoint and ETag
+    - One body per (user, endpoint): a new ETag replaces the old body
+    - Writes and price updates call invalidate() for the users they touched
+    - At most `max_users` users are kept, least recently used are evicted first
+    return: serialized response bodies (bytes) or None
+    '''
+    def __init__(self, max_users=1024):
+        self.max_users = int(max_users)
+        self._entries = OrderedDict()  # user_id -> {endpoint: (etag, body)}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, endpoint, etag):
+        """
+        Cached body of endpoint for user_id, None when missing or built for another ETag
+        """
+        with self._lock:
+            entries = self._entries.get(user_id)
+            if not entries:
+                return None
+            self._entries.move_to_end(user_id)
+            cached = entries.get(endpoint)
+        return cached[1] if cached and cached[0] == etag else None
+
+    def put(self, user_id, endpoint, etag, body):
+        with self._lock:
+            self._entries.setdefault(user_id, {})[endpoint] = (etag, body)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids):
+        """
+        Drop every cached response of the given users
+        """
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,227 @@
+import logging
+import threading
+from collections import deque
+from datetime import date, timedelta
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Upstream_Client import Alpha_Vantage_Client
+
+logger = logging.getLogger(__name__)
+
+
+class Daily_Series:
+    '''
+    Alpha Vantage TIME_SERIES_DAILY ingestion into a local bar store
+    - Only the compact series (last 100 bars) is requested, outputsize=full is a premium feature:
+      history starts with the first ingest, older gaps are not backfilled
+    - The series is only requested when bars are missing
+    - Bars already stored are skipped before they are parsed
+    return: bars as dicts {day, open, high, low, close, volume}, oldest first
+    '''
+    SERIES_KEY = "Time Series (Daily)"
+    # A quote bar only extends stored history this close to the last bar (weekend plus a holiday)
+    MAX_QUOTE_GAP_DAYS = 4
+
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    @staticmethod
+    def parse(data, after=None):
+        """
+        Bars of a TIME_SERIES_DAILY payload newer than `after` (ISO date string or date)
+        """
+        series = data.get(Daily_Series.SERIES_KEY) or {}
+        after = str(after) if after else ''
+        bars = []
+        for day in sorted(day for day in series if day > after):
+            values = series[day]
+            try:
+                bars.append({
+                    'day': day,
+                    'open': float(values["1. open"]),
+                    'high': float(values["2. high"]),
+                    'low': float(values["3. low"]),
+                    'close': float(values["4. close"]),
+                    'volume': int(float(values.get("5. volume", 0)))
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
+        return bars
+
+    @staticmethod
+    def bar_from_quote(quote):
+        """
+        Today's bar from a Get_Ticker quote, None when the quote is incomplete
+        """
+        try:
+            return {
+                'day': date.fromisoformat(quote['latest_trading_day']).isoformat(),
+                'open': float(quote['open']),
+                'high': float(quote['high']),
+                'low': float(quote['low']),
+                'close': float(quote['price']),
+                'volume': int(float(quote.get('volume') or 0))
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def last_trading_day(today):
+        """
+        Latest weekday on or before today (exchange holidays only cost one extra compact call)
+        """
+        while today.weekday() >= 5:
+            today -= timedelta(days=1)
+        return today
+
+    @staticmethod
+    def plan(last_day, today=None):
+        """
+        return: None when the store is current, else the outputsize to request ('compact')
+        """
+        today = today or date.today()
+        # The bar of the current trading day comes from refreshed quotes, the series is only needed for gaps
+        if last_day is not None and last_day >= Daily_Series.last_trading_day(today - timedelta(days=1)):
+            return None
+        return 'compact'
+
+    @staticmethod
+    def extends(last_day, day):
+        """
+        True when a bar for `day` can be appended without leaving a gap plan() would not see
+        (a quote bar on an empty or outdated history would make it look current)
+        """
+        if last_day is None:
+            return False
+        day = date.fromisoformat(str(day))
+        return day <= last_day or (day - last_day).days <= Daily_Series.MAX_QUOTE_GAP_DAYS
+
+    @staticmethod
+    def _lock(symbol):
+        with Daily_Series._locks_guard:
+            return Daily_Series._locks.setdefault(symbol, threading.Lock())
+
+    @staticmethod
+    def ingest(session, store, symbol, api_key, today=None, deadline=None):
+        """
+        Bring one symbol's stored bars up to date (store: Price_History_Store)
+        Concurrent calls for the same symbol in this process wait for the first one
+        return: {'symbol', 'outputsize', 'stored'} or {'error': ...}
+        """
+        with Daily_Series._lock(symbol):
+            return Daily_Series._ingest(session, store, symbol, api_key, today, deadline)
+
+    @staticmethod
+    def _ingest(session, store, symbol, api_key, today, deadline):
+        last_day = store.last_day(session, symbol)
+        outputsize = Daily_Series.plan(last_day, today)
+        if outputsize is None:
+            return {'symbol': symbol, 'outputsize': None, 'stored': 0}
+        data = Alpha_Vantage_Client.shared().query(
+            "TIME_SERIES_DAILY", {"symbol": symbol, "outputsize": outputsize}, api_key,
+            priority='bulk', deadline=deadline)
+        if "Note" in data:
+            return {"error": "Alpha Vantage API rate limit exceeded. Please try again later."}
+        if "Error Message" in data:
+            return {"error": f"Invalid ticker symbol '{symbol}' or API error."}
+        if "Information" in data:
+            return {"error": f"Alpha Vantage rejected the request: {data['Information']}"}
+        stored = store.upsert_bars(session, symbol, Daily_Series.parse(data, after=last_day))
+        # Committed here so waiting threads see the bars
+        session.commit()
+        return {'symbol': symbol, 'outputsize': outputsize, 'stored': stored}
+
+
+class Series_Ingest_Queue:
+    '''
+    Background daily series ingestion (per process), request handlers never wait on the upstream
+    - submit() queues a symbol, a symbol already queued or being ingested is not queued twice
+    - At most max_pending symbols wait, further submits are refused until the queue drains
+    - One worker thread runs ingest(symbol) for the queued symbols, oldest first
+    - The last error of a symbol is kept until one of its ingests succeeds
+    - on_event(result) is called with queued, coalesced, rejected, stored, failed
+    return: ingest(symbol) -> Daily_Series.ingest() result ({'error': ...} on failure)
+    '''
+    def __init__(self, ingest, max_pending=1000, on_event=None):
+        self.ingest = ingest
+        self.max_pending = int(max_pending)
+        self.on_event = on_event
+        self._queue = deque()
+        self._pending = set()  # queued or being ingested
+        self._errors = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _record(self, result):
+        if self.on_event:
+            try:
+                self.on_event(result)
+            except Exception as e:
+                logger.warning("Series ingest queue metrics error: %s", e)
+
+    def submit(self, symbol):
+        """
+        Queue one symbol for ingestion
+        return: False when the queue is full
+        """
+        with self._cond:
+            if symbol in self._pending:
+                result = 'coalesced'
+            elif len(self._pending) >= self.max_pending:
+                result = 'rejected'
+            else:
+                self._pending.add(symbol)
+                self._queue.append(symbol)
+                self._cond.notify()
+                result = 'queued'
+        self._record(result)
+        if result == 'queued':
+            self.start()
+        return result != 'rejected'
+
+    def pending(self, symbol):
+        with self._cond:
+            return symbol in self._pending
+
+    def error(self, symbol):
+        """
+        Error message of the symbol's last failed ingest, None when it succeeded
+        """
+        return self._errors.get(symbol)
+
+    def start(self):
+        """
+        Start the worker thread once per process (safe to call on every request)
+        """
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='series-ingest-queue', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                symbol = self._queue.popleft()
+            try:
+                result = self.ingest(symbol)
+            except Exception as e:
+                logger.warning("Error ingesting %s daily series: %s", symbol, e)
+                result = {"error": "Daily series could not be refreshed"}
+            if 'error' in result:
+                self._errors[symbol] = result['error']
+                self._record('failed')
+            else:
+                self._errors.pop(symbol, None)
+                self._record('stored')
+            with self._cond:
+                self._pending.discard(symbol)
@@ -0,0 +1,51 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class Fetch_Engine:
+    '''
+    Concurrent fetch helper for market data calls
+    Upstream pacing is left to the shared rate limiter, this only bounds parallelism and time
+    return: (results, timings) dicts keyed by symbol
+    '''
+    @staticmethod
+    def fetch_all(symbols, fetch, max_workers=5, deadline=None):
+        """
+        Run fetch(symbol) for every symbol with at most max_workers in parallel.
+        Symbols still running after deadline seconds are left out (partial results),
+        their timing is reported as None.
+        """
+        results = {}
+        timings = {}
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return results, timings
+
+        def timed_fetch(symbol):
+            started = time.time()
+            value = fetch(symbol)
+            return value, time.time() - started
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(symbols))))
+        try:
+            futures = {executor.submit(timed_fetch, symbol): symbol for symbol in symbols}
+            done, not_done = wait(futures, timeout=deadline)
+            for future in done:
+                symbol = futures[future]
+                try:
+                    value, seconds = future.result()
+                except Exception as e:
+                    logger.warning("Fetch error for %s: %s", symbol, e)
+                    timings[symbol] = None
+                    continue
+                results[symbol] = value
+                timings[symbol] = round(seconds, 3)
+            for future in not_done:
+                timings[futures[future]] = None
+        finally:
+            # Do not block on calls that missed the deadline, they finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results, timings
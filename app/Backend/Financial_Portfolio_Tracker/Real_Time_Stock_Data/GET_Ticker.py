@@ -1,4 +1,7 @@
-import requests
+import logging
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Upstream_Client import Alpha_Vantage_Client
+
+logger = logging.getLogger(__name__)
 
 class Get_Ticker:
     '''
@@ -6,23 +9,19 @@ class Get_Ticker:
     return: JSON of the ticker data
     '''
     @staticmethod
-    def get_stock_quote(ticker, api_key):
-        url = 'https://www.alphavantage.co/query'
-        params = {
-            'function': 'GLOBAL_QUOTE',
-            'symbol': ticker,
-            'apikey': api_key
-        }
+    def get_stock_quote(ticker, api_key, priority='interactive', deadline=None):
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            # Log the raw response for debugging
-            print(f"Alpha Vantage response for {ticker}: {data}")
+            data = Alpha_Vantage_Client.shared().query(
+                'GLOBAL_QUOTE', {'symbol': ticker}, api_key, priority=priority, deadline=deadline)
+            # Raw response for debugging, only formatted when DEBUG is enabled
+            logger.debug("Alpha Vantage response for %s: %s", ticker, data)
 
             if "Note" in data:
                 return {"error": "Alpha Vantage API rate limit exceeded. Please try again later."}
             if "Error Message" in data:
                 return {"error": f"Invalid ticker symbol '{ticker}' or API error."}
+            if "Information" in data:
+                return {"error": f"Alpha Vantage rejected the request: {data['Information']}"}
             quote = data.get("Global Quote", {})
             if not quote or not quote.get("01. symbol"):
                 return {"error": f"No data found for ticker '{ticker}'. It may be invalid or unavailable."}
@@ -40,7 +39,7 @@ class Get_Ticker:
                 'change_percent': quote.get('10. change percent', '0')
             }
         except Exception as e:
-            print(f"Exception in get_stock_quote: {e}")
+            logger.warning("Exception in get_stock_quote for %s: %s", ticker, e)
             return {"error": "Internal server error while fetching stock data."}
 
 if __name__ == '__main__':
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import deque
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Fetch_Engine import Fetch_Engine
+
+logger = logging.getLogger(__name__)
+
+
+class Market_Data_Refresher:
+    '''
+    Background refresher that keeps the shared quote store warm
+    - The ticker universe comes from universe_source(): {symbol: number of holders}
+    - Upstream calls are paced to calls_per_minute (bursts up to the same amount)
+    - On-demand requests go first, then the most-held and stalest symbols
+    - When several calls are affordable they are fetched in parallel (up to `concurrency`)
+    - Background fetches give up on the shared rate limiter after background_deadline seconds, and the loop
+      moves on after batch_deadline seconds with whatever finished (partial batch), so a slow batch never holds
+      up the on-demand requests queued behind it; fetches still running count against `concurrency`
+    - A symbol has at most one fetch in flight: requests for a symbol that is queued or already being fetched
+      (on demand or in the background) wait for that fetch instead of starting another
+    return: quotes are written to the store with store.put(symbol, quote)
+    '''
+    def __init__(self, store, fetcher, universe_source, calls_per_minute=5,
+                 min_refresh_interval=60, universe_refresh_interval=300, on_quote=None, concurrency=5,
+                 background_deadline=5.0, batch_deadline=15.0):
+        self.store = store
+        # fetcher(symbol, priority, deadline) -> Get_Ticker style quote dict (or {'error': ...}),
+        # deadline is the longest wait for an upstream token (None: the limiter default of the priority)
+        self.fetcher = fetcher
+        self.universe_source = universe_source
+        self.calls_per_minute = max(float(calls_per_minute), 0.1)
+        self.min_refresh_interval = float(min_refresh_interval)
+        self.universe_refresh_interval = float(universe_refresh_interval)
+        # Optional callback(symbol, quote) run after every successful refresh
+        self.on_quote = on_quote
+        self.concurrency = max(int(concurrency), 1)
+        self.background_deadline = float(background_deadline)
+        self.batch_deadline = float(batch_deadline)
+
+        self._universe = {}
+        self._universe_loaded_at = 0.0
+        self._last_attempt = {}  # symbol -> time the last upstream call was scheduled
+        self._errors = {}  # symbol -> last error result, returned to on-demand waiters
+        self.fetch_seconds = {}  # symbol -> duration of the last upstream fetch (debug output)
+        self.timed_out = set()  # symbols whose fetch is still running past its batch deadline (debug output)
+        self._running = 0  # fetches in progress, including the ones a batch stopped waiting for
+        self._in_flight = set()  # symbols picked for a batch whose fetch has not finished
+        self._on_demand = deque()
+        self._waiters = {}  # symbol -> threading.Event
+        self._tokens = self.calls_per_minute
+        self._tokens_at = time.time()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        """
+        Start the refresher thread once per process (safe to call on every request)
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='market-data-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _enqueue(self, symbol):
+        # Caller must hold self._cond
+        event = self._waiters.get(symbol)
+        if event is None:
+            event = threading.Event()
+            self._waiters[symbol] = event
+            if symbol not in self._in_flight:
+                self._on_demand.append(symbol)
+                return event
+        # Queued or already being fetched (also by the background loop), released when that fetch finishes
+        self.store.record('coalesced')
+        return event
+
+    def _result(self, symbol):
+        quote, fetched_at = self.store.peek(symbol)
+        if quote is not None and not self.store.is_expired(fetched_at):
+            return quote
+        return self._errors.get(symbol, quote)
+
+    def request(self, symbol, timeout=10.0):
+        """
+        Ask for a symbol to be fetched ahead of the background schedule and wait for it
+        return: the stored quote, the fetch error, or None on timeout
+        """
+        symbol = symbol.upper()
+        with self._cond:
+            event = self._enqueue(symbol)
+            self._cond.notify_all()
+        self.start()
+        if not event.wait(timeout):
+            return None
+        return self._result(symbol)
+
+    def request_many(self, symbols, timeout=10.0):
+        """
+        request() for several symbols at once: all are queued before waiting, so they are
+        fetched in parallel batches within the budget and share one timeout
+        return: dict of symbol -> stored quote, fetch error, or None on timeout
+        """
+        symbols = [symbol.upper() for symbol in symbols]
+        with self._cond:
+            events = {symbol: self._enqueue(symbol) for symbol in symbols}
+            self._cond.notify_all()
+        self.start()
+        deadline = time.time() + timeout
+        results = {}
+        for symbol, event in events.items():
+            results[symbol] = self._result(symbol) if event.wait(max(deadline - time.time(), 0)) else None
+        return results
+
+    def universe(self):
+        """
+        Current ticker universe {symbol: holders}, reloaded every universe_refresh_interval seconds
+        Called by the refresher thread without holding self._cond (universe_source() queries the database)
+        """
+        now = time.time()
+        if now - self._universe_loaded_at >= self.universe_refresh_interval or not self._universe:
+            try:
+                # Replaced, never mutated, so the dict handed to _next_batch stays consistent
+                self._universe = {symbol.upper(): holders for symbol, holders in self.universe_source().items()}
+            except Exception as e:
+                logger.warning("Market data refresher could not load ticker universe: %s", e)
+            self._universe_loaded_at = now
+        return self._universe
+
+    def _refill(self, now):
+        # Caller must hold self._cond
+        elapsed = now - self._tokens_at
+        self._tokens = min(self.calls_per_minute, self._tokens + elapsed * self.calls_per_minute / 60.0)
+        self._tokens_at = now
+
+    def _next_background_symbol(self, now, universe):
+        """
+        Pick the universe symbol with the highest (holders + 1) * staleness score
+        Symbols refreshed or attempted within min_refresh_interval are skipped
+        Caller must hold self._cond
+        """
+        best_symbol = None
+        best_score = 0.0
+        for symbol, holders in universe.items():
+            fetched_at = self.store.fetched_at(symbol)
+            last_seen = max(fetched_at or 0.0, self._last_attempt.get(symbol, 0.0))
+            staleness = now - last_seen
+            if staleness < self.min_refresh_interval or symbol in self._in_flight or symbol in self._waiters:
+                continue
+            score = (holders + 1) * staleness
+            if score > best_score:
+                best_symbol, best_score = symbol, score
+        return best_symbol
+
+    def _next_batch(self, now, universe):
+        """
+        Pick up to `concurrency` symbols the budget can pay for right now
+        universe: {symbol: holders} loaded before the lock was taken
+        Caller must hold self._cond
+        return: list of (symbol, priority)
+        """
+        batch = []
+        while self._tokens >= 1 and len(batch) < self.concurrency - self._running:
+            if self._on_demand:
+                batch.append((self._on_demand.popleft(), 'interactive'))
+            # Keep one call in reserve for on-demand requests
+            elif self._tokens >= 2 or self.calls_per_minute < 2:
+                symbol = self._next_background_symbol(now, universe)
+                if symbol is None:
+                    break
+                batch.append((symbol, 'background'))
+            else:
+                break
+            # Marked now so the same symbol is not picked twice, and later requests attach to this fetch
+            self._last_attempt[batch[-1][0]] = now
+            self._in_flight.add(batch[-1][0])
+            self._tokens -= 1
+        return batch
+
+    def _run(self):
+        while True:
+            # Loaded (at most every universe_refresh_interval) before taking the lock, so request()
+            # and finishing fetches never wait on the database query
+            universe = self.universe()
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                self._refill(now)
+                if self._tokens < 1:
+                    # Wait for the next token (an on-demand request cannot skip the budget)
+                    self._cond.wait((1 - self._tokens) * 60.0 / self.calls_per_minute)
+                    continue
+                batch = self._next_batch(now, universe)
+                if not batch:
+                    # Woken early by an on-demand request or a finished straggler
+                    self._cond.wait(60.0 / self.calls_per_minute)
+                    continue
+                self._running += len(batch)
+            priorities = dict(batch)
+            _, timings = Fetch_Engine.fetch_all(
+                list(priorities),
+                lambda symbol: self._fetch(symbol, priorities[symbol]),
+                max_workers=len(priorities),
+                deadline=self.batch_deadline
+            )
+            late = [symbol for symbol, seconds in timings.items() if seconds is None]
+            with self._cond:
+                # Symbols whose fetch already finished (or failed) are not late
+                self.timed_out.update(symbol for symbol in late if symbol in self._in_flight)
+            if late:
+                logger.info("Market data batch deadline passed, continuing without %s", late)
+
+    def _fetch(self, symbol, priority='background'):
+        """
+        Fetch one symbol upstream, store it and release anyone waiting on it
+        """
+        started = time.time()
+        try:
+            quote = self.fetcher(symbol, priority, None if priority == 'interactive' else self.background_deadline)
+        except Exception as e:
+            logger.warning("Market data refresher error for %s: %s", symbol, e)
+            quote = {"error": "Internal server error while fetching stock data."}
+        self.fetch_seconds[symbol] = round(time.time() - started, 3)
+        stored = isinstance(quote, dict) and 'error' not in quote
+        if stored:
+            self.store.put(symbol, quote)
+            self._errors.pop(symbol, None)
+        else:
+            self._errors[symbol] = quote
+        # Waiters only need the stored quote, they do not wait for on_quote (database writes)
+        with self._cond:
+            event = self._waiters.pop(symbol, None)
+            self._in_flight.discard(symbol)
+            self.timed_out.discard(symbol)
+            self._running -= 1
+            self._cond.notify_all()
+        if event:
+            event.set()
+        if stored and self.on_quote:
+            try:
+                self.on_quote(symbol, quote)
+            except Exception:
+                logger.exception("Market data refresher on_quote error for %s", symbol)
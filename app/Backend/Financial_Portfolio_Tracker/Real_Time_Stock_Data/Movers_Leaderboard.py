@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from bisect import bisect_left, insort
+
+
+class Movers_Leaderboard:
+    '''
+    Market movers over every symbol that has a quote, updated as quotes arrive
+    - Change is measured from the day's open
+    - Sorted indexes by change percent (gainers / losers) and by volume (most active)
+    - update() costs O(log n) plus a list insert, reads slice the indexes in O(k)
+    - snapshot() carries a version derived from its boards only, equal in every process showing the same movers
+    return: mover dicts {ticker, price, change, change_percent, volume}
+    '''
+    def __init__(self):
+        self._entries = {}  # symbol -> mover
+        self._by_change = []  # (change_percent, symbol)
+        self._by_volume = []  # (volume, symbol)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def mover_from_quote(symbol, quote):
+        """
+        Get_Ticker quote or stored daily bar -> mover, None when prices are missing
+        """
+        try:
+            price = float(quote['price'] if 'price' in quote else quote['close'])
+            open_price = float(quote['open'])
+            volume = int(float(quote.get('volume') or 0))
+        except (KeyError, TypeError, ValueError):
+            return None
+        change = price - open_price
+        return {
+            'ticker': symbol,
+            'price': price,
+            'change': round(change, 2),
+            'change_percent': round((change / open_price) * 100 if open_price else 0.0, 2),
+            'volume': volume
+        }
+
+    def _remove(self, symbol):
+        # Caller must hold self._lock
+        mover = self._entries.pop(symbol, None)
+        if mover is not None:
+            del self._by_change[bisect_left(self._by_change, (mover['change_percent'], symbol))]
+            del self._by_volume[bisect_left(self._by_volume, (mover['volume'], symbol))]
+        return mover
+
+    def update(self, symbol, quote):
+        """
+        Add or replace the symbol's entry
+        return: True when the leaderboard changed
+        """
+        symbol = symbol.upper()
+        mover = self.mover_from_quote(symbol, quote)
+        if mover is None:
+            return False
+        with self._lock:
+            if self._entries.get(symbol) == mover:
+                return False
+            self._remove(symbol)
+            self._entries[symbol] = mover
+            insort(self._by_change, (mover['change_percent'], symbol))
+            insort(self._by_volume, (mover['volume'], symbol))
+            return True
+
+    def seed(self, quotes):
+        """
+        Add entries only for symbols without one (e.g. stored daily bars at start-up)
+        quotes: dict of symbol -> quote or bar
+        """
+        for symbol, quote in quotes.items():
+            if symbol.upper() not in self._entries:
+                self.update(symbol, quote)
+
+    def remove(self, symbol):
+        with self._lock:
+            self._remove(symbol.upper())
+
+    def _pick(self, index, k, largest):
+        # Caller must hold self._lock
+        keys = index[:-k - 1:-1] if largest else index[:k]
+        return [dict(self._entries[symbol]) for _, symbol in keys]
+
+    def top_gainers(self, k=3):
+        with self._lock:
+            return self._pick(self._by_change, k, largest=True)
+
+    def top_losers(self, k=3):
+        with self._lock:
+            return self._pick(self._by_change, k, largest=False)
+
+    def most_active(self, k=3):
+        with self._lock:
+            return self._pick(self._by_volume, k, largest=True)
+
+    def snapshot(self, k=3):
+        """
+        All three boards from one consistent state, version changes only when their content does (used in ETags)
+        """
+        with self._lock:
+            snapshot = {
+                'top_gainers': self._pick(self._by_change, k, largest=True),
+                'top_losers': self._pick(self._by_change, k, largest=False),
+                'most_active': self._pick(self._by_volume, k, largest=True),
+                'symbols': len(self._entries)
+            }
+        digest = hashlib.blake2b(digest_size=8)
+        for board in ('top_gainers', 'top_losers', 'most_active'):
+            for mover in snapshot[board]:
+                digest.update(f"{board}|{mover['ticker']}|{mover['price']!r}|{mover['change']!r}|"
+                              f"{mover['change_percent']!r}|{mover['volume']};".encode())
+        snapshot['version'] = f"{snapshot['symbols']}.{digest.hexdigest()}"
+        return snapshot
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Quote_Cache:
+    '''
+    Process-wide quote cache keyed by ticker symbol
+    - Entries are fresh for `ttl` seconds
+    - After that they are served stale for up to `stale_ttl` more seconds until the refresher replaces them
+    - At most `max_size` symbols are kept, least recently used are evicted first
+    - Quotes are written by the Market_Data_Refresher (put), which also coalesces concurrent requests per symbol
+    - apply() stores quotes fetched by other processes with their original fetch time (shared tier)
+    return: quote dicts as returned by the fetcher
+    '''
+    def __init__(self, ttl=60, stale_ttl=240, max_size=512, on_event=None, on_store=None, on_fetched=None):
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.max_size = int(max_size)
+        # Optional callback(event) used for metrics: hit, stale, miss, coalesced
+        self.on_event = on_event
+        # Optional callback(symbol, quote) run after every stored quote (outside the cache lock)
+        self.on_store = on_store
+        # Optional callback(symbol, quote, fetched_at) run only for quotes fetched by this process (not apply())
+        self.on_fetched = on_fetched
+        self._entries = OrderedDict()  # symbol -> (quote, fetched_at)
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        """
+        Report a cache event to the metrics callback
+        """
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                logger.warning("Quote cache metrics error: %s", e)
+
+    def _stored(self, symbol, quote, fetched_at=None):
+        """
+        Run the store callbacks, fetched_at is given only for quotes fetched by this process
+        """
+        if self.on_store:
+            try:
+                self.on_store(symbol, quote)
+            except Exception:
+                logger.exception("Quote cache on_store error for %s", symbol)
+        if fetched_at is not None and self.on_fetched:
+            try:
+                self.on_fetched(symbol, quote, fetched_at)
+            except Exception:
+                logger.exception("Quote cache on_fetched error for %s", symbol)
+
+    def _store(self, symbol, quote, fetched_at=None):
+        # Caller must hold self._lock
+        fetched_at = fetched_at or time.time()
+        self._entries[symbol] = (quote, fetched_at)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return fetched_at
+
+    def put(self, symbol, quote):
+        """
+        Store a quote fetched elsewhere in this process (e.g. by the background refresher)
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            fetched_at = self._store(symbol, quote)
+        self._stored(symbol, quote, fetched_at)
+
+    def apply(self, symbol, quote, fetched_at):
+        """
+        Store a quote fetched by another process, keeping its fetch time
+        Ignored when the local entry is at least as new, on_fetched is not called
+        return: True when the quote was stored
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry and entry[1] >= fetched_at:
+                return False
+            self._store(symbol, quote, fetched_at)
+        self._stored(symbol, quote)
+        return True
+
+    def peek(self, symbol, record=True):
+        """
+        Read a quote without calling upstream, expired entries are still returned
+        record=False skips hit/miss metrics (bulk reads such as market trends)
+        return: (quote, fetched_at) or (None, None) when the symbol was never stored
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry:
+                self._entries.move_to_end(symbol)
+        if not record:
+            return entry or (None, None)
+        if not entry:
+            self.record('miss')
+            return None, None
+        age = time.time() - entry[1]
+        if age < self.ttl:
+            self.record('hit')
+        elif age < self.ttl + self.stale_ttl:
+            self.record('stale')
+        else:
+            self.record('miss')
+        return entry
+
+    def fetched_at(self, symbol):
+        """
+        Time a symbol was last stored, without touching LRU order or metrics (used for scheduling)
+        """
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+        return entry[1] if entry else None
+
+    def is_expired(self, fetched_at):
+        """
+        True when an entry stored at fetched_at is past its stale window
+        """
+        return fetched_at is None or time.time() - fetched_at >= self.ttl + self.stale_ttl
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines, state stays per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Token_Bucket_Limiter:
+    '''
+    Token bucket shared by every worker process on the host through a locked state file
+    - Tokens refill at rate_per_minute up to burst
+    - Each priority class keeps `reserves[priority]` tokens untouched, so background work
+      cannot drain the budget interactive requests need
+    - Callers queue in priority order inside a process and give up at their deadline
+    return: acquire() -> True when a token was taken, False when the deadline passed first
+    '''
+    # Lower number = served first
+    PRIORITIES = {'interactive': 0, 'background': 1, 'bulk': 2}
+    DEFAULT_RESERVES = {'interactive': 0, 'background': 1, 'bulk': 2}
+    DEFAULT_DEADLINES = {'interactive': 10.0, 'background': 60.0, 'bulk': 30.0}
+
+    def __init__(self, rate_per_minute=5, burst=None, state_file=None,
+                 reserves=None, deadlines=None, on_acquire=None):
+        self.rate_per_second = max(float(rate_per_minute), 0.1) / 60.0
+        self.burst = float(burst if burst is not None else rate_per_minute)
+        self.state_file = state_file if fcntl else None
+        self.reserves = dict(self.DEFAULT_RESERVES, **(reserves or {}))
+        self.deadlines = dict(self.DEFAULT_DEADLINES, **(deadlines or {}))
+        # Optional callback(priority, waited_seconds, granted) used for metrics
+        self.on_acquire = on_acquire
+
+        self._local_state = {'tokens': self.burst, 'updated': time.time()}
+        self._local_lock = threading.Lock()
+        self._queue = []  # heap of (priority, seq) tickets waiting in this process
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def _state(self):
+        """
+        Yield the bucket state dict under an exclusive lock (file lock across processes)
+        """
+        if not self.state_file:
+            with self._local_lock:
+                yield self._local_state
+            return
+        with open(self.state_file, 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                try:
+                    state = json.loads(handle.read() or '{}')
+                except ValueError:
+                    state = {}
+                state.setdefault('tokens', self.burst)
+                state.setdefault('updated', time.time())
+                yield state
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(state))
+                handle.flush()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        elapsed = max(now - state['updated'], 0.0)
+        state['tokens'] = min(self.burst, state['tokens'] + elapsed * self.rate_per_second)
+        state['updated'] = now
+
+    def _try_take(self, reserve):
+        """
+        Take one token if more than `reserve` are left
+        return: 0 when granted, otherwise seconds until enough tokens are expected
+        """
+        with self._state() as state:
+            self._refill(state, time.time())
+            if state['tokens'] >= 1 + reserve:
+                state['tokens'] -= 1
+                return 0.0
+            return (1 + reserve - state['tokens']) / self.rate_per_second
+
+    def tokens(self):
+        """
+        Tokens currently in the bucket (after refill)
+        """
+        try:
+            with self._state() as state:
+                self._refill(state, time.time())
+                return state['tokens']
+        except OSError as e:
+            logger.warning("Rate limiter state unavailable: %s", e)
+            return 0.0
+
+    def drain(self):
+        """
+        Empty the bucket, used when upstream reports its rate limit anyway
+        """
+        with self._state() as state:
+            state['tokens'] = 0.0
+            state['updated'] = time.time()
+
+    def acquire(self, priority='interactive', deadline=None):
+        """
+        Wait for a token in priority order until deadline seconds have passed
+        """
+        if priority not in self.PRIORITIES:
+            priority = 'interactive'
+        reserve = min(self.reserves.get(priority, 0), max(self.burst - 1, 0))
+        deadline = self.deadlines.get(priority, 10.0) if deadline is None else deadline
+        started = time.time()
+        deadline_at = started + deadline
+        ticket = (self.PRIORITIES[priority], next(self._seq))
+        granted = False
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    remaining = deadline_at - time.time()
+                    if self._queue[0] == ticket:
+                        wait = self._try_take(reserve)
+                        if wait == 0:
+                            granted = True
+                            break
+                        if wait > remaining:
+                            # The next token will not arrive before the deadline
+                            break
+                    else:
+                        # Someone with higher priority (or earlier) is ahead in this process
+                        wait = remaining
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+        if self.on_acquire:
+            try:
+                self.on_acquire(priority, time.time() - started, granted)
+            except Exception as e:
+                logger.warning("Rate limiter metrics error: %s", e)
+        return granted
@@ -0,0 +1,180 @@
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Rate_Limiter import Token_Bucket_Limiter
+
+logger = logging.getLogger(__name__)
+
+
+class Upstream_Unavailable(Exception):
+    '''
+    Raised when Alpha Vantage cannot be reached (circuit open or retries exhausted)
+    '''
+
+
+class Circuit_Breaker:
+    '''
+    Stops calling upstream after `failure_threshold` consecutive failures
+    - open: calls fail fast for `reset_timeout` seconds
+    - half-open: one trial call is let through, success closes the circuit again
+    '''
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None and time.time() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """
+        True when a call may go upstream now
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.time() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            # Half-open: let exactly one trial call through
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """
+        Give back a half-open trial slot that was not used for an upstream call
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.time()
+            self._trial_running = False
+
+
+class Alpha_Vantage_Client:
+    '''
+    Shared Alpha Vantage client used by every market data module
+    - Every call takes a token from the shared rate limiter first, so bursts turn into
+      bounded waits instead of upstream "Note" responses
+    - One pooled keep-alive session, connect/read timeouts on every call
+    - Connection errors, timeouts and 5xx are retried with jittered exponential backoff
+    - A circuit breaker fails fast while upstream is down
+    return: decoded JSON dict (a "Note" dict when the request budget ran out, an "Information" dict when
+            upstream refused the request itself)
+    '''
+    URL = 'https://www.alphavantage.co/query'
+    BUDGET_NOTE = "Request budget exhausted, Alpha Vantage call skipped. Please try again later."
+    _shared = None
+
+    def __init__(self, limiter=None, connect_timeout=3.05, read_timeout=10.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, pool_size=10, breaker=None, on_request=None):
+        self.limiter = limiter or Token_Bucket_Limiter()
+        self.timeout = (float(connect_timeout), float(read_timeout))
+        self.max_retries = int(max_retries)
+        self.backoff_base = float(backoff_base)
+        self.backoff_max = float(backoff_max)
+        self.pool_size = int(pool_size)
+        self.breaker = breaker or Circuit_Breaker()
+        # Optional callback(function, seconds, outcome) used for the latency histogram
+        self.on_request = on_request
+        self.session = self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def reset_session(self):
+        """
+        Drop pooled connections (call after fork so workers do not share sockets)
+        """
+        self.session.close()
+        self.session = self._new_session()
+
+    @classmethod
+    def shared(cls):
+        """
+        Process-wide client (created with defaults if main.py did not install one)
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, client):
+        cls._shared = client
+
+    def _record(self, function, started, outcome):
+        if self.on_request:
+            try:
+                self.on_request(function, time.time() - started, outcome)
+            except Exception as e:
+                logger.warning("Upstream client metrics error: %s", e)
+
+    def _backoff(self, attempt):
+        # Full jitter: random delay between 0 and base * 2^attempt (capped)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def query(self, function, params, api_key, priority='interactive', deadline=None):
+        """
+        Call one Alpha Vantage function within the request budget
+        Raises Upstream_Unavailable when the circuit is open or all retries failed
+        """
+        if not self.breaker.allow():
+            raise Upstream_Unavailable(f"Alpha Vantage circuit open, {function} call skipped")
+        if not self.limiter.acquire(priority, deadline):
+            # Not an upstream failure, give a half-open trial slot back
+            self.breaker.release_trial()
+            return {"Note": self.BUDGET_NOTE}
+        query_params = {'function': function, 'apikey': api_key}
+        query_params.update(params)
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1))
+            started = time.time()
+            try:
+                response = self.session.get(self.URL, params=query_params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(function, started, 'connection_error')
+                last_error = e
+                continue
+            if response.status_code >= 500:
+                self._record(function, started, 'server_error')
+                last_error = f"HTTP {response.status_code}"
+                continue
+            self._record(function, started, 'ok' if response.status_code == 200 else 'client_error')
+            self.breaker.record_success()
+            if response.status_code != 200:
+                # Callers treat a payload without their data key as "no data"
+                logger.warning("Alpha Vantage returned HTTP %s for %s", response.status_code, function)
+                return {}
+            data = response.json()
+            if "Note" in data:
+                # Upstream limit hit anyway (other clients on the same key), stop spending tokens
+                self.limiter.drain()
+            # "Information" (premium function or parameter, invalid key) is returned as is, retrying cannot help
+            return data
+
+        self.breaker.record_failure()
+        raise Upstream_Unavailable(f"Alpha Vantage {function} failed after {self.max_retries + 1} attempts: {last_error}")
@@ -0,0 +1,103 @@
+import dataclasses
+import json
+from contextlib import nullcontext
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib json module
+    orjson = None
+
+
+class Fast_JSON:
+    '''
+    JSON encoding / decoding used by the Flask app and the SQLAlchemy engine
+    - orjson when installed (several times faster on large portfolio and stock_breakdown payloads)
+    - stdlib json otherwise, with the same type handling and the same compact output
+    - Decimal becomes a number, datetime / date / time ISO 8601 strings, UUID a string,
+      NumPy scalars and arrays numbers and lists
+    return: dumps() str, dumps_bytes() UTF-8 bytes, loads() Python objects
+    '''
+    @staticmethod
+    def available():
+        return orjson is not None
+
+    @staticmethod
+    def default(obj):
+        """
+        Types neither encoder handles by itself
+        """
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, UUID):
+            return str(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if hasattr(obj, 'tolist'):
+            # NumPy scalars and arrays (only reached by the stdlib encoder)
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    @staticmethod
+    def dumps_bytes(obj, sort_keys=False, indent=None):
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=Fast_JSON.default, option=option)
+        return Fast_JSON._stdlib_dumps(obj, sort_keys, indent).encode()
+
+    @staticmethod
+    def dumps(obj, sort_keys=False, indent=None):
+        if orjson is not None:
+            return Fast_JSON.dumps_bytes(obj, sort_keys, indent).decode()
+        return Fast_JSON._stdlib_dumps(obj, sort_keys, indent)
+
+    @staticmethod
+    def _stdlib_dumps(obj, sort_keys, indent):
+        return json.dumps(obj, default=Fast_JSON.default, sort_keys=sort_keys, ensure_ascii=False,
+                          indent=2 if indent else None, separators=None if indent else (',', ':'))
+
+    @staticmethod
+    def loads(data):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class Fast_JSON_Provider(JSONProvider):
+    '''
+    Flask JSON provider backed by Fast_JSON (jsonify, request.get_json, app.json)
+    Keys are sorted like Flask's default provider, so response bodies keep their layout
+    '''
+    sort_keys = True
+    mimetype = 'application/json'
+
+    def __init__(self, app, span=None):
+        super().__init__(app)
+        # Optional callable() returning a context manager that times each response body (tracing)
+        self.span = span or nullcontext
+
+    def dumps(self, obj, **kwargs):
+        return Fast_JSON.dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys), indent=kwargs.get('indent'))
+
+    def dumps_bytes(self, obj):
+        return Fast_JSON.dumps_bytes(obj, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        return Fast_JSON.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with self.span():
+            body = self.dumps_bytes(obj)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
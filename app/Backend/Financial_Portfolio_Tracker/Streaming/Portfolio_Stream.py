@@ -0,0 +1,200 @@
+import logging
+import queue
+import threading
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+
+logger = logging.getLogger(__name__)
+
+
+class Portfolio_Subscription:
+    '''
+    One streaming client of a user's portfolio valuation
+    - Keeps the holdings and running totals, so a price tick is applied as a delta
+    - Events wait in a bounded queue; when the client falls behind, queued events are replaced by one snapshot
+    return: events (dicts with 'event' and 'data') from next_event()
+    '''
+    def __init__(self, user_id, holdings, version=None, max_queue=256):
+        self.user_id = user_id
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.closed = False
+        self.reset(holdings, version)
+
+    def reset(self, holdings, version=None):
+        """
+        Replace the holdings (after a holdings change) and queue a snapshot event
+        """
+        with self._lock:
+            self.version = version
+            self._holdings = {holding['ticker'].upper(): dict(holding) for holding in holdings}
+            self._total_value = sum(holding['value'] for holding in holdings)
+            self._total_investment = sum(holding['buy_price'] * holding['quantity'] for holding in holdings)
+            self._total_gain = sum(holding['gain'] for holding in holdings)
+            self._put({'event': 'snapshot', 'data': self._snapshot()})
+
+    @property
+    def tickers(self):
+        with self._lock:
+            return set(self._holdings)
+
+    def _totals(self):
+        # Caller must hold self._lock
+        investment = self._total_investment
+        return {
+            'total_value': round(self._total_value, 2),
+            'total_investment': round(investment, 2),
+            'total_gain_loss': round(self._total_gain, 2),
+            'total_gain_loss_percent': round(self._total_gain / investment * 100, 2) if investment > 0 else 0.0
+        }
+
+    def _snapshot(self):
+        # Caller must hold self._lock
+        return {
+            'holdings': list(self._holdings.values()),
+            'totals': self._totals(),
+            'holdings_version': self.version
+        }
+
+    def _put(self, event):
+        # Caller must hold self._lock
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Slow client: drop what is queued and let it catch up from one snapshot
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queue.put_nowait({'event': 'snapshot', 'data': self._snapshot()})
+
+    def apply_price(self, ticker, price, change_percent):
+        """
+        New price for one held ticker, valued like the holdings view (value and gain rounded to cents)
+        """
+        with self._lock:
+            holding = self._holdings.get(ticker)
+            if holding is None or holding.get('current_price') == price and holding.get('change_percent') == change_percent:
+                return
+            value = round(holding['quantity'] * price, 2)
+            gain = round(holding['quantity'] * (price - holding['buy_price']), 2)
+            value_delta = value - holding['value']
+            gain_delta = gain - holding['gain']
+            holding.update(current_price=price, value=value, gain=gain, change_percent=change_percent)
+            self._total_value += value_delta
+            self._total_gain += gain_delta
+            self._put({'event': 'price', 'data': {
+                'holding': dict(holding),
+                'value_delta': round(value_delta, 2),
+                'gain_delta': round(gain_delta, 2),
+                'totals': self._totals()
+            }})
+
+    def next_event(self, timeout):
+        """
+        return: the next event, or None after timeout seconds without one
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Portfolio_Stream_Hub:
+    '''
+    Per-process registry of streaming subscriptions indexed by ticker and by user
+    - publish_quote() touches only the subscriptions holding that ticker
+    - publish_holdings() re-indexes a user's subscriptions after a holdings change
+    return: Portfolio_Subscription objects from subscribe()
+    '''
+    def __init__(self, max_subscribers=200, on_change=None):
+        self.max_subscribers = int(max_subscribers)
+        # Optional callback(active subscriptions) used for metrics
+        self.on_change = on_change
+        self._by_ticker = {}  # ticker -> set of subscriptions
+        self._by_user = {}  # user_id -> set of subscriptions
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _changed(self):
+        if self.on_change:
+            try:
+                self.on_change(self._count)
+            except Exception as e:
+                logger.warning("Portfolio stream metrics error: %s", e)
+
+    def _index(self, subscription, tickers):
+        # Caller must hold self._lock
+        for ticker in tickers:
+            self._by_ticker.setdefault(ticker, set()).add(subscription)
+
+    def _unindex(self, subscription, tickers):
+        # Caller must hold self._lock
+        for ticker in tickers:
+            subscribers = self._by_ticker.get(ticker)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_ticker[ticker]
+
+    def subscribe(self, user_id, holdings, version=None):
+        """
+        return: a new subscription, or None when max_subscribers are already connected
+        """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Portfolio_Subscription(user_id, holdings, version)
+            self._index(subscription, subscription.tickers)
+            self._by_user.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        self._changed()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._unindex(subscription, subscription.tickers)
+            subscriptions = self._by_user.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._by_user.pop(subscription.user_id, None)
+            self._count -= 1
+        self._changed()
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return user_id in self._by_user
+
+    def publish_quote(self, ticker, quote):
+        """
+        Push a new price to every subscription holding ticker, O(subscribers of ticker)
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            subscriptions = list(self._by_ticker.get(ticker, ()))
+        if not subscriptions:
+            return 0
+        try:
+            price = float(quote['price'])
+        except (KeyError, TypeError, ValueError):
+            return 0
+        change_percent = Portfolio_Summary.parse_change_percent(quote.get('change_percent', 0.0))
+        for subscription in subscriptions:
+            subscription.apply_price(ticker, price, change_percent)
+        return len(subscriptions)
+
+    def publish_holdings(self, user_id, holdings, version=None, subscription=None):
+        """
+        Holdings of a user changed: reset the user's subscriptions (or just `subscription`) and re-index them
+        """
+        with self._lock:
+            subscriptions = [subscription] if subscription is not None else list(self._by_user.get(user_id, ()))
+            for current in subscriptions:
+                if current.closed:
+                    continue
+                self._unindex(current, current.tickers)
+                current.reset(holdings, version)
+                self._index(current, current.tickers)
@@ -0,0 +1,65 @@
+import math
+import os
+import shutil
+
+# Prometheus multiprocess mode must be configured before main.py (and prometheus_client) is preloaded.
+# Start with an empty directory so metric files of workers from a previous run do not linger.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def cpu_quota():
+    """
+    CPUs available to the container from the cgroup CPU quota (v2, then v1),
+    falling back to the host CPU count when no quota is set
+    """
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as handle:
+            quota, period = handle.read().split()
+            if quota != 'max':
+                return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as handle:
+            quota = int(handle.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as handle:
+            period = int(handle.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return float(os.cpu_count() or 1)
+
+
+CPUS = cpu_quota()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5050')}"
+# Threaded workers: most request time is spent waiting on Postgres and the quote store
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', max(2, math.ceil(CPUS * 2))))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# main.py splits the shared upstream budget between the workers' refreshers and caps streams per worker thread
+os.environ['GUNICORN_WORKERS'] = str(workers)
+os.environ['GUNICORN_THREADS'] = str(threads)
+# Import main.py (models, routes, metrics) once in the master, workers are forked from it
+preload_app = True
+# Graceful worker recycling
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    from main import reset_after_fork
+    reset_after_fork()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
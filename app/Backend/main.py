@@ -1,18 +1,44 @@
-from flask import Flask, jsonify, request, session
+from flask import Flask, jsonify, request, session, Response, g
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import logging
 import os
+import time
+import psycopg2
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.ext.mutable import MutableDict
-from Financial_Portfolio_Tracker.Portfolio_Management.PUT.PUT_Portfolio import Put_Portfolio
-from Financial_Portfolio_Tracker.Portfolio_Management.DELETE.DELETE_Portfolio import Delete_Portfolio
 from Financial_Portfolio_Tracker.Portfolio_Management.GET.GET_Portfolio import Portfolio
-from Financial_Portfolio_Tracker.Portfolio_Management.POST.POST_Portfolio import Post_Portfolio
+from Financial_Portfolio_Tracker.Portfolio_Management.GET.Response_Cache import Response_Cache
 from Financial_Portfolio_Tracker.Real_Time_Stock_Data.GET_Market_Trends import Get_Market_Trends
 from Financial_Portfolio_Tracker.Real_Time_Stock_Data.GET_Ticker import Get_Ticker
-from prometheus_client import Counter, Histogram, generate_latest, Gauge, CONTENT_TYPE_LATEST
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Quote_Cache import Quote_Cache
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Market_Data_Refresher import Market_Data_Refresher
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Rate_Limiter import Token_Bucket_Limiter
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Upstream_Client import Alpha_Vantage_Client, Circuit_Breaker
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Daily_Series import Daily_Series, Series_Ingest_Queue
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Movers_Leaderboard import Movers_Leaderboard
+from Financial_Portfolio_Tracker.Database.DB_Engine import DB_Engine_Config
+from Financial_Portfolio_Tracker.Database.Holdings_Store import Holdings_Store
+from Financial_Portfolio_Tracker.Database.Holdings_Migration import Holdings_Migration
+from Financial_Portfolio_Tracker.Database.Snapshot_Store import Snapshot_Store
+from Financial_Portfolio_Tracker.Database.Price_History_Store import Price_History_Store
+from Financial_Portfolio_Tracker.Database.Identity_Cache import Session_User, Portfolio_Document, Portfolio_Cache
+from Financial_Portfolio_Tracker.Database.Summary_Writer import Summary_Writer
+from Financial_Portfolio_Tracker.Database.Shared_Quote_Store import Shared_Quote_Store
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Incremental_Analytics import Analytics_Registry
+from Financial_Portfolio_Tracker.Streaming.Portfolio_Stream import Portfolio_Stream_Hub
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON, Fast_JSON_Provider
+from Financial_Portfolio_Tracker.Observability.Structured_Logging import Structured_Logging
+from Financial_Portfolio_Tracker.Observability.Request_Tracing import Request_Tracer, OTLP_Exporter
+from prometheus_client import Counter, Histogram, generate_latest, Gauge, CONTENT_TYPE_LATEST, CollectorRegistry, multiprocess
+
+# Leveled JSON logs written by a background thread (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLING, LOG_QUEUE_SIZE)
+Structured_Logging.configure()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# jsonify / request.get_json through orjson when installed (stdlib json otherwise), bodies timed as 'serialize'
+app.json = Fast_JSON_Provider(app, span=lambda: REQUEST_TRACER.span('serialize'))
 # CORS setup
 CORS(app, supports_credentials=True, origins=[
     "http://localhost:3001",
@@ -21,16 +47,79 @@ CORS(app, supports_credentials=True, origins=[
 ])
 
 # Prometheus metrics
+# Under gunicorn PROMETHEUS_MULTIPROC_DIR is set and every worker writes its own metric files,
+# multiprocess_mode decides how gauges from several workers are combined at scrape time
 REQUEST_COUNT = Counter(
     "http_requests_total", "Total HTTP requests", ['method', 'endpoint'])
 REQUEST_LATENCY = Histogram(
     "http_request_duration_seconds", "Request latency", ['endpoint'])
-CPU_USAGE = Gauge("container_cpu_usage_percent", "CPU usage percent")
-MEMORY_USAGE = Gauge("container_memory_usage_bytes", "Memory usage in bytes")
+CPU_USAGE = Gauge("container_cpu_usage_percent", "CPU usage percent", multiprocess_mode='livemax')
+MEMORY_USAGE = Gauge("container_memory_usage_bytes", "Memory usage in bytes", multiprocess_mode='livemax')
 STOCK_MARKET_CALLS = Counter(
     "stock_market_calls_total", "Total calls to /api/stocks/market endpoint")
 TOP_GAINER_PERCENT = Gauge(
-    "stock_market_top_gainer_percent", "Top gainer percent change from /api/stocks/market", ['ticker'])
+    "stock_market_top_gainer_percent", "Top gainer percent change from the market movers leaderboard", ['ticker'],
+    multiprocess_mode='mostrecent')
+QUOTE_CACHE_EVENTS = Counter(
+    "quote_cache_events_total", "Quote cache lookups by result (hit, stale, miss, coalesced)", ['result'])
+QUOTE_CACHE_TIER_EVENTS = Counter(
+    "quote_cache_tier_events_total",
+    "Quote cache events per tier: l1 (process) hit, stale, miss, coalesced; l2 (Postgres) hit, miss, notified",
+    ['tier', 'result'])
+UPSTREAM_TOKENS = Gauge(
+    "alpha_vantage_tokens_remaining", "Tokens left in the shared Alpha Vantage rate limiter",
+    multiprocess_mode='mostrecent')
+UPSTREAM_WAIT = Histogram(
+    "alpha_vantage_limiter_wait_seconds", "Time spent waiting for an Alpha Vantage request token",
+    ['priority', 'outcome'])
+UPSTREAM_LATENCY = Histogram(
+    "alpha_vantage_request_duration_seconds", "Alpha Vantage HTTP call latency by upstream function",
+    ['function', 'outcome'])
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    "alpha_vantage_circuit_open", "1 while the Alpha Vantage circuit breaker is open in any worker",
+    multiprocess_mode='livemax')
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+DB_POOL_LAST_WAIT = Gauge(
+    "db_pool_checkout_last_wait_seconds", "Wait of the most recent database connection checkout",
+    multiprocess_mode='livemax')
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Database connections checked out, summed over workers",
+    multiprocess_mode='livesum')
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_connections_capacity", "pool_size + max_overflow, summed over workers",
+    multiprocess_mode='livesum')
+PORTFOLIO_ANALYTICS_EVENTS = Counter(
+    "portfolio_analytics_updates_total", "Portfolio summaries by computation (delta, rebuild, cached, mismatch)",
+    ['event'])
+PORTFOLIO_STREAM_SUBSCRIBERS = Gauge(
+    "portfolio_stream_subscribers", "Open /api/portfolio/stream connections, summed over workers",
+    multiprocess_mode='livesum')
+PORTFOLIO_RESPONSE_CACHE_EVENTS = Counter(
+    "portfolio_response_cache_events_total", "Portfolio GET responses by result (not_modified, hit, miss)",
+    ['endpoint', 'result'])
+PORTFOLIO_CACHE_EVENTS = Counter(
+    "portfolio_document_cache_events_total", "Portfolio document lookups by result (hit, miss)", ['result'])
+PRICE_HISTORY_INGESTS = Counter(
+    "price_history_ingests_total",
+    "Background daily series ingests by result (queued, coalesced, rejected, stored, failed)", ['result'])
+PORTFOLIO_SUMMARY_WRITES = Counter(
+    "portfolio_summary_writes_total",
+    "Write-behind portfolio summaries by result (queued, coalesced, written, failed, dropped)", ['result'])
+REQUEST_STAGE_LATENCY = Histogram(
+    "request_stage_duration_seconds", "Time spent per stage (upstream, sql.*, analytics, serialize, ...) by endpoint",
+    ['endpoint', 'stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+# Per-stage tracing: Prometheus histogram, slow request log (SLOW_REQUEST_SECONDS, 0 disables)
+# and, when OTEL_EXPORTER_OTLP_TRACES_ENDPOINT is set, OTLP export to a collector
+REQUEST_TRACER = Request_Tracer(
+    on_span=lambda endpoint, stage, seconds: REQUEST_STAGE_LATENCY.labels(endpoint=endpoint, stage=stage).observe(seconds),
+    slow_seconds=float(os.getenv('SLOW_REQUEST_SECONDS', '1.0')),
+    exporter=OTLP_Exporter.create(os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT'),
+                                  os.getenv('OTEL_SERVICE_NAME', 'portfolio-backend'))
+)
 
 @app.before_request
 def start_timer():
@@ -40,6 +129,7 @@ def start_timer():
     method = request.method
     # Increment request count for this endpoint and method
     REQUEST_COUNT.labels(method=method, endpoint=endpoint).inc()
+    REQUEST_TRACER.begin(endpoint, method=method, path=request.path)
 
 @app.after_request
 def record_request_data(response):
@@ -47,6 +137,7 @@ def record_request_data(response):
     endpoint = request.endpoint or request.path
     REQUEST_LATENCY.labels(endpoint=endpoint).observe(duration)
     # REQUEST_COUNT increment moved to before_request for per-endpoint granularity
+    REQUEST_TRACER.end(status=response.status_code)
     return response
 
 # Secret key for session management
@@ -57,6 +148,162 @@ app.secret_key = 'your-secret-key-change-in-production'
 #ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'TU9HXAGCT30ECLY8')
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY', 'NC7R1MCB064DQ0JE')
 
+# Gainers / losers / most active over every quoted symbol, updated by the quote cache
+MARKET_MOVERS = Movers_Leaderboard()
+TOP_GAINERS_SHOWN = 3
+_top_gainer_tickers = set()
+
+
+def refresh_top_gainer_gauge():
+    """
+    Publish the current top gainers, dropping tickers that left the top
+    """
+    top_gainers = MARKET_MOVERS.top_gainers(TOP_GAINERS_SHOWN)
+    tickers = {gainer['ticker'] for gainer in top_gainers}
+    for ticker in _top_gainer_tickers - tickers:
+        try:
+            TOP_GAINER_PERCENT.remove(ticker)
+        except KeyError:
+            pass
+    for gainer in top_gainers:
+        TOP_GAINER_PERCENT.labels(ticker=gainer['ticker']).set(gainer['change_percent'])
+    _top_gainer_tickers.clear()
+    _top_gainer_tickers.update(tickers)
+
+
+def update_market_movers(symbol, quote):
+    if MARKET_MOVERS.update(symbol, quote):
+        refresh_top_gainer_gauge()
+
+
+# Live portfolio valuations pushed to /api/portfolio/stream clients (per process, indexed by ticker)
+STREAM_KEEPALIVE_SECONDS = float(os.getenv('STREAM_KEEPALIVE_SECONDS', '15'))
+STREAM_MAX_SECONDS = float(os.getenv('STREAM_MAX_SECONDS', '300'))
+# Every open stream holds one gunicorn thread: STREAM_RESERVED_THREADS of each worker's threads stay free for
+# the other routes, so the cap never exceeds GUNICORN_THREADS - STREAM_RESERVED_THREADS (0 disables streams)
+WORKER_THREADS = max(int(os.getenv('GUNICORN_THREADS', '4')), 1)
+STREAM_RESERVED_THREADS = max(int(os.getenv('STREAM_RESERVED_THREADS', '2')), 1)
+STREAM_MAX_SUBSCRIBERS = min(
+    int(os.getenv('STREAM_MAX_SUBSCRIBERS', '200')), max(WORKER_THREADS - STREAM_RESERVED_THREADS, 0))
+PORTFOLIO_STREAM = Portfolio_Stream_Hub(
+    max_subscribers=STREAM_MAX_SUBSCRIBERS,
+    on_change=PORTFOLIO_STREAM_SUBSCRIBERS.set
+)
+
+
+def on_quote_stored(symbol, quote):
+    """
+    Every quote stored in the quote cache updates the movers and the streaming subscribers of symbol
+    """
+    update_market_movers(symbol, quote)
+    PORTFOLIO_STREAM.publish_quote(symbol, quote)
+
+
+def observe_quote_cache(result):
+    QUOTE_CACHE_EVENTS.labels(result=result).inc()
+    QUOTE_CACHE_TIER_EVENTS.labels(tier='l1', result=result).inc()
+
+
+def observe_upstream_wait(priority, waited, granted):
+    UPSTREAM_WAIT.labels(priority=priority, outcome='granted' if granted else 'expired').observe(waited)
+    REQUEST_TRACER.record('upstream.wait', waited, priority=priority)
+
+
+def observe_upstream_request(function, seconds, outcome):
+    UPSTREAM_LATENCY.labels(function=function, outcome=outcome).observe(seconds)
+    REQUEST_TRACER.record('upstream', seconds, function=function, outcome=outcome)
+
+
+# Shared quote cache in front of Get_Ticker (TTL and size in seconds / entries)
+QUOTE_CACHE = Quote_Cache(
+    ttl=float(os.getenv('QUOTE_CACHE_TTL', '60')),
+    stale_ttl=float(os.getenv('QUOTE_CACHE_STALE_TTL', '240')),
+    max_size=int(os.getenv('QUOTE_CACHE_MAX_SIZE', '512')),
+    on_event=lambda result: observe_quote_cache(result),
+    on_store=on_quote_stored,
+    on_fetched=lambda symbol, quote, fetched_at: publish_shared_quote(symbol, quote, fetched_at)
+)
+# Shared Alpha Vantage request budget (shared by all worker processes through the state file)
+UPSTREAM_LIMITER = Token_Bucket_Limiter(
+    rate_per_minute=float(os.getenv('ALPHA_VANTAGE_CALLS_PER_MINUTE', '5')),
+    burst=float(os.getenv('ALPHA_VANTAGE_BURST', os.getenv('ALPHA_VANTAGE_CALLS_PER_MINUTE', '5'))),
+    state_file=os.getenv('ALPHA_VANTAGE_LIMITER_FILE', '/tmp/alpha_vantage_bucket.json'),
+    on_acquire=lambda priority, waited, granted: observe_upstream_wait(priority, waited, granted)
+)
+UPSTREAM_CLIENT = Alpha_Vantage_Client(
+    limiter=UPSTREAM_LIMITER,
+    connect_timeout=float(os.getenv('ALPHA_VANTAGE_CONNECT_TIMEOUT', '3.05')),
+    read_timeout=float(os.getenv('ALPHA_VANTAGE_READ_TIMEOUT', '10')),
+    max_retries=int(os.getenv('ALPHA_VANTAGE_MAX_RETRIES', '2')),
+    pool_size=int(os.getenv('ALPHA_VANTAGE_POOL_SIZE', '10')),
+    breaker=Circuit_Breaker(
+        failure_threshold=int(os.getenv('ALPHA_VANTAGE_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.getenv('ALPHA_VANTAGE_BREAKER_RESET', '30'))
+    ),
+    on_request=lambda function, seconds, outcome: observe_upstream_request(function, seconds, outcome)
+)
+Alpha_Vantage_Client.set_shared(UPSTREAM_CLIENT)
+
+# Background market data refresher budget and how long a handler waits for an on-demand quote
+# Every worker runs a refresher, by default each gets an equal share of the shared Alpha Vantage budget
+WORKER_PROCESSES = max(int(os.getenv('GUNICORN_WORKERS', '1')), 1)
+MARKET_DATA_CALLS_PER_MINUTE = float(os.getenv(
+    'MARKET_DATA_CALLS_PER_MINUTE', UPSTREAM_LIMITER.rate_per_second * 60.0 / WORKER_PROCESSES))
+MARKET_DATA_BACKGROUND_DEADLINE = float(os.getenv('MARKET_DATA_BACKGROUND_DEADLINE', '5'))
+MARKET_DATA_BATCH_DEADLINE = float(os.getenv('MARKET_DATA_BATCH_DEADLINE', '15'))
+MARKET_DATA_UNIVERSE_REFRESH = float(os.getenv('MARKET_DATA_UNIVERSE_REFRESH', '300'))
+QUOTE_WAIT_SECONDS = float(os.getenv('QUOTE_WAIT_SECONDS', '15'))
+MAX_QUOTE_SYMBOLS = int(os.getenv('MAX_QUOTE_SYMBOLS', '50'))
+MARKET_DATA_CONCURRENCY = int(os.getenv('MARKET_DATA_CONCURRENCY', '5'))
+
+# Incremental portfolio analytics (per process), ANALYTICS_VERIFY=1 checks every result against a full recompute
+PORTFOLIO_ANALYTICS = Analytics_Registry(
+    max_users=int(os.getenv('ANALYTICS_MAX_USERS', '1024')),
+    verify=os.getenv('ANALYTICS_VERIFY', 'false').lower() in ('1', 'true', 'yes'),
+    on_event=lambda event: PORTFOLIO_ANALYTICS_EVENTS.labels(event=event).inc()
+)
+
+# Serialized /api/portfolio and /api/portfolio/analytics bodies per user (per process)
+PORTFOLIO_RESPONSES = Response_Cache(max_users=int(os.getenv('RESPONSE_CACHE_MAX_USERS', '1024')))
+
+# Portfolio documents (portfolio_files rows) shared by requests for PORTFOLIO_CACHE_TTL seconds (per process)
+PORTFOLIO_DOCUMENTS = Portfolio_Cache(
+    ttl=float(os.getenv('PORTFOLIO_CACHE_TTL', '2')),
+    max_size=int(os.getenv('PORTFOLIO_CACHE_MAX_USERS', '4096')),
+    on_event=lambda result: PORTFOLIO_CACHE_EVENTS.labels(result=result).inc()
+)
+
+# Portfolio history tiers (raw snapshots -> hourly -> daily), retention in days, 0 keeps daily points forever
+PORTFOLIO_SNAPSHOTS = Snapshot_Store(
+    raw_retention_days=int(os.getenv('SNAPSHOT_RAW_RETENTION_DAYS', '2')),
+    hourly_retention_days=int(os.getenv('SNAPSHOT_HOURLY_RETENTION_DAYS', '90')),
+    daily_retention_days=int(os.getenv('SNAPSHOT_DAILY_RETENTION_DAYS', '0'))
+)
+
+# Summaries are written behind the requests: coalesced per user for SUMMARY_FLUSH_SECONDS, then batch upserted
+SUMMARY_WRITER = Summary_Writer(
+    write=lambda batch: persist_summaries(batch),
+    flush_interval=float(os.getenv('SUMMARY_FLUSH_SECONDS', '0.5')),
+    max_batch=int(os.getenv('SUMMARY_FLUSH_MAX_USERS', '500')),
+    on_event=lambda result, count: PORTFOLIO_SUMMARY_WRITES.labels(result=result).inc(count),
+    sweep=lambda: sweep_price_summaries(),
+    sweep_interval=float(os.getenv('SUMMARY_SWEEP_SECONDS', '60'))
+)
+# Portfolios whose prices moved get their stored summary and history point refreshed by the sweep,
+# at most SUMMARY_SWEEP_MAX_USERS per run, one process at a time
+SUMMARY_SWEEP_MAX_USERS = int(os.getenv('SUMMARY_SWEEP_MAX_USERS', '2000'))
+SUMMARY_SWEEP_LOCK_ID = 4207003
+
+# Quotes fetched by any worker or replica are shared through the quote_cache table and LISTEN/NOTIFY,
+# rows older than SHARED_QUOTE_MAX_AGE seconds are not loaded (SHARED_QUOTES=0 keeps every process on its own)
+SHARED_QUOTES_ENABLED = os.getenv('SHARED_QUOTES', 'true').lower() in ('1', 'true', 'yes')
+SHARED_QUOTES = Shared_Quote_Store(
+    connect=lambda: open_listener_connection(),
+    on_quote=lambda symbol, quote, fetched_at: QUOTE_CACHE.apply(symbol, quote, fetched_at),
+    max_age=float(os.getenv('SHARED_QUOTE_MAX_AGE', str(QUOTE_CACHE.ttl + QUOTE_CACHE.stale_ttl))),
+    on_event=lambda result, count: QUOTE_CACHE_TIER_EVENTS.labels(tier='l2', result=result).inc(count)
+)
+
 # SQLAlchemy DB config for PostgreSQL
 app.config['SQLALCHEMY_DATABASE_URI'] = (
     f'postgresql://{os.getenv("POSTGRES_USER")}:'
@@ -66,10 +313,38 @@ app.config['SQLALCHEMY_DATABASE_URI'] = (
     f'{os.getenv("POSTGRES_DB")}'
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool size / overflow / timeout / recycle / pre-ping / statement_timeout from DB_* env variables
+# Keep gunicorn workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below Postgres max_connections
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DB_Engine_Config.engine_options()
 
 # Initialize SQLAlchemy
 db = SQLAlchemy(app)
 
+
+def observe_pool_checkout_wait(seconds):
+    DB_POOL_CHECKOUT_WAIT.observe(seconds)
+    DB_POOL_LAST_WAIT.set(seconds)
+    REQUEST_TRACER.record('db.pool_wait', seconds)
+
+
+with app.app_context():
+    DB_Engine_Config.register_pool_metrics(
+        db.engine,
+        on_checkout_wait=observe_pool_checkout_wait,
+        on_in_use_change=DB_POOL_IN_USE.inc
+    )
+    # Every statement is a sql.<kind> span (select, insert, update, delete, with, other)
+    DB_Engine_Config.register_statement_timing(
+        db.engine, lambda kind, seconds: REQUEST_TRACER.record(f'sql.{kind}', seconds))
+
+
+def set_pool_capacity():
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    DB_POOL_CAPACITY.set(options['pool_size'] + options['max_overflow'])
+
+
+set_pool_capacity()
+
 # Create User model based on the DB table
 class User(db.Model):
     __tablename__ = 'users'
@@ -95,8 +370,9 @@ class PortfolioFile(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True, nullable=False)
     filename = db.Column(db.Text, nullable=False)
     file_content = db.Column(MutableDict.as_mutable(db.JSON), nullable=False)
-    created_at = db.Column(db.TIMESTAMP, default=datetime.now())
-    updated_at = db.Column(db.TIMESTAMP, default=datetime.now(), onupdate=datetime.now())
+    holdings_version = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
     
 
 # Portfolio Summary model for analytics storage
@@ -132,8 +408,8 @@ class PortfolioSummary(db.Model):
     stock_breakdown = db.Column(db.JSON)
     
     # Timestamps
-    created_at = db.Column(db.TIMESTAMP, default=datetime.now())
-    updated_at = db.Column(db.TIMESTAMP, default=datetime.now(), onupdate=datetime.now())
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+    updated_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
    
 # Create User model based on the base Portfolio User needed
@@ -147,8 +423,8 @@ class PortfolioUser:
         self.password = password.lower()
         self.first_name = first_name.lower()
         self.last_name = last_name.lower()
-        self.last_login = datetime.now() - timedelta(minutes=30)
-        self.session_expiration = datetime.now() - timedelta(hours=1)
+        self.last_login = datetime.utcnow() - timedelta(minutes=30)
+        self.session_expiration = datetime.utcnow() - timedelta(hours=1)
         self.is_expired = False
         self.user_id = 0
 
@@ -172,21 +448,18 @@ class PortfolioUser:
                 initial_portfolio = PortfolioFile(
                     user_id=new_user.user_id,
                     filename=f"{username}_portfolio.json",
+                    # Holdings live in the stocks table, only portfolio metadata is kept here
                     file_content={
-                        "portfolio_name": f"{username} Diversified Portfolio",
-                        "total_value": 0.0,
-                        "total_investment": 0.0,
-                        "total_gain_loss": 0.0,
-                        "holdings": []
+                        "portfolio_name": f"{username} Diversified Portfolio"
                     }
                 )
                 db.session.add(initial_portfolio)
                 db.session.commit()
                 self.user_id = new_user.user_id
                 return f'User {self.username} was successfully registered. Please login'
-        except Exception as e:
+        except Exception:
             db.session.rollback()
-            print(e)
+            logger.exception("Error creating user %s", username)
             return "Parameters are not entered correctly, please try again."
 
     def user_login(self, username: str, password: str):
@@ -197,7 +470,7 @@ class PortfolioUser:
         try:
             user = User.query.filter_by(username=username, password=password).first()
             if user:
-                user.last_login = datetime.now()
+                user.last_login = datetime.utcnow()
                 user.session_expiration = user.last_login + timedelta(minutes=15)
                 db.session.commit() 
                 self.is_expired = False
@@ -205,15 +478,15 @@ class PortfolioUser:
                 self.session_expiration = user.session_expiration 
                 return True 
             return False 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error during login of %s", username)
             return False 
 
     def session_expired(self):
         """
         Checks if user login session is still valid
         """
-        if self.session_expiration < datetime.now():
+        if self.session_expiration < datetime.utcnow():
             self.is_expired = True
             return True  
         else:
@@ -222,242 +495,441 @@ class PortfolioUser:
 
 def get_current_user():
     """
-    Get current logged-in user from session
+    Get current logged-in user from session (memoized for the rest of the request)
+    """
+    if 'current_user' not in g:
+        g.current_user = load_session_user()
+    return g.current_user
+
+
+def load_session_user():
+    """
+    The session expiry is stored in the signed session cookie at sign-in, so a valid session
+    needs no database read; only sessions issued without it are checked against users once
     """
     if 'user_id' not in session:
         return None
-    
-    try:
-        user = db.session.get(User, session['user_id'])
-        if user and user.session_expiration and user.session_expiration > datetime.now():
-            return user
-        else:
-            # If session expired clean it
+
+    expires_at = session.get('expires_at')
+    if expires_at is None:
+        try:
+            user = db.session.get(User, session['user_id'])
+        except Exception:
+            logger.exception("Error loading the session user")
+            return None
+        if not user or not user.session_expiration:
             session.clear()
             return None
-    except Exception as e:
-        print(e)
+        expires_at = session['expires_at'] = Session_User.expires_at(user.session_expiration)
+        session['username'] = user.username
+    if expires_at <= time.time():
+        # If session expired clean it
+        session.clear()
         return None
+    return Session_User(session['user_id'], session.get('username'))
+
+
+def get_portfolio_document(user_id):
+    """
+    The user's portfolio_files row as a detached Portfolio_Document, or None
+    Memoized per request, and shared between requests through PORTFOLIO_DOCUMENTS
+    """
+    documents = g.setdefault('portfolio_documents', {})
+    if user_id not in documents:
+        def load():
+            portfolio_file = db.session.get(PortfolioFile, user_id)
+            return Portfolio_Document.from_row(portfolio_file) if portfolio_file else None
+        documents[user_id] = PORTFOLIO_DOCUMENTS.get(user_id, load)
+    return documents[user_id]
+
+
+def invalidate_portfolio_caches(user_ids):
+    """
+    Called after holdings or prices of users changed: drop their documents and cached responses
+    """
+    user_ids = list(user_ids)
+    PORTFOLIO_DOCUMENTS.invalidate(user_ids)
+    PORTFOLIO_RESPONSES.invalidate(user_ids)
+    documents = g.get('portfolio_documents')
+    if documents:
+        for user_id in user_ids:
+            documents.pop(user_id, None)
 
 
 def get_user_portfolio_data(user_id):
     """
     Get the portfolio data for a specific user from database
+    Metadata comes from portfolio_files, holdings and totals are materialized from the stocks table
     """
-    portfolio_file = PortfolioFile.query.filter_by(user_id=user_id).first()
-    if portfolio_file:
-        return portfolio_file.file_content
+    portfolio_document = get_portfolio_document(user_id)
+    if portfolio_document:
+        return Holdings_Store.materialize(
+            portfolio_document.file_content, Holdings_Store.list_holdings(db.session, user_id))
     return None
 
 
-def portfolio_summaries(api_key, portfolio_data):
+def publish_shared_quote(symbol, quote, fetched_at):
     """
-    Calculate comprehensive portfolio analytics and summaries
-    return: Dictionary with portfolio analytics data
+    Share a quote fetched by this process with the other workers and replicas (Quote_Cache on_fetched)
     """
-    if not portfolio_data:
-        return {
-            'error': 'No portfolio data available',
-            'total_stocks': 0,
-            'total_value': 0.0,
-            'total_investment': 0.0,
-            'total_gain_loss': 0.0,
-            'total_gain_loss_percent': 0.0
-        }
-    
-    # Extract stocks from portfolio data structure
-    stocks = []
-    if isinstance(portfolio_data, dict) and 'holdings' in portfolio_data:
-        stocks = portfolio_data['holdings']
-    elif isinstance(portfolio_data, list):
-        stocks = portfolio_data
+    if not SHARED_QUOTES_ENABLED:
+        return
+    try:
+        with app.app_context(), db.engine.begin() as connection:
+            SHARED_QUOTES.publish(connection, symbol, quote, fetched_at)
+    except Exception as e:
+        logger.warning("Could not share the %s quote: %s", symbol, e)
+
+
+def open_listener_connection():
+    """
+    Dedicated psycopg2 connection for the shared quote listener, opened outside the pool
+    (it is held for the life of the process, so it must not count in the pool metrics)
+    """
+    with app.app_context():
+        url = db.engine.url
+    return psycopg2.connect(**url.translate_connect_args(username='user', database='dbname'))
+
+
+def load_shared_quotes(tickers):
+    """
+    Copy quotes other processes fetched for tickers from the shared tier into the local quote cache
+    """
+    if not SHARED_QUOTES_ENABLED or not tickers:
+        return
+    try:
+        with db.engine.connect() as connection:
+            found = SHARED_QUOTES.load(connection, tickers)
+    except Exception as e:
+        logger.warning("Shared quote lookup failed: %s", e)
+        return
+    for ticker, (quote, fetched_at) in found.items():
+        QUOTE_CACHE.apply(ticker, quote, fetched_at)
+
+
+def get_cached_quote(ticker):
+    """
+    Get a quote for ticker from the shared quote store.
+    Handlers never call Alpha Vantage themselves: missing or expired symbols are requested
+    from the background refresher and waited for up to QUOTE_WAIT_SECONDS.
+    """
+    ticker = ticker.upper()
+    quote, fetched_at = QUOTE_CACHE.peek(ticker)
+    if quote is not None and not QUOTE_CACHE.is_expired(fetched_at):
+        return quote
+    load_shared_quotes([ticker])
+    quote, fetched_at = QUOTE_CACHE.peek(ticker, record=False)
+    if quote is not None and not QUOTE_CACHE.is_expired(fetched_at):
+        return quote
+    fresh = MARKET_DATA_REFRESHER.request(ticker, timeout=QUOTE_WAIT_SECONDS)
+    if fresh and 'error' not in fresh:
+        return fresh
+    if quote is not None:
+        # Expired data is better than nothing when the refresh failed
+        return quote
+    return fresh or {"error": f"Quote for '{ticker}' is not available yet, please try again shortly."}
+
+
+def get_cached_quotes(tickers):
+    """
+    get_cached_quote() for many tickers: fresh ones come straight from the quote store,
+    all others are requested from the refresher together and share one QUOTE_WAIT_SECONDS wait
+    return: dict of ticker -> (quote or {'error': ...}, fetched_at)
+    """
+    results = {}
+    missing = []
+    for ticker in tickers:
+        quote, fetched_at = QUOTE_CACHE.peek(ticker)
+        results[ticker] = (quote, fetched_at)
+        if quote is None or QUOTE_CACHE.is_expired(fetched_at):
+            missing.append(ticker)
+    if missing:
+        load_shared_quotes(missing)
+        for ticker in list(missing):
+            quote, fetched_at = QUOTE_CACHE.peek(ticker, record=False)
+            if quote is not None and not QUOTE_CACHE.is_expired(fetched_at):
+                results[ticker] = (quote, fetched_at)
+                missing.remove(ticker)
+    if missing:
+        for ticker, fresh in MARKET_DATA_REFRESHER.request_many(missing, timeout=QUOTE_WAIT_SECONDS).items():
+            quote, fetched_at = results[ticker]
+            if fresh and 'error' not in fresh:
+                results[ticker] = (fresh, QUOTE_CACHE.fetched_at(ticker))
+            elif quote is None:
+                results[ticker] = (fresh or {"error": f"Quote for '{ticker}' is not available yet, please try again shortly."}, None)
+            # else: expired data is better than nothing when the refresh failed
+    return results
+
+
+def portfolio_etag(endpoint, versions):
+    """
+    ETag of a portfolio GET response from a portfolio_versions() row read by this request:
+    holdings version and updated_at (bumped with every holdings write) plus the quote version of the
+    held tickers (moved by every price tick). Not taken from the per-process PORTFOLIO_DOCUMENTS cache,
+    so a write served by another worker changes the tag at once
+    """
+    # Naive UTC, .timestamp() alone would read it as local time
+    updated_at = versions.updated_at.replace(tzinfo=timezone.utc).timestamp() if versions.updated_at else 0
+    return (f"{endpoint}-{versions.user_id}-{versions.holdings_version}-{updated_at:.6f}"
+            f"-q{versions.quote_version}")
+
+
+def conditional_json(endpoint, user_id, etag, build):
+    """
+    Answer a portfolio GET from its ETag: 304 when If-None-Match matches (build is never called),
+    else the cached body for this ETag, else build() -> (payload, status) serialized once
+    Only 200 responses are cached and tagged
+    """
+    if request.if_none_match.contains_weak(etag):
+        PORTFOLIO_RESPONSE_CACHE_EVENTS.labels(endpoint=endpoint, result='not_modified').inc()
+        response = Response(status=304)
     else:
-        return {
-            'error': 'Invalid portfolio data format',
-            'total_stocks': 0,
-            'total_value': 0.0,
-            'total_investment': 0.0,
-            'total_gain_loss': 0.0,
-            'total_gain_loss_percent': 0.0
-        }
-    
-    # Use the stocks directly since they already have current prices
-    portfolio_with_quotes = stocks
-    
-    if not portfolio_with_quotes:
-        return {
-            'error': 'No portfolio data available',
-            'total_stocks': 0,
-            'total_value': 0.0,
-            'total_investment': 0.0,
-            'total_gain_loss': 0.0,
-            'total_gain_loss_percent': 0.0
-        }
-    
-    # Initialize summary variables
-    total_value = 0.0
-    total_investment = 0.0
-    total_gain_loss = 0.0
-    winning_stocks = 0
-    losing_stocks = 0
-    best_performer = None
-    worst_performer = None
-    stock_breakdown = []
-    
-    # Calculate portfolio metrics
-    for stock in portfolio_with_quotes:
-        # Basic calculations
-        investment_amount = stock['buy_price'] * stock['quantity']
-        current_value = stock['value']
-        gain_loss = stock['gain']
-        
-        # Accumulate totals
-        total_value += current_value
-        total_investment += investment_amount
-        total_gain_loss += gain_loss
-        
-        # Count winners and losers
-        if gain_loss > 0:
-            winning_stocks += 1
-        elif gain_loss < 0:
-            losing_stocks += 1
-        
-        # Track best and worst performers
+        body = PORTFOLIO_RESPONSES.get(user_id, endpoint, etag)
+        if body is not None:
+            PORTFOLIO_RESPONSE_CACHE_EVENTS.labels(endpoint=endpoint, result='hit').inc()
+        else:
+            PORTFOLIO_RESPONSE_CACHE_EVENTS.labels(endpoint=endpoint, result='miss').inc()
+            payload, status = build()
+            if status != 200:
+                return jsonify(payload), status
+            with REQUEST_TRACER.span('serialize'):
+                body = app.json.dumps_bytes(payload)
+            PORTFOLIO_RESPONSES.put(user_id, endpoint, etag, body)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    # Browsers keep the body but revalidate before every use
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def persist_summaries(batch):
+    """
+    Write a coalesced batch of summaries with one upsert, plus their history snapshots
+    Runs in the summary writer thread, batch: dict of user_id -> (summary_data, ts)
+    """
+    with app.app_context(), REQUEST_TRACER.job('summary_flush', users=len(batch)):
         try:
-            change_percent = float(stock['change_percent'].replace('%', '')) if isinstance(stock['change_percent'], str) else float(stock['change_percent'])
-        except (ValueError, AttributeError):
-            change_percent = 0.0
-        
-        stock_performance = {
-            'ticker': stock['ticker'],
-            'gain_loss': gain_loss,
-            'change_percent': change_percent,
-            'value': current_value,
-            'weight': 0  # Will calculate after total_value is known
-        }
-        
-        if best_performer is None or change_percent > best_performer['change_percent']:
-            best_performer = stock_performance.copy()
-        
-        if worst_performer is None or change_percent < worst_performer['change_percent']:
-            worst_performer = stock_performance.copy()
-        
-        stock_breakdown.append(stock_performance)
-    
-    # Calculate portfolio-level metrics
-    total_gain_loss_percent = (total_gain_loss / total_investment * 100) if total_investment > 0 else 0.0
-    
-    # Calculate stock weights in portfolio
-    for stock in stock_breakdown:
-        stock['weight'] = (stock['value'] / total_value * 100) if total_value > 0 else 0.0
-    
-    # Sort stocks by value for additional insights
-    top_holdings = sorted(stock_breakdown, key=lambda x: x['value'], reverse=True)[:5]
-    
-    # Calculate diversification metrics
-    total_stocks = len(portfolio_with_quotes)
-    avg_position_size = (total_value / total_stocks) if total_stocks > 0 else 0.0
-    
-    # Prepare summary response
-    summary = {
-        'timestamp': datetime.now().isoformat(),
-        'portfolio_overview': {
-            'total_stocks': total_stocks,
-            'total_value': round(total_value, 2),
-            'total_investment': round(total_investment, 2),
-            'total_gain_loss': round(total_gain_loss, 2),
-            'total_gain_loss_percent': round(total_gain_loss_percent, 2),
-            'avg_position_size': round(avg_position_size, 2)
-        },
-        'performance_metrics': {
-            'winning_stocks': winning_stocks,
-            'losing_stocks': losing_stocks,
-            'win_rate': round((winning_stocks / total_stocks * 100), 2) if total_stocks > 0 else 0.0,
-            'best_performer': best_performer,
-            'worst_performer': worst_performer
-        },
-        'top_holdings': top_holdings,
-        'stock_breakdown': stock_breakdown,
-        'risk_metrics': {
-            'largest_position_weight': max([s['weight'] for s in stock_breakdown]) if stock_breakdown else 0.0,
-            'concentration_risk': 'High' if any(s['weight'] > 20 for s in stock_breakdown) else 'Medium' if any(s['weight'] > 10 for s in stock_breakdown) else 'Low'
-        }
-    }
-    
-    return summary
+            with REQUEST_TRACER.span('summaries.save', users=len(batch)):
+                Summary_Writer.upsert(db.session, batch)
+                # Append to the history tiers; a failed snapshot must not lose the summaries themselves
+                try:
+                    with db.session.begin_nested():
+                        PORTFOLIO_SNAPSHOTS.record_many(db.session, batch)
+                except Exception:
+                    logger.exception("Error recording portfolio snapshots for %d users", len(batch))
+            with REQUEST_TRACER.span('db.commit'):
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def sweep_price_summaries():
+    """
+    Store a fresh summary (and history snapshot) for portfolios whose prices moved since their summary was written
+    Price ticks only write quotes, this pass replaces the per-holder summary writes they used to queue
+    Runs in the summary writer thread; the advisory lock lets one process sweep at a time
+    return: number of summaries written
+    """
+    with app.app_context(), REQUEST_TRACER.job('summary_sweep'):
+        try:
+            locked = db.session.execute(
+                db.text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": SUMMARY_SWEEP_LOCK_ID}).scalar()
+            user_ids = Holdings_Store.users_with_moved_prices(db.session, SUMMARY_SWEEP_MAX_USERS) if locked else []
+            if not user_ids:
+                db.session.rollback()
+                return 0
+            with REQUEST_TRACER.span('analytics', users=len(user_ids)):
+                summaries = PORTFOLIO_ANALYTICS.batch(user_ids, lambda: Holdings_Store.load_columns(db.session, user_ids))
+            ts = datetime.utcnow()
+            batch = {user_id: (summary_data, ts) for user_id, summary_data in summaries.items()}
+            with REQUEST_TRACER.span('summaries.save', users=len(batch)):
+                Summary_Writer.upsert(db.session, batch)
+                PORTFOLIO_SNAPSHOTS.record_many(db.session, batch)
+            with REQUEST_TRACER.span('db.commit'):
+                db.session.commit()
+            return len(batch)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def portfolio_versions(user_id, ticker=None):
+    """
+    The user's current holdings and quote versions (Holdings_Store.versions row), or None
+    """
+    return Holdings_Store.versions(db.session, [user_id], ticker).get(user_id)
+
+
+def analytics_version(versions):
+    """
+    Analytics_Registry version of a portfolio: (holdings_version, quote_version)
+    """
+    return (versions.holdings_version, versions.quote_version)
 
 
-def save_portfolio_summary_to_db(user_id, summary_data):
+def parse_change_percent(change_percent):
     """
-    Save portfolio summary to database
+    Convert an Alpha Vantage change percent ('1.23%' or number) to float
     """
-    from datetime import timezone
     try:
-        # Check if summary already exists for today
-        today = datetime.now().date()
-        existing_summary = PortfolioSummary.query.filter_by(user_id=user_id).filter(
-            db.func.date(PortfolioSummary.created_at) == today
-        ).first()
-        
-        if existing_summary:
-            # Update existing summary
-            summary_obj = existing_summary
-        else:
-            # Create new summary
-            summary_obj = PortfolioSummary(user_id=user_id)
-            db.session.add(summary_obj)
-        
-        # Update fields
-        overview = summary_data.get('portfolio_overview', {})
-        performance = summary_data.get('performance_metrics', {})
-        risk = summary_data.get('risk_metrics', {})
-        
-        summary_obj.total_stocks = overview.get('total_stocks', 0)
-        summary_obj.total_value = overview.get('total_value', 0.0)
-        summary_obj.total_investment = overview.get('total_investment', 0.0)
-        summary_obj.total_gain_loss = overview.get('total_gain_loss', 0.0)
-        summary_obj.total_gain_loss_percent = overview.get('total_gain_loss_percent', 0.0)
-        summary_obj.avg_position_size = overview.get('avg_position_size', 0.0)
-        
-        summary_obj.winning_stocks = performance.get('winning_stocks', 0)
-        summary_obj.losing_stocks = performance.get('losing_stocks', 0)
-        summary_obj.win_rate = performance.get('win_rate', 0.0)
-        
-        best_performer = performance.get('best_performer', {})
-        if best_performer:
-            summary_obj.best_performer_ticker = best_performer.get('ticker')
-            summary_obj.best_performer_gain = best_performer.get('gain_loss')
-            summary_obj.best_performer_percent = best_performer.get('change_percent')
-        
-        worst_performer = performance.get('worst_performer', {})
-        if worst_performer:
-            summary_obj.worst_performer_ticker = worst_performer.get('ticker')
-            summary_obj.worst_performer_gain = worst_performer.get('gain_loss')
-            summary_obj.worst_performer_percent = worst_performer.get('change_percent')
-        
-        summary_obj.largest_position_weight = risk.get('largest_position_weight', 0.0)
-        summary_obj.concentration_risk = risk.get('concentration_risk', 'Low')
-        
-        summary_obj.top_holdings = summary_data.get('top_holdings', [])
-        summary_obj.stock_breakdown = summary_data.get('stock_breakdown', [])
-        
-        summary_obj.updated_at = datetime.now(timezone.utc)
-        
-        db.session.commit()
-        return True
-        
-    except Exception as e:
+        return float(change_percent.replace('%', '')) if isinstance(change_percent, str) else float(change_percent)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def propagate_ticker_price(ticker, quote):
+    """
+    Store a new price for ticker with one upsert on quotes, holdings are valued at it on read.
+    Nothing is written per holder: the quote's version moves every holder's quote version, so cached
+    analytics and ETags see the change; engines of holders cached in this process take the tick as a delta,
+    stored summaries are refreshed by the summary sweep. An unchanged price updates nobody.
+    return: dict of user_id -> updated holding
+    """
+    now = datetime.utcnow()
+    price = float(quote['price'])
+    change_percent = parse_change_percent(quote.get('change_percent', 0.0))
+
+    updated_holdings = Holdings_Store.update_price(db.session, ticker, price, change_percent, now=now)
+    cached = [user_id for user_id in updated_holdings if PORTFOLIO_ANALYTICS.has(user_id)]
+    try:
+        if cached:
+            with REQUEST_TRACER.span('analytics', users=len(cached)):
+                for user_id, versions in Holdings_Store.versions(db.session, cached).items():
+                    version = analytics_version(versions)
+                    PORTFOLIO_ANALYTICS.advance(
+                        user_id, (version[0], version[1] - 1), version,
+                        lambda engine, holding=updated_holdings[user_id]: engine.upsert(holding))
+        with REQUEST_TRACER.span('db.commit'):
+            db.session.commit()
+    except Exception:
         db.session.rollback()
-        print(f"Error saving portfolio summary: {e}")
-        return False
+        for user_id in cached:
+            PORTFOLIO_ANALYTICS.discard(user_id)
+        raise
+    invalidate_portfolio_caches(updated_holdings)
+    return updated_holdings
+
+
+def commit_holdings_change(user_id, change, now, added=None, removed=None):
+    """
+    Finish a single-user holdings write: bump the holdings version and advance the user's
+    analytics with change(engine) in the same transaction, then queue the summary for the writer
+    added / removed: the ticker the write added or removed, its quote version leaves or joins the
+    user's quote version, so the version before the change can be told apart from a price tick
+    """
+    try:
+        Holdings_Store.bump_version(db.session, [user_id], now)
+        versions = portfolio_versions(user_id, added or removed)
+        version = analytics_version(versions)
+        shift = versions.ticker_version if added else -versions.ticker_version if removed else 0
+        with REQUEST_TRACER.span('analytics'):
+            analytics_data = PORTFOLIO_ANALYTICS.apply(
+                user_id, version, change, lambda: Holdings_Store.list_holdings(db.session, user_id),
+                previous=(version[0] - 1, version[1] - shift))
+        with REQUEST_TRACER.span('db.commit'):
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        PORTFOLIO_ANALYTICS.discard(user_id)
+        raise
+    SUMMARY_WRITER.submit(user_id, analytics_data)
+    invalidate_portfolio_caches([user_id])
+    if PORTFOLIO_STREAM.has_subscribers(user_id):
+        PORTFOLIO_STREAM.publish_holdings(user_id, Holdings_Store.list_holdings(db.session, user_id), version[0])
+
+
+def load_ticker_universe():
+    """
+    Ticker universe for the background refresher: every held ticker with its holder count,
+    plus the market trends symbols
+    """
+    with app.app_context():
+        rows = db.session.execute(
+            db.text("SELECT ticker, COUNT(*) AS holders FROM stocks GROUP BY ticker")
+        ).fetchall()
+    universe = {symbol: 0 for symbol in Get_Market_Trends.SYMBOLS}
+    for row in rows:
+        universe[row.ticker.upper()] = row.holders
+    return universe
+
+
+def on_refreshed_quote(ticker, quote):
+    """
+    Push every background refreshed price to its holders
+    and keep today's daily bar of the local price history current
+    """
+    with app.app_context(), REQUEST_TRACER.job('quote_refresh', ticker=ticker):
+        try:
+            bar = Daily_Series.bar_from_quote(quote)
+            if bar and Daily_Series.extends(Price_History_Store.last_day(db.session, ticker), bar['day']):
+                Price_History_Store.upsert_bars(db.session, ticker, [bar])
+            # Committed together with the holders' new prices
+            propagate_ticker_price(ticker, quote)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error propagating %s price", ticker)
+
+
+def ingest_daily_series(ticker):
+    """
+    Bring a ticker's local price history up to date (runs in the series ingest thread)
+    """
+    with app.app_context(), REQUEST_TRACER.job('history_ingest', ticker=ticker):
+        try:
+            return Daily_Series.ingest(db.session, Price_History_Store, ticker, ALPHA_VANTAGE_API_KEY)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+# Missing daily bars are fetched behind the requests, /api/stocks/<ticker>/history serves what is stored
+PRICE_HISTORY_INGEST = Series_Ingest_Queue(
+    ingest=ingest_daily_series,
+    max_pending=int(os.getenv('PRICE_HISTORY_MAX_PENDING', '1000')),
+    on_event=lambda result: PRICE_HISTORY_INGESTS.labels(result=result).inc()
+)
+
+
+MARKET_DATA_REFRESHER = Market_Data_Refresher(
+    store=QUOTE_CACHE,
+    fetcher=lambda ticker, priority, deadline: Get_Ticker.get_stock_quote(
+        ticker, ALPHA_VANTAGE_API_KEY, priority=priority, deadline=deadline),
+    universe_source=load_ticker_universe,
+    calls_per_minute=MARKET_DATA_CALLS_PER_MINUTE,
+    min_refresh_interval=QUOTE_CACHE.ttl,
+    universe_refresh_interval=MARKET_DATA_UNIVERSE_REFRESH,
+    on_quote=on_refreshed_quote,
+    concurrency=MARKET_DATA_CONCURRENCY,
+    background_deadline=MARKET_DATA_BACKGROUND_DEADLINE,
+    batch_deadline=MARKET_DATA_BATCH_DEADLINE
+)
+
+
+@app.before_request
+def start_background_workers():
+    # Started lazily so every (forked) worker process runs its own refresher thread
+    MARKET_DATA_REFRESHER.start()
+    PORTFOLIO_SNAPSHOTS.start(maintain_snapshots)
+    SUMMARY_WRITER.start()
+    if SHARED_QUOTES_ENABLED:
+        SHARED_QUOTES.start()
+
+
+def maintain_snapshots():
+    """
+    Create upcoming snapshot partitions and drop expired ones (runs in the maintenance thread)
+    """
+    with app.app_context():
+        PORTFOLIO_SNAPSHOTS.maintain(db.engine)
 
 
 @app.get('/api/portfolio/health') # WORKS
 def health():
     try:
         return jsonify({'status': 'healthy'}), 200
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"status": "not healthy"}), 500
 
 @app.post('/api/portfolio/signup') # WORKS
@@ -485,8 +957,8 @@ def signup():
         else:
             return jsonify({"message": "Parameters are not entered correctly, please try again."}), 403
             
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred during registration"}), 500
 
 @app.post('/api/portfolio/signin') # WORKS
@@ -506,14 +978,16 @@ def signin():
             if login_success:
                 session['user_id'] = portfolio_user.user_id
                 session['username'] = username
+                # Lets get_current_user check the expiry without a database read
+                session['expires_at'] = Session_User.expires_at(portfolio_user.session_expiration)
                 return jsonify({"message": "Successful login"}), 200
             else:
                 return jsonify({"message": "Username or password are wrong or user doesn't exist"}), 401
         else:
             return jsonify({"message": "Parameters are not entered correctly, please try again."}), 403
             
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred during login"}), 500 
     
 
@@ -527,30 +1001,37 @@ def portfolio_list():
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401
         
-        # Get user's portfolio data from database
-        portfolio_data = get_user_portfolio_data(current_user.user_id)
-        if not portfolio_data:
+        # Read fresh (not from the document cache), a price tick moves the quote version
+        versions = portfolio_versions(current_user.user_id)
+        if not versions:
             return jsonify({"message": "Portfolio data not found"}), 404
+        etag = portfolio_etag('portfolio', versions)
+
+        # Load portfolio and get quotes (only when the client and the response cache have nothing current)
+        def build():
+            try:
+                # The portfolio document is memoized for this request, only the holdings are queried
+                portfolio_data = get_user_portfolio_data(current_user.user_id)
+                # Create Portfolio instance and get quotes from JSON data
+                portfolio_instance = Portfolio()
+                with REQUEST_TRACER.span('portfolio.quotes', holdings=len(portfolio_data.get('holdings', []))):
+                    portfolio_with_quotes = portfolio_instance.get_portfolio_with_quotes_from_data(ALPHA_VANTAGE_API_KEY, portfolio_data)
+
+                # Always return a dict, never a list directly
+                return {
+                    "message": "portfolio retrieved successfully",
+                    "user": current_user.username,
+                    "portfolio": portfolio_with_quotes
+                }, 200
+
+            except Exception:
+                logger.exception("Error loading portfolio")
+                return {"message": "Error loading portfolio data"}, 500
+
+        return conditional_json('portfolio', current_user.user_id, etag, build)
         
-        # Load portfolio and get quotes
-        try:
-            # Create Portfolio instance and get quotes from JSON data
-            portfolio_instance = Portfolio()
-            portfolio_with_quotes = portfolio_instance.get_portfolio_with_quotes_from_data(ALPHA_VANTAGE_API_KEY, portfolio_data)
-            
-            # Always return a dict, never a list directly
-            return jsonify({
-                "message": "portfolio retrieved successfully", 
-                "user": current_user.username,
-                "portfolio": portfolio_with_quotes
-            }), 200
-            
-        except Exception as e:
-            print(f"Error loading portfolio: {e}")
-            return jsonify({"message": "Error loading portfolio data"}), 500
-        
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500
 
 @app.post('/api/portfolio')
@@ -586,72 +1067,30 @@ def portfolio_add():
         except ValueError:
             return jsonify({"message": "All numeric fields must be valid numbers"}), 400
 
-        portfolio_file = PortfolioFile.query.filter_by(user_id=current_user.user_id).first()
+        portfolio_file = get_portfolio_document(current_user.user_id)
         if not portfolio_file:
             return jsonify({"message": "Portfolio not found"}), 404
 
-        if any(inv.get('ticker', '').upper() == ticker for inv in portfolio_file.file_content.get('holdings', [])):
-            return jsonify({"message": f"Investment with ticker '{ticker}' already exists."}), 409
-
-        # Add investment to portfolio data
-        result = Post_Portfolio.add_investment(
-            portfolio_file.file_content,
-            ticker,
-            quantity,
-            buy_price
-        )
-
-        if result['portfolio_data']['holdings']:
-            last_investment = result['portfolio_data']['holdings'][-1]
-            last_investment['ticker'] = ticker
-            last_investment['company_name'] = company_name
-            last_investment['quantity'] = quantity
-            last_investment['buy_price'] = buy_price
-            last_investment['current_price'] = current_price
-            last_investment['value'] = value
-            last_investment['gain'] = gain
-            last_investment['change_percent'] = change_percent
-            if 'created_at' not in last_investment:
-                last_investment['created_at'] = datetime.now().isoformat()
-            last_investment['updated_at'] = datetime.now().isoformat()
-
-        portfolio_file.file_content = result['portfolio_data']
-        portfolio_file.updated_at = datetime.now()
-
-        db.session.execute(
-            db.text("""
-                INSERT INTO stocks (user_id, ticker, quantity, buy_price, current_price, value, gain, change_percent, created_at, updated_at)
-                VALUES (:user_id, :ticker, :quantity, :buy_price, :current_price, :value, :gain, :change_percent, :created_at, :updated_at)
-                ON CONFLICT (user_id, ticker) DO UPDATE SET
-                    quantity = EXCLUDED.quantity,
-                    buy_price = EXCLUDED.buy_price,
-                    current_price = EXCLUDED.current_price,
-                    value = EXCLUDED.value,
-                    gain = EXCLUDED.gain,
-                    change_percent = EXCLUDED.change_percent,
-                    updated_at = EXCLUDED.updated_at
-            """), {
-                "user_id": current_user.user_id,
-                "ticker": ticker,
-                "quantity": quantity,
-                "buy_price": buy_price,
-                "current_price": current_price,
-                "value": value,
-                "gain": gain,
-                "change_percent": change_percent,
-                "created_at": last_investment['created_at'],
-                "updated_at": last_investment['updated_at']
-            }
+        # One row insert, the existing holdings are not read or rewritten
+        now = datetime.utcnow()
+        new_investment = Holdings_Store.add(
+            db.session, current_user.user_id, ticker, quantity, buy_price,
+            company_name=company_name,
+            current_price=current_price,
+            value=value,
+            gain=gain,
+            change_percent=change_percent,
+            now=now
         )
-        db.session.commit()
-
-        analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, result['portfolio_data'])
-        save_portfolio_summary_to_db(current_user.user_id, analytics_data)
+        if new_investment is None:
+            db.session.rollback()
+            return jsonify({"message": f"Investment with ticker '{ticker}' already exists."}), 409
+        commit_holdings_change(current_user.user_id, lambda engine: engine.upsert(new_investment), now, added=ticker)
 
         return jsonify({"message": "Investment added successfully"}), 200
 
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500
 
 @app.put('/api/portfolio/<investment_id>') # WORKS
@@ -683,47 +1122,28 @@ def portfolio_update(investment_id):
                 return jsonify({"message": "Buy price must be a number"}), 400
         if not update_quantity and not update_buy_price:
             return jsonify({"message": "At least one of quantity or buy_price must be provided"}), 400
-        # Get user's portfolio data from database
-        portfolio_file = PortfolioFile.query.filter_by(user_id=current_user.user_id).first()
+        portfolio_file = get_portfolio_document(current_user.user_id)
         if not portfolio_file:
             return jsonify({"message": "Portfolio not found"}), 404
-        # Update investment in portfolio data
-        result = Put_Portfolio.update_investment_in_data(
-            portfolio_file.file_content,
+        # Update the single stocks row of this investment
+        now = datetime.utcnow()
+        result = Holdings_Store.update(
+            db.session,
+            current_user.user_id,
             investment_id,
             quantity if update_quantity else None,
-            buy_price if update_buy_price else None
+            buy_price if update_buy_price else None,
+            now=now
         )
         if 'error' in result:
+            db.session.rollback()
             return jsonify(result), 404
-        # Find the updated investment for stocks table
-        updated_inv = result.get('updated_investment')
-        if updated_inv:
-            db.session.execute(
-                db.text("""
-                    UPDATE stocks SET
-                        quantity = :quantity,
-                        buy_price = :buy_price,
-                        updated_at = :updated_at
-                    WHERE user_id = :user_id AND ticker = :ticker
-                """), {
-                    "user_id": current_user.user_id,
-                    "ticker": updated_inv['ticker'],
-                    "quantity": updated_inv['quantity'],
-                    "buy_price": updated_inv['buy_price'],
-                    "updated_at": updated_inv['updated_at']
-                }
-            )
-        # Update the database with modified portfolio data
-        portfolio_file.file_content = result['portfolio_data']
-        portfolio_file.updated_at = datetime.now()
-        db.session.commit()
         # Update portfolio_summaries
-        analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, result['portfolio_data'])
-        save_portfolio_summary_to_db(current_user.user_id, analytics_data)
+        commit_holdings_change(
+            current_user.user_id, lambda engine: engine.upsert(result['updated_investment']), now)
         return jsonify({"message": "Investment updated successfully"}), 200
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500
 
 @app.delete('/api/portfolio/<investment_id>') # WORKS
@@ -735,143 +1155,63 @@ def portfolio_remove(investment_id):
         current_user = get_current_user()
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401
-        # Get user's portfolio data from database
-        portfolio_file = PortfolioFile.query.filter_by(user_id=current_user.user_id).first()
+        portfolio_file = get_portfolio_document(current_user.user_id)
         if not portfolio_file:
             return jsonify({"message": "Portfolio not found"}), 404
-        # Delete investment from portfolio data (no DB commit in CRUD)
-        result = Delete_Portfolio.delete_investment_from_data(
-            portfolio_file.file_content, investment_id
-        )
+        # Delete the single stocks row of this investment
+        result = Holdings_Store.delete(db.session, current_user.user_id, investment_id)
         if 'error' in result:
+            db.session.rollback()
             return jsonify(result), 404
-        # Remove from stocks table if ticker is known
-        deleted_ticker = result.get('deleted_ticker')
-        if deleted_ticker:
-            db.session.execute(
-                db.text("DELETE FROM stocks WHERE user_id = :user_id AND ticker = :ticker"),
-                {"user_id": current_user.user_id, "ticker": deleted_ticker}
-            )
-        # Update the database with modified portfolio data
-        portfolio_file.file_content = result['portfolio_data']
-        portfolio_file.updated_at = datetime.now()
-        db.session.commit()
         # Update portfolio_summaries
-        analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, result['portfolio_data'])
-        save_portfolio_summary_to_db(current_user.user_id, analytics_data)
+        commit_holdings_change(
+            current_user.user_id, lambda engine: engine.remove(int(investment_id)), datetime.utcnow(),
+            removed=result['deleted_ticker'])
         return jsonify({"message": "Investment deleted successfully"}), 200
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500 
 
 @app.get('/api/stocks/<ticker>') # WORKS
 def portfolio_real(ticker):
     """
     Real-time stock data for a specific ticker symbol
-    Also updates the ticker data in all tables (stocks, portfolio_files, portfolio_summaries)
+    Also updates the ticker's row in the quotes table
     Returns the updated ticker data from all sources.
-    Additionally, updates all users' database files for this ticker, but only if a user is authenticated.
+    Additionally, updates every holder's database files for this ticker, but only if a user is authenticated.
     """
-    from datetime import timezone
     try:
         current_user = get_current_user()
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401
         ticker = ticker.upper()
         # Get real-time data
-        result = Get_Ticker.get_stock_quote(ticker, ALPHA_VANTAGE_API_KEY)
+        with REQUEST_TRACER.span('quote'):
+            result = get_cached_quote(ticker)
         if 'error' in result:
             return jsonify(result), 404
-        utcnow = datetime.now(timezone.utc)
-        # Update all users' stocks, portfolio_files, and summaries for this ticker
-        users = User.query.all()
-        for user in users:
-            # Update stocks table for this user and ticker
-            stock_row = db.session.execute(
-                db.text("SELECT * FROM stocks WHERE user_id = :user_id AND ticker = :ticker"),
-                {"user_id": user.user_id, "ticker": ticker}
-            ).mappings().fetchone()
-            if stock_row:
-                db.session.execute(
-                    db.text("""
-                        UPDATE stocks SET
-                            current_price = :current_price,
-                            value = quantity * :current_price,
-                            gain = (quantity * :current_price) - (quantity * buy_price),
-                            change_percent = :change_percent,
-                            updated_at = :updated_at
-                        WHERE user_id = :user_id AND ticker = :ticker
-                    """),
-                    {
-                        "current_price": result['price'],
-                        "change_percent": float(result['change_percent'].replace('%', '')) if isinstance(result['change_percent'], str) else result['change_percent'],
-                        "updated_at": utcnow,
-                        "user_id": user.user_id,
-                        "ticker": ticker
-                    }
-                )
-            # Update portfolio_files JSON for this ticker
-            portfolio_file = PortfolioFile.query.filter_by(user_id=user.user_id).first()
-            if portfolio_file and 'holdings' in portfolio_file.file_content:
-                updated = False
-                for inv in portfolio_file.file_content['holdings']:
-                    if inv.get('ticker', '').upper() == ticker:
-                        inv['current_price'] = result['price']
-                        inv['value'] = inv['quantity'] * result['price']
-                        inv['gain'] = inv['value'] - (inv['buy_price'] * inv['quantity'])
-                        inv['change_percent'] = float(result['change_percent'].replace('%', '')) if isinstance(result['change_percent'], str) else result['change_percent']
-                        updated = True
-                if updated:
-                    portfolio_file.file_content['updated_at'] = utcnow.isoformat()
-                    portfolio_file.updated_at = utcnow
-            # Update portfolio_summaries
-            if portfolio_file:
-                analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, portfolio_file.file_content)
-                save_portfolio_summary_to_db(user.user_id, analytics_data)
-        db.session.commit()
+        # Store the new price once, every holder of this ticker is valued at it
+        with REQUEST_TRACER.span('propagate', ticker=ticker):
+            updated_holdings = propagate_ticker_price(ticker, result)
         # Now return the data for the current user as before
-        # Fetch the stock row for this user and ticker
-        stock_row = db.session.execute(
-            db.text("SELECT * FROM stocks WHERE user_id = :user_id AND ticker = :ticker"),
+        updated_stock = db.session.execute(
+            db.text("SELECT * FROM holdings WHERE user_id = :user_id AND ticker = :ticker"),
             {"user_id": current_user.user_id, "ticker": ticker}
         ).mappings().fetchone()
-        updated_stock = None
-        if stock_row:
-            quantity = float(stock_row.get('quantity', 0))
-            buy_price = float(stock_row.get('buy_price', 0))
-            company_name = stock_row.get('company_name')
-            if not company_name:
-                company_name = result.get('01. company name', '')
-            updated_stock = stock_row
-        # Update portfolio_files JSON for this ticker for current user
-        portfolio_file = PortfolioFile.query.filter_by(user_id=current_user.user_id).first()
-        updated_investment = None
-        if portfolio_file and 'holdings' in portfolio_file.file_content:
-            for inv in portfolio_file.file_content['holdings']:
-                if inv.get('ticker', '').upper() == ticker:
-                    inv['current_price'] = float(result.get('05. price', 0))
-                    inv['value'] = float(result.get('05. price', 0)) * float(inv.get('quantity', 0))
-                    inv['gain'] = (float(result.get('05. price', 0)) - float(inv.get('buy_price', 0))) * float(inv.get('quantity', 0))
-                    inv['change_percent'] = float(result.get('10. change percent', '0').replace('%', '')) if '10. change percent' in result else 0.0
-                    inv['company_name'] = result.get('01. company name', inv.get('company_name', ''))
-                    inv['updated_at'] = utcnow.isoformat()
-                    updated_investment = inv
-            portfolio_file.updated_at = utcnow
-        # Update portfolio_summaries for current user
-        analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, portfolio_file.file_content)
-        save_portfolio_summary_to_db(current_user.user_id, analytics_data)
-        summary_row = PortfolioSummary.query.filter_by(user_id=current_user.user_id).first()
+        updated_investment = updated_holdings.get(current_user.user_id)
+        # The user's totals at the new price (cached engine unless holdings or prices moved since)
+        versions = portfolio_versions(current_user.user_id)
         summary_data = None
-        if summary_row:
-            summary_data = {
-                'total_stocks': summary_row.total_stocks,
-                'total_value': float(summary_row.total_value),
-                'total_investment': float(summary_row.total_investment),
-                'total_gain_loss': float(summary_row.total_gain_loss),
-                'total_gain_loss_percent': float(summary_row.total_gain_loss_percent),
-                'avg_position_size': float(summary_row.avg_position_size),
-                'updated_at': summary_row.updated_at.isoformat() if summary_row.updated_at else None
-            }
+        if versions is not None:
+            with REQUEST_TRACER.span('analytics'):
+                overview = PORTFOLIO_ANALYTICS.summary(
+                    current_user.user_id, analytics_version(versions),
+                    lambda: Holdings_Store.list_holdings(db.session, current_user.user_id)
+                ).get('portfolio_overview', {})
+            summary_data = {key: overview.get(key, 0) for key in (
+                'total_stocks', 'total_value', 'total_investment', 'total_gain_loss',
+                'total_gain_loss_percent', 'avg_position_size')}
+            summary_data['updated_at'] = datetime.utcnow().isoformat()
         return jsonify({
             "message": "Stock data retrieved and updated for all users successfully",
             "ticker": ticker,
@@ -881,44 +1221,265 @@ def portfolio_real(ticker):
             "portfolio_summary": summary_data
         }), 200
     except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error in %s", request.path)
         db.session.rollback()
         return jsonify({"message": f"Error occurred: {str(e)}"}), 500
 
+@app.get('/api/stocks/quotes')
+def stock_quotes():
+    """
+    Quotes for several tickers in one request: ?symbols=AAPL,MSFT,...
+    Read-only (no holdings or summary updates), duplicates are served once,
+    every quote carries fetched_at (ISO UTC) and age_seconds
+    """
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"message": "Please login and try again"}), 401
+        tickers = list(dict.fromkeys(
+            symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()))
+        if not tickers:
+            return jsonify({"message": "symbols is required, e.g. ?symbols=AAPL,MSFT"}), 400
+        if len(tickers) > MAX_QUOTE_SYMBOLS:
+            return jsonify({"message": f"At most {MAX_QUOTE_SYMBOLS} symbols per request"}), 400
+        invalid = [ticker for ticker in tickers if len(ticker) > 10 or not ticker.replace('.', '').replace('-', '').isalnum()]
+        if invalid:
+            return jsonify({"message": f"Invalid ticker symbols: {', '.join(invalid)}"}), 400
+
+        results = get_cached_quotes(tickers)
+        now = datetime.now(timezone.utc)
+        quotes = {}
+        errors = {}
+        for ticker, (quote, fetched_at) in results.items():
+            if 'error' in quote:
+                errors[ticker] = quote['error']
+                continue
+            fetched = datetime.fromtimestamp(fetched_at, timezone.utc) if fetched_at else None
+            quotes[ticker] = {
+                **quote,
+                'fetched_at': fetched.isoformat() if fetched else None,
+                'age_seconds': round((now - fetched).total_seconds(), 1) if fetched else None,
+                'stale': fetched_at is None or now.timestamp() - fetched_at >= QUOTE_CACHE.ttl
+            }
+        return jsonify({
+            "message": "Quotes retrieved successfully",
+            "quotes": quotes,
+            "errors": errors
+        }), 200
+    except Exception:
+        logger.exception("Error in %s", request.path)
+        return jsonify({"message": "Error occurred"}), 500
+
+@app.get('/api/stocks/<ticker>/history')
+def stock_history(ticker):
+    """
+    Daily OHLC bars of a ticker from the local price history, oldest first
+    ?from=&to= ISO dates (inclusive, default the last year)
+    Never waits for the upstream: when stored bars are missing the daily series is queued for the
+    background ingest and the stored bars are returned with `partial` set
+    """
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"message": "Please login and try again"}), 401
+        ticker = ticker.upper()
+        try:
+            end = datetime.fromisoformat(request.args['to']).date() if request.args.get('to') else datetime.utcnow().date()
+            start = (datetime.fromisoformat(request.args['from']).date() if request.args.get('from')
+                     else end - timedelta(days=365))
+        except ValueError:
+            return jsonify({"message": "from and to must be ISO 8601 dates"}), 400
+        partial = Daily_Series.plan(Price_History_Store.last_day(db.session, ticker), datetime.utcnow().date()) is not None
+        if partial:
+            PRICE_HISTORY_INGEST.submit(ticker)
+        bars = Price_History_Store.bars(db.session, ticker, start, end)
+        error = PRICE_HISTORY_INGEST.error(ticker) if partial else None
+        if not bars and error:
+            return jsonify({"message": error}), 503
+        return jsonify({
+            "message": "Price history retrieved successfully",
+            "ticker": ticker,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "partial": partial,
+            "bars": bars
+        }), 200
+    except Exception:
+        logger.exception("Error in %s", request.path)
+        return jsonify({"message": "Error occurred"}), 500
+
 @app.get('/api/stocks/market') # WORKS
 def portfolio_market():
     """
-    Market trends and updates using Alpha Vantage API key from environment/config.
-    Returns the data as JSON on GET request.
-    Handles string result from Get_Market_Trends gracefully and avoids backend error prints.
+    Market movers (top gainers, top losers, most active) over every quoted symbol.
+    Returns the data as JSON on GET request, never waits for upstream: symbols without a current quote
+    (not fetched yet, or their fetch missed the refresher's batch deadline) are left out and `partial` is set.
+    ?limit=N entries per board (default 3, max 20), ?debug=1 adds a per-symbol timing breakdown.
     """
     try:
         current_user = get_current_user()
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401
-        api_key = ALPHA_VANTAGE_API_KEY
         try:
             STOCK_MARKET_CALLS.inc()
-            result = Get_Market_Trends.get_market_trends(api_key)
-            # If result is a dict with 'top_gainers', update the gauge
-            if isinstance(result, dict) and 'top_gainers' in result:
-                for gainer in result['top_gainers']:
-                    ticker = gainer.get('ticker')
-                    percent = gainer.get('change_percent', 0.0)
-                    try:
-                        percent = float(str(percent).replace('%', ''))
-                    except Exception:
-                        percent = 0.0
-                    if ticker:
-                        TOP_GAINER_PERCENT.labels(ticker=ticker).set(percent)
+            try:
+                limit = min(max(int(request.args.get('limit', TOP_GAINERS_SHOWN)), 1), 20)
+            except ValueError:
+                return jsonify({"message": "limit must be a number"}), 400
+            # Leaderboard maintained as quotes arrive, reading it is O(limit)
+            result = MARKET_MOVERS.snapshot(limit)
+            if not result['symbols']:
+                result = {"error": "Market data is still loading, please try again shortly."}
+                return jsonify(result), 200
+            entries = {symbol: QUOTE_CACHE.peek(symbol, record=False) for symbol in Get_Market_Trends.SYMBOLS}
+            result['partial'] = any(QUOTE_CACHE.is_expired(fetched_at) for _, fetched_at in entries.values())
+            if request.args.get('debug', '').lower() in ('1', 'true', 'yes'):
+                # Per-symbol timing breakdown: last upstream fetch duration, quote age, fetch past its deadline
+                now = datetime.now().timestamp()
+                result['timings'] = {
+                    symbol: {
+                        'fetch_seconds': MARKET_DATA_REFRESHER.fetch_seconds.get(symbol),
+                        'age_seconds': round(now - fetched_at, 1) if fetched_at else None,
+                        'timed_out': symbol in MARKET_DATA_REFRESHER.timed_out
+                    }
+                    for symbol, (_, fetched_at) in entries.items()
+                }
             return jsonify(result), 200
-        except Exception as e:
-            print(f"Error in /api/stocks/market: {e}")
+        except Exception:
+            logger.exception("Error in /api/stocks/market")
             return jsonify({"message": "Error fetching market trends"}), 500
     except Exception as e:
         return jsonify({"message": "Error occurred"}), 500
 
+DASHBOARD_SECTIONS = ('portfolio', 'analytics', 'market')
+
+@app.get('/api/dashboard')
+def dashboard():
+    """
+    Everything the dashboard shows on load in one request: investments with quotes, analytics and market movers
+    ?sections=portfolio,analytics,market selects the sections (default all), ?limit=N movers per board (default 3, max 20)
+    The session, the portfolio document and the holdings are read once and shared by all sections
+    """
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"message": "Please login and try again"}), 401
+        requested = {section.strip().lower() for section in request.args.get('sections', '').split(',') if section.strip()}
+        unknown = requested.difference(DASHBOARD_SECTIONS)
+        if unknown:
+            return jsonify({"message": f"Unknown sections: {', '.join(sorted(unknown))}"}), 400
+        sections = [section for section in DASHBOARD_SECTIONS if not requested or section in requested]
+        try:
+            limit = min(max(int(request.args.get('limit', TOP_GAINERS_SHOWN)), 1), 20)
+        except ValueError:
+            return jsonify({"message": "limit must be a number"}), 400
+
+        endpoint = f"dashboard.{'.'.join(sections)}"
+        with_holdings = 'portfolio' in sections or 'analytics' in sections
+        if with_holdings:
+            versions = portfolio_versions(current_user.user_id)
+            if not versions:
+                return jsonify({"message": "Portfolio data not found"}), 404
+            etag = portfolio_etag(endpoint, versions)
+        else:
+            etag = f"{endpoint}-{current_user.user_id}"
+        market = None
+        if 'market' in sections:
+            # Read once: the ETag covers exactly the boards that are returned
+            market = MARKET_MOVERS.snapshot(limit)
+            etag = f"{etag}-movers.{limit}.{market['version']}"
+
+        def build():
+            try:
+                payload = {"message": "Dashboard retrieved successfully", "user": current_user.username}
+                # One holdings query for both the investments list and the analytics
+                holdings = Holdings_Store.list_holdings(db.session, current_user.user_id) if with_holdings else None
+                if 'portfolio' in sections:
+                    portfolio_data = Holdings_Store.materialize(
+                        get_portfolio_document(current_user.user_id).file_content, holdings)
+                    portfolio_instance = Portfolio()
+                    with REQUEST_TRACER.span('portfolio.quotes', holdings=len(holdings)):
+                        payload['portfolio'] = portfolio_instance.get_portfolio_with_quotes_from_data(
+                            ALPHA_VANTAGE_API_KEY, portfolio_data)
+                if 'analytics' in sections:
+                    with REQUEST_TRACER.span('analytics'):
+                        payload['analytics'] = PORTFOLIO_ANALYTICS.summary(
+                            current_user.user_id, analytics_version(versions), lambda: holdings)
+                if market is not None:
+                    payload['market'] = market if market['symbols'] else {
+                        "error": "Market data is still loading, please try again shortly."}
+                return payload, 200
+
+            except Exception:
+                logger.exception("Error loading dashboard")
+                return {"message": "Error loading dashboard data"}, 500
+
+        return conditional_json('dashboard', current_user.user_id, etag, build)
+
+    except Exception:
+        logger.exception("Error in %s", request.path)
+        return jsonify({"message": "Error occurred"}), 500
+
+def resync_stream(subscription):
+    """
+    Reload a stream's holdings when they were changed through another worker process
+    (one primary key lookup per keepalive)
+    """
+    with app.app_context():
+        version = db.session.execute(
+            db.text("SELECT holdings_version FROM portfolio_files WHERE user_id = :user_id"),
+            {"user_id": subscription.user_id}
+        ).scalar()
+        if version != subscription.version:
+            PORTFOLIO_STREAM.publish_holdings(
+                subscription.user_id, Holdings_Store.list_holdings(db.session, subscription.user_id), version,
+                subscription=subscription)
+
+
+@app.get('/api/portfolio/stream')
+def portfolio_stream():
+    """
+    Server-sent events with the live valuation of the current user's portfolio
+    - snapshot: all holdings and totals (on connect and after every holdings change)
+    - price: one holding's new price, value and gain with the deltas and the new totals
+    Connections end after STREAM_MAX_SECONDS, EventSource clients reconnect automatically
+    """
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"message": "Please login and try again"}), 401
+        user_id = current_user.user_id
+        portfolio_file = get_portfolio_document(user_id)
+        if not portfolio_file:
+            return jsonify({"message": "Portfolio not found"}), 404
+        subscription = PORTFOLIO_STREAM.subscribe(
+            user_id, Holdings_Store.list_holdings(db.session, user_id), portfolio_file.holdings_version)
+        if subscription is None:
+            return jsonify({"message": "Too many open streams, please poll /api/portfolio instead"}), 503
+    except Exception:
+        logger.exception("Error in %s", request.path)
+        return jsonify({"message": "Error occurred"}), 500
+
+    def events():
+        # Runs after the request context is gone: no database connection is held between events
+        deadline = time.time() + STREAM_MAX_SECONDS
+        try:
+            yield "retry: 3000\n\n"
+            while time.time() < deadline:
+                event = subscription.next_event(min(STREAM_KEEPALIVE_SECONDS, max(deadline - time.time(), 0)))
+                if event is None:
+                    resync_stream(subscription)
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {Fast_JSON.dumps(event['data'])}\n\n"
+        except Exception:
+            logger.exception("Portfolio stream error for user %s", user_id)
+        finally:
+            PORTFOLIO_STREAM.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.get('/api/portfolio/analytics') # WORKS
 def portfolio_analytics():
     """
@@ -929,79 +1490,82 @@ def portfolio_analytics():
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401  
         
-        # Get user's portfolio data from database
-        portfolio_data = get_user_portfolio_data(current_user.user_id)
-        if not portfolio_data:
+        # Analytics are cached per (holdings_version, quote_version), the same versions as the ETag
+        versions = portfolio_versions(current_user.user_id)
+        if not versions:
             return jsonify({"message": "Portfolio data not found"}), 404
-        
-        # Calculate portfolio analytics
-        try:
-            analytics_data = portfolio_summaries(ALPHA_VANTAGE_API_KEY, portfolio_data)
-            
-            if 'error' in analytics_data:
-                return jsonify({
+        etag = portfolio_etag('analytics', versions)
+
+        # Calculate portfolio analytics (cached engine when holdings did not change since the last call)
+        # Summaries are persisted by the writes and price updates, a GET never writes
+        def build():
+            try:
+                with REQUEST_TRACER.span('analytics'):
+                    analytics_data = PORTFOLIO_ANALYTICS.summary(
+                        current_user.user_id,
+                        analytics_version(versions),
+                        lambda: Holdings_Store.list_holdings(db.session, current_user.user_id)
+                    )
+                return {
                     "message": "Portfolio analytics calculated successfully",
                     "user": current_user.username,
                     "analytics": analytics_data
-                }), 200
-            
-            # Save analytics to database
-            save_success = save_portfolio_summary_to_db(current_user.user_id, analytics_data)
-            if not save_success:
-                print("Warning: Failed to save portfolio summary to database")
-            
-            return jsonify({
-                "message": "Portfolio analytics calculated successfully",
-                "user": current_user.username,
-                "analytics": analytics_data
-            }), 200
-            
-        except Exception as e:
-            print(f"Error calculating portfolio analytics: {e}")
-            return jsonify({"message": "Error calculating portfolio analytics"}), 500
+                }, 200
+
+            except Exception:
+                logger.exception("Error calculating portfolio analytics")
+                return {"message": "Error calculating portfolio analytics"}, 500
+
+        return conditional_json('analytics', current_user.user_id, etag, build)
         
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500 
 
 @app.get('/api/portfolio/analytics/history') # WORKS
 def portfolio_analytics_history():
     """
     Get historical portfolio analytics for the current user
+    Query parameters (all optional):
+    - from / to: ISO 8601 UTC timestamps or dates, default the last 30 days
+    - resolution: raw, hour, day or auto (default, finest tier that covers the range)
     """
     try:
         current_user = get_current_user()
         if not current_user:
             return jsonify({"message": "Please login and try again"}), 401
-        
-        # Get historical summaries for the user
-        summaries = PortfolioSummary.query.filter_by(user_id=current_user.user_id).order_by(
-            PortfolioSummary.created_at.desc()
-        ).limit(30).all()  # Get last 30 days
-        
-        history_data = []
-        for summary in summaries:
-            history_data.append({
-                'date': summary.created_at.isoformat(),
-                'total_value': float(summary.total_value),
-                'total_investment': float(summary.total_investment),
-                'total_gain_loss': float(summary.total_gain_loss),
-                'total_gain_loss_percent': float(summary.total_gain_loss_percent),
-                'total_stocks': summary.total_stocks,
-                'winning_stocks': summary.winning_stocks,
-                'losing_stocks': summary.losing_stocks,
-                'win_rate': float(summary.win_rate),
-                'concentration_risk': summary.concentration_risk
-            })
-        
+
+        resolution = request.args.get('resolution', 'auto').lower()
+        if resolution != 'auto' and resolution not in Snapshot_Store.RESOLUTIONS:
+            return jsonify({"message": "resolution must be one of: auto, raw, hour, day"}), 400
+        try:
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({"message": "from and to must be ISO 8601 timestamps"}), 400
+        # Compare as naive UTC like the stored snapshots
+        if end.tzinfo is not None:
+            end = end.astimezone(timezone.utc).replace(tzinfo=None)
+        if start.tzinfo is not None:
+            start = start.astimezone(timezone.utc).replace(tzinfo=None)
+        if start > end:
+            return jsonify({"message": "from must not be after to"}), 400
+
+        # Pre-aggregated tier, oldest point first
+        resolution, history_data = PORTFOLIO_SNAPSHOTS.history(
+            db.session, current_user.user_id, start, end, resolution)
+
         return jsonify({
             "message": "Portfolio analytics history retrieved successfully",
             "user": current_user.username,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "resolution": resolution,
             "history": history_data
         }), 200
         
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("Error in %s", request.path)
         return jsonify({"message": "Error occurred"}), 500
 
 @app.route('/metrics')
@@ -1009,23 +1573,70 @@ def metrics():
     """
     Expose Prometheus metrics for monitoring
     This endpoint collects CPU and memory usage metrics
+    Under gunicorn the metrics of all worker processes are aggregated (multiprocess mode)
     """
     import psutil, os
-    from prometheus_client import Gauge
 
     process = psutil.Process(os.getpid())
     cpu_percent = psutil.cpu_percent(interval=None)
-    mem_info = process.memory_info().rss
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Whole server memory: gunicorn master plus all of its workers
+        master = process.parent()
+        mem_info = master.memory_info().rss + sum(child.memory_info().rss for child in master.children())
+    else:
+        mem_info = process.memory_info().rss
     CPU_USAGE.set(cpu_percent)
     MEMORY_USAGE.set(mem_info)
+    UPSTREAM_TOKENS.set(UPSTREAM_LIMITER.tokens())
+    UPSTREAM_CIRCUIT_OPEN.set(1 if UPSTREAM_CLIENT.breaker.is_open else 0)
 
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 @app.route('/')
 def home():
     return 'Hello, to use the API please login'
 
-if __name__ == '__main__':
+def create_app():
+    """
+    App factory used by the production WSGI entry point (wsgi.py / gunicorn)
+    Imports, models and routes are loaded once when main is imported (gunicorn preloads it)
+    """
     with app.app_context():
         db.create_all()
+        # Moves any holdings still stored in portfolio_files JSON into the stocks table
+        Holdings_Migration.run(db.engine)
+        # Portfolio history tables and their current partitions
+        PORTFOLIO_SNAPSHOTS.migrate(db.engine)
+        # Local daily OHLC bars
+        Price_History_Store.migrate(db.engine)
+        # Shared quote cache tier (UNLOGGED table)
+        SHARED_QUOTES.migrate(db.engine)
+        # Movers start from the latest stored bars until fresh quotes arrive
+        MARKET_MOVERS.seed(Price_History_Store.latest_bars(db.session, Get_Market_Trends.SYMBOLS))
+        refresh_top_gainer_gauge()
+    return app
+
+
+def reset_after_fork():
+    """
+    Called in every gunicorn worker after fork: drop connections inherited from the master
+    """
+    # The log writer thread of the master does not exist in the worker
+    Structured_Logging.reset_after_fork()
+    SUMMARY_WRITER.reset_after_fork()
+    SHARED_QUOTES.reset_after_fork()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Gauges are per process under gunicorn, the forked worker starts from zero
+    set_pool_capacity()
+    UPSTREAM_CLIENT.reset_session()
+
+
+if __name__ == '__main__':
+    # Development server only, production runs gunicorn (see gunicorn.conf.py)
+    create_app()
     app.run(host='0.0.0.0', port=5050)
@@ -0,0 +1,30 @@
+import random
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+
+
+def make_holdings(count, seed=7, start_id=0):
+    """
+    Holdings shaped like Holdings_Store rows, with repeated change percents (ties) and '1.23%' strings
+    """
+    rng = random.Random(seed)
+    holdings = []
+    for index in range(start_id, start_id + count):
+        buy_price = round(rng.uniform(5, 900), 2)
+        current_price = round(buy_price * rng.uniform(0.5, 1.8), 2)
+        quantity = float(rng.randint(1, 500))
+        change_percent = round(rng.choice([-2.5, 0.0, 3.1, rng.uniform(-9, 9)]), 2)
+        holdings.append({
+            'id': index,
+            'ticker': f"T{index:04d}",
+            'quantity': quantity,
+            'buy_price': buy_price,
+            'current_price': current_price,
+            'value': round(current_price * quantity, 2),
+            'gain': round((current_price - buy_price) * quantity, 2),
+            'change_percent': f"{change_percent}%" if index % 3 == 0 else change_percent
+        })
+    return holdings
+
+
+def full(holdings):
+    return Portfolio_Summary.comparable(Portfolio_Summary.full_summary({'holdings': holdings}))
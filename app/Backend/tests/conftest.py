@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Unit tests import the Financial_Portfolio_Tracker package from app/Backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A timing script run by hand (python tests/json_benchmark.py), not a test module
+collect_ignore = ['json_benchmark.py']
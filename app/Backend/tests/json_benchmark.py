@@ -0,0 +1,77 @@
+"""
+Compare orjson and stdlib json on portfolio-shaped payloads
+Run from app/Backend: python tests/json_benchmark.py [holdings ...]
+"""
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, '.')
+from Financial_Portfolio_Tracker.Serialization.Fast_JSON import Fast_JSON, orjson  # noqa: E402
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary  # noqa: E402
+
+
+def portfolio_payload(holdings, seed=7):
+    """
+    GET /api/portfolio and /api/portfolio/analytics bodies for one user with `holdings` investments
+    """
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 2, 15, 30)
+    investments = []
+    for index in range(holdings):
+        buy_price = round(rng.uniform(5, 900), 2)
+        current_price = round(buy_price * rng.uniform(0.5, 1.8), 2)
+        quantity = rng.randint(1, 500)
+        investments.append({
+            'id': index,
+            'ticker': f"T{index:04d}",
+            'company_name': f"Company {index} Holdings Inc.",
+            'quantity': float(quantity),
+            'buy_price': buy_price,
+            'current_price': current_price,
+            'value': round(current_price * quantity, 2),
+            'gain': round((current_price - buy_price) * quantity, 2),
+            'change_percent': round(rng.uniform(-9, 9), 2),
+            'created_at': now - timedelta(days=index),
+            'updated_at': now
+        })
+    analytics = Portfolio_Summary.full_summary({'holdings': investments})
+    return {
+        'portfolio': {'message': "portfolio retrieved successfully", 'user': 'alex', 'portfolio': investments},
+        'analytics': {'message': "Portfolio analytics calculated successfully", 'user': 'alex', 'analytics': analytics},
+        # What Postgres numeric columns come back as
+        'decimals': [{'ticker': h['ticker'], 'value': Decimal(str(h['value']))} for h in investments]
+    }
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, default=Fast_JSON.default, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def best_of(function, number):
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main(sizes):
+    if orjson is None:
+        print("orjson is not installed, only the stdlib encoder can be measured")
+    print(f"{'holdings':>8} {'payload':>10} {'bytes':>9} {'stdlib dumps':>13} {'orjson dumps':>13} "
+          f"{'stdlib loads':>13} {'orjson loads':>13}   (microseconds)")
+    for size in sizes:
+        for name, payload in portfolio_payload(size).items():
+            encoded = stdlib_dumps(payload)
+            assert Fast_JSON.loads(Fast_JSON.dumps(payload, sort_keys=True)) == json.loads(encoded)
+            number = max(1, 20000 // size)
+            row = [best_of(lambda: stdlib_dumps(payload), number), None, best_of(lambda: json.loads(encoded), number), None]
+            if orjson is not None:
+                row[1] = best_of(lambda: Fast_JSON.dumps_bytes(payload, sort_keys=True), number)
+                row[3] = best_of(lambda: orjson.loads(encoded), number)
+            print(f"{size:>8} {name:>10} {len(encoded):>9} " + " ".join(
+                f"{value:>13.1f}" if value is not None else f"{'-':>13}" for value in row))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10, 100, 500, 2000])
@@ -0,0 +1,55 @@
+import time
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Upstream_Client import Circuit_Breaker
+
+
+def open_breaker(reset_timeout=0.05):
+    breaker = Circuit_Breaker(failure_threshold=2, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = Circuit_Breaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count():
+    breaker = Circuit_Breaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open
+
+
+def test_half_open_lets_one_trial_through():
+    """After reset_timeout exactly one call may go upstream, its success closes the circuit."""
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_the_circuit_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_released_trial_can_be_taken_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
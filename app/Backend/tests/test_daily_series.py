@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import date, timedelta
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Daily_Series import Daily_Series, Series_Ingest_Queue
+
+
+# A Monday, the previous trading day is Friday 2026-10-16
+MONDAY = date(2026, 10, 19)
+
+
+def test_plan_requests_the_compact_series_without_history():
+    """outputsize=full is premium-only, history starts with the compact series."""
+    assert Daily_Series.plan(None, MONDAY) == 'compact'
+
+
+def test_plan_skips_a_current_store():
+    """The bar of the current trading day comes from quotes, a store ending on the previous one is current."""
+    assert Daily_Series.plan(date(2026, 10, 16), MONDAY) is None
+    assert Daily_Series.plan(MONDAY, MONDAY) is None
+    assert Daily_Series.plan(date(2026, 10, 19), date(2026, 10, 20)) is None
+
+
+def test_plan_requests_the_compact_series_for_any_gap():
+    assert Daily_Series.plan(date(2026, 10, 15), MONDAY) == 'compact'
+    assert Daily_Series.plan(MONDAY - timedelta(days=400), MONDAY) == 'compact'
+
+
+def test_last_trading_day_skips_weekends():
+    assert Daily_Series.last_trading_day(date(2026, 10, 18)) == date(2026, 10, 16)
+    assert Daily_Series.last_trading_day(MONDAY) == MONDAY
+
+
+def test_quote_bar_extends_only_recent_history():
+    assert not Daily_Series.extends(None, '2026-10-19')
+    assert Daily_Series.extends(date(2026, 10, 16), '2026-10-19')
+    assert not Daily_Series.extends(date(2026, 10, 9), '2026-10-19')
+
+
+def test_parse_skips_stored_and_malformed_bars():
+    data = {Daily_Series.SERIES_KEY: {
+        '2026-10-14': {'1. open': '1', '2. high': '2', '3. low': '0.5', '4. close': '1.5', '5. volume': '10'},
+        '2026-10-15': {'1. open': '1', '2. high': '2', '3. low': '0.5', '4. close': '1.8', '5. volume': '20'},
+        '2026-10-16': {'1. open': 'n/a'}
+    }}
+    assert Daily_Series.parse(data, after='2026-10-14') == [
+        {'day': '2026-10-15', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.8, 'volume': 20}]
+
+
+def test_ingest_queue_coalesces_and_keeps_the_last_error():
+    """A symbol is ingested once while queued, its error is reported until an ingest succeeds."""
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+    events = []
+    results = iter([{'error': 'rejected'}, {'symbol': 'IBM', 'stored': 3}])
+
+    def ingest(symbol):
+        release.wait(2)
+        calls.append(symbol)
+        done.set()
+        return next(results)
+
+    queue = Series_Ingest_Queue(ingest, on_event=events.append)
+    assert queue.submit('IBM') and queue.submit('IBM')
+    assert queue.pending('IBM')
+    release.set()
+    assert done.wait(2)
+    while queue.pending('IBM'):
+        time.sleep(0.01)
+    assert calls == ['IBM'] and queue.error('IBM') == 'rejected'
+    done.clear()
+    queue.submit('IBM')
+    assert done.wait(2)
+    while queue.pending('IBM'):
+        time.sleep(0.01)
+    queue.stop()
+    assert queue.error('IBM') is None
+    assert events == ['queued', 'coalesced', 'failed', 'queued', 'stored']
+
+
+def test_ingest_queue_rejects_symbols_beyond_max_pending():
+    queue = Series_Ingest_Queue(lambda symbol: time.sleep(1) or {}, max_pending=1)
+    assert queue.submit('IBM')
+    assert not queue.submit('KO')
+    queue.stop()
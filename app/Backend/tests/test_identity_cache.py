@@ -0,0 +1,25 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from Financial_Portfolio_Tracker.Database.Identity_Cache import Session_User
+
+
+@pytest.fixture(params=['Asia/Jerusalem', 'America/New_York', 'UTC'])
+def local_timezone(request, monkeypatch):
+    """Run the test with the process in another local time zone."""
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_session_expiry_does_not_depend_on_the_local_time_zone(local_timezone):
+    """A session stored as naive UTC 15 minutes ahead expires 15 minutes from now on any host."""
+    session_expiration = datetime.utcnow() + timedelta(minutes=15)
+    remaining = Session_User.expires_at(session_expiration) - time.time()
+    assert 14 * 60 < remaining <= 15 * 60
+
+
+def test_session_expiry_is_the_utc_epoch(local_timezone):
+    assert Session_User.expires_at(datetime(1970, 1, 1, 1, 0)) == 3600.0
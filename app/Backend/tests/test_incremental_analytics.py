@@ -0,0 +1,58 @@
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Incremental_Analytics import Incremental_Analytics, Analytics_Registry
+from analytics_fixtures import make_holdings, full
+
+
+def test_incremental_summary_matches_the_full_computation():
+    holdings = make_holdings(40)
+    engine = Incremental_Analytics(holdings)
+    assert Portfolio_Summary.comparable(engine.summary()) == full(holdings)
+
+
+def test_incremental_deltas_match_the_full_computation():
+    """Upserts (new and replaced holdings) and removes give the summary of the resulting holdings."""
+    holdings = make_holdings(25)
+    engine = Incremental_Analytics(holdings)
+    changed = dict(holdings[3], quantity=holdings[3]['quantity'] + 10, value=holdings[3]['value'] + 1000.0)
+    added = make_holdings(1, seed=11, start_id=25)[0]
+    engine.upsert(changed)
+    engine.upsert(added)
+    engine.remove(holdings[7]['id'])
+    engine.remove(holdings[0]['id'])
+    expected = [changed if h['id'] == 3 else h for h in holdings if h['id'] not in (0, 7)] + [added]
+    assert engine.holdings() == expected
+    assert Portfolio_Summary.comparable(engine.summary()) == full(expected)
+
+
+def test_incremental_summary_of_no_holdings_is_empty():
+    engine = Incremental_Analytics(make_holdings(2))
+    engine.remove(0)
+    engine.remove(1)
+    assert Portfolio_Summary.comparable(engine.summary()) == Portfolio_Summary.comparable(
+        Portfolio_Summary.empty_summary('No portfolio data available'))
+
+
+def test_registry_applies_a_delta_only_from_the_previous_version():
+    holdings = make_holdings(10)
+    registry = Analytics_Registry()
+    registry.summary(1, (1, 5), lambda: holdings)
+    changed = dict(holdings[2], value=holdings[2]['value'] + 50.0)
+    reloaded = []
+    summary = registry.apply(1, (1, 6), lambda engine: engine.upsert(changed),
+                             lambda: reloaded.append(1) or holdings, previous=(1, 5))
+    expected = [changed if h['id'] == 2 else h for h in holdings]
+    assert not reloaded
+    assert Portfolio_Summary.comparable(summary) == full(expected)
+    # An engine at another version is rebuilt from the loader instead
+    registry.apply(1, (2, 7), lambda engine: engine.remove(0), lambda: reloaded.append(1) or holdings[1:], previous=(1, 5))
+    assert reloaded == [1]
+
+
+def test_registry_advance_drops_engines_it_cannot_advance():
+    """A price tick advances a current engine and forgets a stale one, it never loads holdings."""
+    holdings = make_holdings(5)
+    registry = Analytics_Registry()
+    registry.summary(1, (1, 5), lambda: holdings)
+    assert registry.advance(1, (1, 5), (1, 6), lambda engine: None)
+    assert not registry.advance(1, (1, 5), (1, 7), lambda engine: None)
+    assert not registry.has(1)
@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Quote_Cache import Quote_Cache
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Market_Data_Refresher import Market_Data_Refresher
+
+
+class Blocking_Fetcher:
+    '''
+    Stand-in for Get_Ticker, records every call and holds it until released
+    '''
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, symbol, priority, deadline):
+        self.calls.append((symbol, priority))
+        self.started.set()
+        self.release.wait(5)
+        return {'symbol': symbol, 'price': 100.0}
+
+
+def refresher_for(fetcher, universe):
+    events = []
+    store = Quote_Cache(on_event=events.append)
+    refresher = Market_Data_Refresher(store, fetcher, lambda: universe, calls_per_minute=60, min_refresh_interval=60)
+    return refresher, events
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_request_attaches_to_a_running_background_fetch():
+    """A symbol the background loop is already fetching is not fetched again for an on-demand request."""
+    fetcher = Blocking_Fetcher()
+    refresher, events = refresher_for(fetcher, {'IBM': 3})
+    refresher.start()
+    assert fetcher.started.wait(2)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        waiting = pool.submit(refresher.request, 'IBM', 5)
+        assert wait_until(lambda: 'coalesced' in events)
+        fetcher.release.set()
+        assert waiting.result()['price'] == 100.0
+    refresher.stop()
+    assert fetcher.calls == [('IBM', 'background')]
+
+
+def test_concurrent_requests_share_one_fetch():
+    fetcher = Blocking_Fetcher()
+    refresher, events = refresher_for(fetcher, {})
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        waiting = [pool.submit(refresher.request, 'KO', 5) for _ in range(3)]
+        assert fetcher.started.wait(2)
+        assert wait_until(lambda: events.count('coalesced') == 2)
+        fetcher.release.set()
+        assert [future.result()['price'] for future in waiting] == [100.0] * 3
+    refresher.stop()
+    assert fetcher.calls == [('KO', 'interactive')]
+    assert events.count('coalesced') == 2
+
+
+def test_universe_is_loaded_without_holding_the_lock():
+    """A slow universe_source() (a database query) does not block requests on the refresher's lock."""
+    loading = threading.Event()
+    release = threading.Event()
+
+    def universe_source():
+        loading.set()
+        release.wait(2)
+        return {'IBM': 1}
+
+    refresher = Market_Data_Refresher(Quote_Cache(), Blocking_Fetcher(), universe_source, calls_per_minute=60)
+    refresher.start()
+    assert loading.wait(2)
+    try:
+        assert refresher._cond.acquire(timeout=0.5)
+        refresher._cond.release()
+    finally:
+        release.set()
+        refresher.stop()
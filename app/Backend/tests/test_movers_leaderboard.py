@@ -0,0 +1,69 @@
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Movers_Leaderboard import Movers_Leaderboard
+
+
+QUOTES = {
+    'AAPL': {'open': 100.0, 'price': 105.0, 'volume': 500},
+    'MSFT': {'open': 100.0, 'price': 98.0, 'volume': 900},
+    'KO': {'open': 50.0, 'price': 51.0, 'volume': 100},
+    'IBM': {'open': 100.0, 'price': 90.0, 'volume': 300},
+    'TSLA': {'open': 200.0, 'price': 230.0, 'volume': 1200}
+}
+
+
+def leaderboard(symbols=QUOTES):
+    board = Movers_Leaderboard()
+    for symbol in symbols:
+        board.update(symbol, QUOTES[symbol])
+    return board
+
+
+def tickers(movers):
+    return [mover['ticker'] for mover in movers]
+
+
+def test_boards_are_ordered():
+    board = leaderboard()
+    assert tickers(board.top_gainers(3)) == ['TSLA', 'AAPL', 'KO']
+    assert tickers(board.top_losers(3)) == ['IBM', 'MSFT', 'KO']
+    assert tickers(board.most_active(2)) == ['TSLA', 'MSFT']
+    assert board.top_gainers(1)[0] == {'ticker': 'TSLA', 'price': 230.0, 'change': 30.0,
+                                       'change_percent': 15.0, 'volume': 1200}
+
+
+def test_update_moves_a_symbol_between_boards():
+    board = leaderboard()
+    assert board.update('ibm', {'open': 100.0, 'price': 125.0, 'volume': 5000})
+    assert tickers(board.top_gainers(2)) == ['IBM', 'TSLA']
+    assert tickers(board.top_losers(1)) == ['MSFT']
+    assert tickers(board.most_active(1)) == ['IBM']
+    assert len(board) == len(QUOTES)
+
+
+def test_unchanged_or_incomplete_quotes_do_not_update():
+    board = leaderboard()
+    assert not board.update('AAPL', QUOTES['AAPL'])
+    assert not board.update('NVDA', {'price': 100.0})
+    assert len(board) == len(QUOTES)
+
+
+def test_seed_keeps_existing_entries():
+    board = leaderboard(['AAPL'])
+    board.seed({'AAPL': {'open': 100.0, 'close': 50.0, 'volume': 1}, 'KO': {'open': 50.0, 'close': 51.0, 'volume': 1}})
+    assert tickers(board.top_gainers(5)) == ['AAPL', 'KO']
+
+
+def test_remove():
+    board = leaderboard()
+    board.remove('tsla')
+    assert tickers(board.top_gainers(1)) == ['AAPL']
+    assert tickers(board.most_active(1)) == ['MSFT']
+
+
+def test_snapshot_version_depends_only_on_the_boards():
+    """Two processes that received the same quotes in a different order report the same version."""
+    first = leaderboard()
+    second = leaderboard(list(reversed(list(QUOTES))))
+    assert first.snapshot(3) == second.snapshot(3)
+    version = first.snapshot(3)['version']
+    first.update('KO', {'open': 50.0, 'price': 52.0, 'volume': 100})
+    assert first.snapshot(3)['version'] != version
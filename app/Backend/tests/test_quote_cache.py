@@ -0,0 +1,68 @@
+import time
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Quote_Cache import Quote_Cache
+
+
+def quote(symbol, price):
+    return {'symbol': symbol, 'price': price}
+
+
+def cache_with_events(**kwargs):
+    events = []
+    return Quote_Cache(on_event=events.append, **kwargs), events
+
+
+def test_fresh_quote_is_a_hit():
+    """A quote stored within ttl is returned and counted as a hit."""
+    cache, events = cache_with_events(ttl=60, stale_ttl=240)
+    cache.put('aapl', quote('AAPL', 200.0))
+    found, fetched_at = cache.peek('AAPL')
+    assert found == quote('AAPL', 200.0)
+    assert time.time() - fetched_at < 1
+    assert events == ['hit']
+    assert not cache.is_expired(fetched_at)
+
+
+def test_quote_past_ttl_is_served_stale():
+    """After ttl the quote is still returned inside the stale window, then counted as a miss."""
+    cache, events = cache_with_events(ttl=60, stale_ttl=240)
+    now = time.time()
+    cache.apply('KO', quote('KO', 60.0), now - 120)
+    cache.apply('IBM', quote('IBM', 150.0), now - 400)
+    assert cache.peek('KO')[0] == quote('KO', 60.0)
+    assert cache.peek('IBM')[0] == quote('IBM', 150.0)
+    assert events == ['stale', 'miss']
+    assert not cache.is_expired(now - 120)
+    assert cache.is_expired(now - 400)
+    assert cache.is_expired(None)
+
+
+def test_unknown_symbol_is_a_miss():
+    cache, events = cache_with_events()
+    assert cache.peek('MSFT') == (None, None)
+    assert cache.peek('MSFT', record=False) == (None, None)
+    assert events == ['miss']
+
+
+def test_apply_keeps_the_newest_quote():
+    """apply() stores quotes of other processes only when they are newer than the local entry."""
+    fetched = []
+    cache = Quote_Cache(on_fetched=lambda symbol, q, fetched_at: fetched.append(symbol))
+    cache.put('AAPL', quote('AAPL', 200.0))
+    local_fetched_at = cache.fetched_at('AAPL')
+    assert not cache.apply('AAPL', quote('AAPL', 190.0), local_fetched_at - 10)
+    assert cache.peek('AAPL', record=False) == (quote('AAPL', 200.0), local_fetched_at)
+    assert cache.apply('AAPL', quote('AAPL', 210.0), local_fetched_at + 10)
+    assert cache.peek('AAPL', record=False) == (quote('AAPL', 210.0), local_fetched_at + 10)
+    # on_fetched only sees quotes this process fetched itself
+    assert fetched == ['AAPL']
+
+
+def test_least_recently_used_symbol_is_evicted():
+    cache = Quote_Cache(max_size=2)
+    cache.put('AAPL', quote('AAPL', 200.0))
+    cache.put('MSFT', quote('MSFT', 400.0))
+    cache.peek('AAPL')
+    cache.put('KO', quote('KO', 60.0))
+    assert len(cache) == 2
+    assert cache.fetched_at('MSFT') is None
+    assert cache.fetched_at('AAPL') is not None
@@ -0,0 +1,62 @@
+import time
+from Financial_Portfolio_Tracker.Real_Time_Stock_Data.Rate_Limiter import Token_Bucket_Limiter
+
+
+def test_background_leaves_the_reserve_for_interactive():
+    """Background calls stop one token short of empty, interactive calls may take the last one."""
+    limiter = Token_Bucket_Limiter(rate_per_minute=0.1, burst=3)
+    assert limiter.acquire('background', deadline=0)
+    assert limiter.acquire('background', deadline=0)
+    assert not limiter.acquire('background', deadline=0)
+    assert limiter.acquire('interactive', deadline=0)
+    assert not limiter.acquire('interactive', deadline=0)
+
+
+def test_bulk_keeps_the_largest_reserve():
+    limiter = Token_Bucket_Limiter(rate_per_minute=0.1, burst=3)
+    assert limiter.acquire('bulk', deadline=0)
+    assert not limiter.acquire('bulk', deadline=0)
+    assert limiter.acquire('background', deadline=0)
+
+
+def test_unknown_priority_is_served_as_interactive():
+    limiter = Token_Bucket_Limiter(rate_per_minute=0.1, burst=1)
+    assert limiter.acquire('urgent', deadline=0)
+
+
+def test_gives_up_at_once_when_no_token_arrives_before_the_deadline():
+    """The next token is due in 10 minutes, a 1 second deadline fails without waiting for it."""
+    outcomes = []
+    limiter = Token_Bucket_Limiter(rate_per_minute=0.1, burst=1,
+                                   on_acquire=lambda priority, waited, granted: outcomes.append((priority, granted)))
+    assert limiter.acquire('interactive', deadline=0)
+    started = time.monotonic()
+    assert not limiter.acquire('interactive', deadline=1.0)
+    assert time.monotonic() - started < 0.5
+    assert outcomes == [('interactive', True), ('interactive', False)]
+
+
+def test_waits_for_a_refill_within_the_deadline():
+    limiter = Token_Bucket_Limiter(rate_per_minute=600, burst=1)
+    assert limiter.acquire('interactive', deadline=0)
+    started = time.monotonic()
+    assert limiter.acquire('interactive', deadline=2.0)
+    assert 0.05 < time.monotonic() - started < 1.0
+
+
+def test_drain_empties_the_bucket():
+    limiter = Token_Bucket_Limiter(rate_per_minute=0.1, burst=5)
+    assert limiter.tokens() >= 4.9
+    limiter.drain()
+    assert limiter.tokens() < 0.1
+    assert not limiter.acquire('interactive', deadline=0)
+
+
+def test_tokens_are_shared_through_the_state_file(tmp_path):
+    """Two limiters on one state file (two worker processes) draw from the same bucket."""
+    state_file = str(tmp_path / 'bucket.json')
+    first = Token_Bucket_Limiter(rate_per_minute=0.1, burst=2, state_file=state_file)
+    second = Token_Bucket_Limiter(rate_per_minute=0.1, burst=2, state_file=state_file)
+    assert first.acquire('interactive', deadline=0)
+    assert second.acquire('interactive', deadline=0)
+    assert not first.acquire('interactive', deadline=0)
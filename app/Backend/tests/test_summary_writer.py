@@ -0,0 +1,106 @@
+import time
+import pytest
+from datetime import datetime
+from Financial_Portfolio_Tracker.Database.Summary_Writer import Summary_Writer
+
+
+class Recording_Write:
+    '''
+    Stand-in for the database write, records every batch and fails the first `failures` calls
+    '''
+    def __init__(self, failures=0, during_write=None):
+        self.batches = []
+        self.failures = failures
+        # Optional callback run inside the write, before it fails or succeeds
+        self.during_write = during_write
+
+    def __call__(self, batch):
+        self.batches.append(batch)
+        if self.during_write:
+            self.during_write()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+
+
+@pytest.fixture
+def events():
+    return {}
+
+
+def writer_for(write, events, **kwargs):
+    def record(event, count):
+        events[event] = events.get(event, 0) + count
+    return Summary_Writer(write, on_event=record, **kwargs)
+
+
+def test_summaries_of_one_user_are_coalesced(events):
+    """Only the latest summary of a user submitted before a flush is written."""
+    write = Recording_Write()
+    writer = writer_for(write, events)
+    ts = datetime(2026, 10, 17, 12, 0)
+    writer.submit(1, {'total_value': 100.0}, ts)
+    writer.submit(2, {'total_value': 50.0}, ts)
+    writer.submit(1, {'total_value': 110.0}, ts)
+    assert len(writer) == 2
+    assert writer.pending(1) == ({'total_value': 110.0}, ts)
+    assert writer.flush() == 2
+    assert write.batches == [{1: ({'total_value': 110.0}, ts), 2: ({'total_value': 50.0}, ts)}]
+    assert events == {'queued': 2, 'coalesced': 1, 'written': 2}
+    assert writer.pending(1) is None
+
+
+def test_batches_are_split_at_max_batch(events):
+    write = Recording_Write()
+    writer = writer_for(write, events, max_batch=2)
+    for user_id in range(5):
+        writer.submit(user_id, {'total_value': user_id})
+    assert writer.flush() == 5
+    assert [len(batch) for batch in write.batches] == [2, 2, 1]
+
+
+def test_failed_batch_is_retried_then_dropped(events):
+    write = Recording_Write(failures=5)
+    writer = writer_for(write, events, max_attempts=2)
+    writer.submit(1, {'total_value': 100.0})
+    assert writer.flush() == 0
+    assert len(writer) == 1
+    assert writer.flush() == 0
+    assert len(writer) == 0
+    assert events == {'queued': 1, 'failed': 2, 'dropped': 1}
+
+
+def test_newer_summary_wins_over_a_failed_one(events):
+    """A summary submitted while the failing write ran is kept instead of the retried older one."""
+    writer = None
+    write = Recording_Write(failures=1, during_write=lambda: writer.submit(1, {'total_value': 120.0}))
+    writer = writer_for(write, events)
+    writer.submit(1, {'total_value': 100.0})
+    assert writer.flush() == 0
+    assert writer.pending(1)[0] == {'total_value': 120.0}
+    write.during_write = None
+    assert writer.flush() == 1
+    assert write.batches[-1][1][0] == {'total_value': 120.0}
+
+
+def test_summary_is_pending_while_it_is_written(events):
+    seen = []
+    writer = None
+    write = Recording_Write(during_write=lambda: seen.append(writer.pending(1)))
+    writer = writer_for(write, events)
+    writer.submit(1, {'total_value': 100.0})
+    writer.flush()
+    assert seen[0][0] == {'total_value': 100.0}
+
+
+def test_sweep_runs_in_the_writer_thread(events):
+    """sweep() is called every sweep_interval seconds even when nothing is submitted."""
+    calls = []
+    writer = writer_for(Recording_Write(), events, sweep=lambda: calls.append(1) or 2, sweep_interval=0.05)
+    writer.start()
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.stop()
+    assert len(calls) >= 2
+    assert events['swept'] >= 4
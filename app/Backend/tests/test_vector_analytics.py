@@ -0,0 +1,25 @@
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Portfolio_Summary import Portfolio_Summary
+from Financial_Portfolio_Tracker.Portfolio_Analytics.Vector_Analytics import Vector_Analytics
+from analytics_fixtures import make_holdings, full
+
+
+def test_vector_summary_matches_the_full_computation():
+    holdings = make_holdings(Vector_Analytics.MIN_VECTOR_HOLDINGS + 20)
+    assert Portfolio_Summary.comparable(Vector_Analytics.summary({'holdings': holdings})) == full(holdings)
+
+
+def test_vector_batch_matches_the_full_computation_per_user():
+    holdings_by_user = {1: make_holdings(50, seed=1), 2: make_holdings(3, seed=2), 3: make_holdings(120, seed=3)}
+    summaries = Vector_Analytics.batch_summaries(holdings_by_user)
+    for user_id, holdings in holdings_by_user.items():
+        assert Portfolio_Summary.comparable(summaries[user_id]) == full(holdings)
+
+
+def test_vector_batch_from_columns_includes_users_without_holdings():
+    holdings = make_holdings(40)
+    columns = {'user_id': [1] * len(holdings)}
+    for field in Vector_Analytics.FIELDS:
+        columns[field] = [holding[field] for holding in holdings]
+    summaries = Vector_Analytics.batch_summaries_from_columns(columns, user_ids=[1, 2])
+    assert Portfolio_Summary.comparable(summaries[1]) == full(holdings)
+    assert summaries[2]['error'] == 'No portfolio data available'
@@ -186,89 +186,55 @@ const PortfolioDashboard = () => {
 
   const COLORS = ['#8884d8', '#82ca9d', '#ffc658', '#ff7300', '#8dd1e1', '#d084d0'];
 
-  // Fetch portfolio data from backend - GET /api/portfolio
-  const fetchPortfolio = async () => {
+  // Fetch the dashboard in one request - GET /api/dashboard
+  // sections: any of portfolio, analytics, market (comma separated)
+  const fetchDashboard = async (sections = 'portfolio,analytics,market') => {
     if (!isAuthenticated) return;
-    setLoading(true);
-    setError('');
+    const withPortfolio = sections.split(',').includes('portfolio');
+    if (withPortfolio) {
+      setLoading(true);
+      setError('');
+    }
     try {
-      console.log('Fetching portfolio...');
-      const response = await fetch(`${API_BASE}/api/portfolio`, {
+      console.log('Fetching dashboard:', sections);
+      const response = await fetch(`${API_BASE}/api/dashboard?sections=${sections}`, {
         method: 'GET',
         credentials: 'include',
         headers: {
           'Content-Type': 'application/json'
         }
       });
-      console.log('Portfolio response status:', response.status);
+      console.log('Dashboard response status:', response.status);
       if (response.ok) {
         const data = await response.json();
-        console.log('Portfolio data received:', data);
-        // Handle different response formats
-        const portfolioItems = data.portfolio || data.investments || data || [];
-        setStocks(Array.isArray(portfolioItems) ? portfolioItems : []);
-        // Generate historical data
-        const histData = generatePortfolioHistory(portfolioItems);
-        setPortfolioData(histData);
+        console.log('Dashboard data received:', data);
+        if (data.portfolio !== undefined) {
+          const portfolioItems = data.portfolio || [];
+          setStocks(Array.isArray(portfolioItems) ? portfolioItems : []);
+          // Generate historical data
+          const histData = generatePortfolioHistory(portfolioItems);
+          setPortfolioData(histData);
+        }
+        if (data.analytics !== undefined) {
+          setAnalytics(data.analytics);
+        }
+        if (data.market !== undefined) {
+          setMarketData(Array.isArray(data.market.top_gainers) ? data.market.top_gainers : []);
+        }
       } else if (response.status === 401) {
         // Session expired
         console.log('Session expired, need to re-login');
         handleLogout();
       } else {
         const errorData = await response.json();
-        console.error('Portfolio fetch error:', errorData);
+        console.error('Dashboard fetch error:', errorData);
         setError(`Failed to fetch portfolio: ${errorData.message || response.statusText}`);
       }
     } catch (err) {
       console.error('Network error:', err);
       setError(`Network error: ${err.message}`);
     } finally {
-      setLoading(false);
-    }
-  };
-
-  // Fetch analytics - GET /api/portfolio/analytics
-  const fetchAnalytics = async () => {
-    if (!isAuthenticated) return;
-    try {
-      const response = await fetch(`${API_BASE}/api/portfolio/analytics`, {
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json',
-        }
-      });
-      console.log('Analytics response:', response);
-      if (response.ok) {
-        const data = await response.json();
-        console.log('Analytics data:', data);
-        setAnalytics(data.analytics);
-      } else {
-        console.error('Failed to fetch analytics');
-      }
-    } catch (error) {
-      console.error('Analytics fetch error:', error);
-    }
-  };
-
-  // Fetch market overview - GET /api/stocks/market
-  const fetchMarketOverview = async () => {
-    try {
-      const response = await fetch(`${API_BASE}/api/stocks/market`, {
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json',
-        }
-      });
-      console.log('Market response:', response);
-      if (response.ok) {
-        const data = await response.json();
-        console.log('Market data:', data);
-        setMarketData(Array.isArray(data.top_gainers) ? data.top_gainers : []);
-      } else {
-        console.error('Failed to fetch market data');
-      }
-    } catch (error) {
-      console.error('Market data fetch error:', error);
+      if (withPortfolio) setLoading(false);
     }
   };
 
@@ -319,7 +285,7 @@ const PortfolioDashboard = () => {
       if (response.ok) {
         setNewStock({ ticker: '', quantity: '', buy_price: '', company_name: '' });
         setShowAddForm(false);
-        fetchPortfolio(); // Refresh portfolio
+        fetchDashboard('portfolio,analytics'); // Refresh portfolio and analytics
         setError('');
       } else {
         const data = await response.json();
@@ -349,7 +315,7 @@ const PortfolioDashboard = () => {
 
       if (response.ok) {
         setEditingStock(null);
-        fetchPortfolio(); // Refresh portfolio
+        fetchDashboard('portfolio,analytics'); // Refresh portfolio and analytics
         setError('');
       } else {
         const data = await response.json();
@@ -371,7 +337,7 @@ const PortfolioDashboard = () => {
       });
 
       if (response.ok) {
-        fetchPortfolio(); // Refresh portfolio
+        fetchDashboard('portfolio,analytics'); // Refresh portfolio and analytics
       } else {
         setError('Failed to remove stock');
       }
@@ -462,18 +428,47 @@ const PortfolioDashboard = () => {
   // Fetch data when authenticated and button is pressed
   useEffect(() => {
     if (isAuthenticated) {
-      fetchPortfolio();
-      fetchAnalytics();
+      fetchDashboard();
+    }
+  }, [isAuthenticated]);
 
+  // Live prices - GET /api/portfolio/stream (server-sent events)
+  // snapshot replaces all holdings, price replaces one; polls /api/dashboard only when the stream is refused
+  useEffect(() => {
+    if (!isAuthenticated) return undefined;
+    let pollTimer = null;
+    const startPolling = () => {
+      if (!pollTimer) pollTimer = setInterval(() => fetchDashboard('portfolio'), 60000);
+    };
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => clearInterval(pollTimer);
     }
+    const source = new EventSource(`${API_BASE}/api/portfolio/stream`, { withCredentials: true });
+    source.addEventListener('snapshot', (event) => {
+      const data = JSON.parse(event.data);
+      const holdings = Array.isArray(data.holdings) ? data.holdings : [];
+      setStocks(holdings);
+      setPortfolioData(generatePortfolioHistory(holdings));
+    });
+    source.addEventListener('price', (event) => {
+      const { holding } = JSON.parse(event.data);
+      setStocks((current) => current.map((stock) => (stock.ticker === holding.ticker ? { ...stock, ...holding } : stock)));
+    });
+    source.onerror = () => {
+      // EventSource reconnects by itself unless the server refused the stream (e.g. 503 when streams are full)
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    };
+    return () => {
+      source.close();
+      clearInterval(pollTimer);
+    };
   }, [isAuthenticated]);
 
   // Handle manual refresh
   const handleManualRefresh = () => {
     setIsUpdating(true);
-    fetchPortfolio();
-    fetchAnalytics();
-    fetchMarketOverview();
+    fetchDashboard();
     setTimeout(() => setIsUpdating(false), 1000);
   };
 
@@ -556,7 +551,7 @@ const PortfolioDashboard = () => {
           </button>
           <button
             onClick={() => {
-              if (!showMarketOverview) fetchMarketOverview();
+              if (!showMarketOverview) fetchDashboard('market');
               setShowMarketOverview(!showMarketOverview);
             }}
             className="px-4 py-2 bg-indigo-600 hover:bg-indigo-700 text-white rounded-lg transition"